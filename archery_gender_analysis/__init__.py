@@ -1,8 +1,21 @@
 """Package with utilities for performing data analysis of archery competitions."""
-from archery_gender_analysis import general_routines, ianseo_scrape, plotting
+import importlib
 
 __all__ = [
     "general_routines",
     "ianseo_scrape",
     "plotting",
 ]
+
+
+def __getattr__(name):
+    # Submodules are imported on first use, so that e.g. ranking does not load matplotlib or requests
+    if name in __all__:
+        module = importlib.import_module(f'{__name__}.{name}')
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,358 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Resumable bulk download of IANSEO tournaments listed in a manifest
+#
+# Usage         : archery-gender-backfill [data/tournaments.json] [--ids Nimes15 ...] [--rate 2]
+#
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from archery_gender_analysis import http_cache, ianseo_scrape, instrument
+
+BASE_URL = 'https://www.ianseo.net/TourData/'
+
+# Outcomes of a division job. Failed jobs are retried on the next run, the others are not.
+DONE = 'done'
+ABSENT = 'absent'
+FAILED = 'failed'
+
+
+def load_manifest(fname, base_url=BASE_URL):
+    """ function load_manifest
+    read a manifest of tournaments to download
+
+    The manifest is a json object mapping the identifier a tournament is saved under,
+    e.g. Nimes15, to its IANSEO tournament, either as <year>/<id> or as a full url.
+
+    Parameters
+    ----------
+    fname : str
+        manifest file
+    base_url : str
+        url that <year>/<id> tournaments are found under
+
+    Returns
+    -------
+    dict
+        mapping of tournament identifier to base url of the tournament
+
+    """
+    with open(fname) as f:
+        manifest = json.load(f)
+    return {t_id: tour if '://' in tour else f'{base_url.rstrip("/")}/{tour.strip("/")}'
+            for t_id, tour in manifest.items()}
+
+
+class RateLimiter:
+    """ class RateLimiter
+    limit the rate of requests shared by several threads
+
+    Requests are spaced evenly, with up to burst of them let through at once after a pause.
+
+    Parameters
+    ----------
+    rate : float
+        maximum requests per second, unlimited if None
+    burst : int
+        number of requests that may be made together
+
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if self.rate is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # Slots are not saved up beyond the burst
+            self._next = max(self._next, now - (self.burst - 1) / self.rate)
+            delay = self._next - now
+            self._next += 1 / self.rate
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BackfillState:
+    """ class BackfillState
+    outcomes of the division jobs of a backfill, checkpointed to a json file
+
+    Parameters
+    ----------
+    fname : str
+        state file, read if it exists
+
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        try:
+            with open(fname) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self.jobs = state.get('jobs', {})
+        self.written = state.get('written', {})
+
+    @staticmethod
+    def job_key(t_id, div):
+        return f'{t_id}/{div}'
+
+    def status(self, t_id, div):
+        return self.jobs.get(self.job_key(t_id, div), {}).get('status')
+
+    def record(self, t_id, div, status, **info):
+        self.jobs[self.job_key(t_id, div)] = dict(info, status=status)
+        self.save()
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.fname))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=directory, prefix='.backfill_state_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'jobs': self.jobs, 'written': self.written}, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.fname)
+
+
+class Backfill:
+    """ class Backfill
+    download the category pages of many tournaments, resuming where a previous run stopped
+
+    Each division of each tournament is a job fetching its category pages on a pool of
+    threads, at no more than rate requests per second overall. The outcome of each job is
+    checkpointed to the state file as it completes and its table kept in work_dir, so a
+    rerun only fetches jobs that have not succeeded. Optional divisions without results are
+    recorded as absent and not fetched again; their second page is not fetched at all if the
+    first has no results. Once every division of a tournament is done its pages are combined
+    and written to <datapath><id>Scores.csv, as read by general_routines.read_from_files.
+
+    Parameters
+    ----------
+    tournaments : dict
+        mapping of tournament identifier to base url of the tournament, e.g. from load_manifest
+    datapath : str
+        directory to write the score files to
+    state_file : str
+        checkpoint file, defaults to .backfill/state.json under datapath
+    work_dir : str
+        directory to keep the tables of completed jobs in, defaults to that of the state file
+    divisions : list of str
+        divisions to fetch, defaults to all of ianseo_scrape.DIVISIONS
+    rate : float
+        maximum requests per second, unlimited if None
+    max_workers : int
+        maximum number of concurrent requests
+    session : requests.Session
+        session to fetch through. A pooled session sized to max_workers is created if None.
+    cache : http_cache.ResponseCache or str
+        response cache to serve pages from where possible, or its directory. None downloads every page.
+    fast : bool
+        use the single pass parser, which only extracts the columns used in the analysis
+
+    """
+
+    def __init__(self, tournaments, datapath='./data/', state_file=None, work_dir=None, divisions=None,
+                 rate=2.0, max_workers=4, session=None, cache=http_cache.DEFAULT_CACHE_DIR, fast=False):
+        self.tournaments = dict(tournaments)
+        self.datapath = datapath
+        if state_file is None:
+            state_file = os.path.join(datapath, '.backfill', 'state.json')
+        self.work_dir = os.path.dirname(os.path.abspath(state_file)) if work_dir is None else work_dir
+        self.state = BackfillState(state_file)
+        self.divisions = ianseo_scrape.DIVISIONS if divisions is None else divisions
+        self.limiter = RateLimiter(rate)
+        self.max_workers = max_workers
+        self.session = ianseo_scrape.make_session(pool_size=max_workers) if session is None else session
+        self.cache = http_cache.open_cache(cache)
+        self.fast = fast
+        self._stop = threading.Event()
+
+    def score_file(self, t_id):
+        return f'{self.datapath}{t_id}Scores.csv'
+
+    def _table_file(self, t_id, div):
+        return os.path.join(self.work_dir, f'{t_id}_{div}.pkl')
+
+    def pending(self):
+        """ method pending
+        division jobs still to be run
+
+        Returns
+        -------
+        list of tuple
+            (tournament identifier, division) of every job not done or absent
+
+        """
+        return [(t_id, div) for t_id in self.tournaments for div in self.divisions
+                if self.state.status(t_id, div) not in (DONE, ABSENT)]
+
+    def _fetch(self, url):
+        self.limiter.wait()
+        # Server errors fail the job, to be retried, rather than marking the division absent
+        return ianseo_scrape.fetch_page(url, session=self.session, cache=self.cache, raise_server_errors=True)
+
+    def _run_job(self, t_id, div):
+        # Fetch and parse the pages of one division, returning its status and table
+        tables = []
+        for gen in ianseo_scrape.GENDERS:
+            if self._stop.is_set():
+                return None, None
+            page_text = self._fetch(ianseo_scrape.cat_url(self.tournaments[t_id], div, gen))
+            try:
+                tables.append(ianseo_scrape.parse_cat(page_text, div, gen, fast=self.fast))
+            except (ValueError, AttributeError):
+                # No results table, a division not shot at this tournament
+                if div in ianseo_scrape.REQUIRED_DIVISIONS:
+                    raise
+                return ABSENT, None
+        return DONE, pd.concat(tables, ignore_index=True)
+
+    def _write_complete(self, t_id):
+        # Combine the divisions of a tournament once none are left to fetch
+        statuses = [self.state.status(t_id, div) for div in self.divisions]
+        if any(status not in (DONE, ABSENT) for status in statuses):
+            return False
+        tables = [pd.read_pickle(self._table_file(t_id, div))
+                  for div, status in zip(self.divisions, statuses) if status == DONE]
+        fname = self.score_file(t_id)
+        with instrument.stage('write', event=t_id, rows=sum(len(table) for table in tables)):
+            pd.concat(tables, ignore_index=True).to_csv(fname)
+        self.state.written[t_id] = fname
+        self.state.save()
+        return True
+
+    def run(self, retry_absent=False, verbose=False):
+        """ method run
+        run every pending job, checkpointing each as it completes
+
+        Interrupting a run (e.g. with Ctrl-C) stops new requests being made, jobs already
+        completed are kept and the rest are fetched by the next run.
+
+        Parameters
+        ----------
+        retry_absent : bool
+            fetch divisions previously found to be absent again
+        verbose : bool
+            print the outcome of each job
+
+        Returns
+        -------
+        dict
+            mapping of tournament identifier to 'written' if its score file was written by this
+            run, 'complete' if it was already, or 'incomplete' if any of its jobs failed
+
+        """
+        if retry_absent:
+            for t_id in self.tournaments:
+                for div in self.divisions:
+                    if self.state.status(t_id, div) == ABSENT:
+                        del self.state.jobs[self.state.job_key(t_id, div)]
+        os.makedirs(self.work_dir, exist_ok=True)
+
+        result = {t_id: 'complete' for t_id in self.tournaments
+                  if t_id in self.state.written and os.path.exists(self.state.written[t_id])}
+        # Tournaments whose jobs all finished before their score file was written
+        for t_id in self.tournaments:
+            if t_id not in result and self._write_complete(t_id):
+                result[t_id] = 'written'
+
+        self._stop.clear()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._run_job, t_id, div): (t_id, div) for t_id, div in self.pending()}
+            try:
+                for future in as_completed(futures):
+                    t_id, div = futures[future]
+                    try:
+                        status, table = future.result()
+                    except Exception as err:
+                        self.state.record(t_id, div, FAILED, error=f'{type(err).__name__}: {err}')
+                        if verbose:
+                            print(f'{t_id:<12} {div}  {FAILED}: {err}')
+                        continue
+                    if status is None:
+                        continue
+                    if table is not None:
+                        table.to_pickle(self._table_file(t_id, div))
+                    self.state.record(t_id, div, status, rows=0 if table is None else len(table))
+                    if verbose:
+                        print(f'{t_id:<12} {div}  {status}')
+                    if self._write_complete(t_id):
+                        result[t_id] = 'written'
+            except BaseException:
+                # Let requests in flight finish, but start no more
+                self._stop.set()
+                raise
+
+        for t_id in self.tournaments:
+            result.setdefault(t_id, 'incomplete')
+        return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='archery-gender-backfill',
+        description='Download the qualification results of the IANSEO tournaments in a manifest. Interrupted '
+                    'runs resume without fetching completed divisions again.')
+    parser.add_argument('manifest', nargs='?', default='./data/tournaments.json',
+                        help='json file mapping tournament identifiers to IANSEO <year>/<id> or urls')
+    parser.add_argument('--ids', nargs='+', default=None, help='only download these tournaments of the manifest')
+    parser.add_argument('--base-url', default=BASE_URL, help='url that <year>/<id> tournaments are found under')
+    parser.add_argument('--datapath', default='./data/', help='directory to write the score files to')
+    parser.add_argument('--state', default=None, help='checkpoint file, defaults to .backfill/state.json in datapath')
+    parser.add_argument('--divisions', nargs='+', default=None, help='divisions to download, all if not given')
+    parser.add_argument('--rate', type=float, default=2.0, help='maximum requests per second')
+    parser.add_argument('--workers', type=int, default=4, help='maximum number of concurrent requests')
+    parser.add_argument('--http-cache', default=None,
+                        help='directory of the response cache to fetch through, defaults to .http_cache in datapath')
+    parser.add_argument('--no-http-cache', action='store_true', help='download every page without the cache')
+    parser.add_argument('--fast', action='store_true', help='keep only the columns used in the analysis')
+    parser.add_argument('--retry-absent', action='store_true', help='fetch divisions found absent before again')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    tournaments = load_manifest(args.manifest, base_url=args.base_url)
+    if args.ids is not None:
+        unknown = sorted(set(args.ids) - set(tournaments))
+        if unknown:
+            raise SystemExit(f'Not in the manifest: {", ".join(unknown)}')
+        tournaments = {t_id: tournaments[t_id] for t_id in args.ids}
+
+    if args.no_http_cache:
+        cache = None
+    else:
+        cache = os.path.join(args.datapath, '.http_cache') if args.http_cache is None else args.http_cache
+    backfill = Backfill(tournaments, datapath=args.datapath, state_file=args.state, divisions=args.divisions,
+                        rate=args.rate, max_workers=args.workers, cache=cache, fast=args.fast)
+    try:
+        result = backfill.run(retry_absent=args.retry_absent, verbose=True)
+    finally:
+        if backfill.cache is not None:
+            backfill.cache.flush()
+    for t_id, outcome in result.items():
+        print(f'{t_id:<12} {outcome}')
+
+    return 0 if all(outcome != 'incomplete' for outcome in result.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Command line entry point running the cached analysis pipeline
+#
+# Usage         : archery-gender-analysis Nimes15 Nimes16 ... --prefix Nimes_ [--stages ...] [--force]
+#
+
+import argparse
+import time
+
+from archery_gender_analysis import instrument, pipeline, results_io
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='archery-gender-analysis',
+        description='Analyse gender differences in the results of indoor archery competitions. Stages whose '
+                    'inputs have not changed since the last run are skipped.')
+    parser.add_argument('events', nargs='+', help='identifiers of the events to analyse, e.g. Nimes22')
+    parser.add_argument('--prefix', default='', help="prefix for the result file names, e.g. 'Nimes_'")
+    parser.add_argument('--datapath', default='./data/', help='directory holding the event score files')
+    parser.add_argument('--f-pref', default='', help='prefix of the score file names')
+    parser.add_argument('--f-suff', default='Scores', help='suffix of the score file names')
+    parser.add_argument('--fname-fmt', default='.csv', help='extension of the score file names')
+    parser.add_argument('--results', default='./results/', help='directory to write results to')
+    parser.add_argument('--formats', nargs='+', default=list(results_io.DEFAULT_FORMATS),
+                        choices=list(results_io.FORMATS),
+                        help='machine-readable formats to also write results tables in, none by default')
+    parser.add_argument('--no-text', action='store_true',
+                        help='skip the fixed-width text view of each table, written by default')
+    parser.add_argument('--fmt', default='png', help='image file format')
+    parser.add_argument('--plot-mode', default='auto', choices=['auto', 'markers', 'density'],
+                        help='draw every archer, binned density, or choose by division size')
+    parser.add_argument('--density-threshold', type=int, default=None,
+                        help="archers in a division above which 'auto' plots draw density")
+    parser.add_argument('--tie-breaks', nargs='+', default=None, help='columns to break ties on score')
+    parser.add_argument('--top-k', type=int, default=3,
+                        help='positions in each category to study, 3 for the podium or e.g. 16 for elimination seeds')
+    parser.add_argument('--method', default='welch', choices=['welch', 'permutation', 'bootstrap'],
+                        help='test for the difference between genders')
+    parser.add_argument('--rank-tests', action='store_true',
+                        help='also compare the score distributions with Mann-Whitney U and KS tests')
+    parser.add_argument('--resamples', type=int, default=None, help='number of resamples for resampling tests')
+    parser.add_argument('--seed', type=int, default=None, help='seed for resampling tests')
+    parser.add_argument('--stages', nargs='+', default=None,
+                        help='stages to bring up to date (with those they depend on), all if not given')
+    parser.add_argument('--list-stages', action='store_true', help='list the stages and exit')
+    parser.add_argument('--force', action='store_true', help='rerun stages even if they are up to date')
+    parser.add_argument('--jobs', type=int, default=4, help='maximum number of stages to run at once')
+    parser.add_argument('--compact', action='store_true',
+                        help='hold the data as categoricals, small integers and float32 to save memory')
+    parser.add_argument('--cache-dir', default=None, help='directory for cached stage artifacts')
+    parser.add_argument('--profile', default=None,
+                        help='record time, memory, rows and HTTP use of each stage and event to this json file')
+    parser.add_argument('--trace', default=None, help='write the stage records as a Chrome trace to this file')
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help='record only times when profiling, memory is otherwise traced by running one stage '
+                             'at a time')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    resample_args = {}
+    if args.resamples is not None:
+        resample_args['n_resamples'] = args.resamples
+    if args.seed is not None:
+        resample_args['seed'] = args.seed
+
+    analysis = pipeline.build_analysis(args.events, fpref=args.prefix, datapath=args.datapath,
+                                       fname_fmt=args.fname_fmt, f_pref=args.f_pref, f_suff=args.f_suff,
+                                       fpath=args.results, formats=args.formats, text=not args.no_text,
+                                       fmt=args.fmt, plot_mode=args.plot_mode, density_threshold=args.density_threshold,
+                                       tie_breaks=args.tie_breaks, method=args.method,
+                                       resample_args=resample_args, cache_dir=args.cache_dir,
+                                       compact=args.compact, top_k=args.top_k, rank_tests=args.rank_tests)
+
+    if args.list_stages:
+        for name in analysis.stages:
+            deps = ', '.join(sorted(analysis.dependencies(name)))
+            print(f'{name}' + (f' (after {deps})' if deps else ''))
+        return 0
+
+    start = time.perf_counter()
+    if args.profile or args.trace:
+        trace_memory = not args.no_trace_memory
+        # Memory peaks are process-wide, so are only recorded for stages run one at a time
+        with instrument.recording(json_file=args.profile, trace_file=args.trace, trace_memory=trace_memory) as recorder:
+            status = analysis.run(targets=args.stages, force=args.force, max_workers=1 if trace_memory else args.jobs)
+        print(recorder.summary().to_string())
+    else:
+        status = analysis.run(targets=args.stages, force=args.force, max_workers=args.jobs)
+    for name, result in status.items():
+        print(f'{name:<24} {result}')
+    print(f'{sum(r == "ran" for r in status.values())} stages ran, '
+          f'{sum(r == "skipped" for r in status.values())} skipped in {time.perf_counter() - start:.2f}s')
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,290 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Typed columnar store of event scores backed by memory-mapped numpy arrays
+#
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+STORE_VERSION = 2
+
+# On-disk schema for each event: column name -> (file name, kind of column). Labels are stored as
+# strings as wide as the longest label of the event, numbers as int64, or float64 if any are missing.
+STORE_SCHEMA = {
+    'Division': ('Division.npy', 'label'),
+    'Class': ('Class.npy', 'label'),
+    'Score': ('Score.npy', 'number'),
+    '10': ('10.npy', 'number'),
+    '9': ('9.npy', 'number'),
+    'Category Rank': ('Category_Rank.npy', 'number'),
+}
+
+META_FILE = 'meta.json'
+
+
+def file_hash(fname, chunk_size=1 << 20):
+    """ function file_hash
+    content hash of a file, used to detect changes to source data
+
+    Parameters
+    ----------
+    fname : str
+        path to the file to hash
+    chunk_size : int
+        number of bytes to read at a time
+
+    Returns
+    -------
+    str
+        hex digest of the sha256 hash of the file contents
+
+    """
+    sha = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def read_source_csv(fname):
+    """ function read_source_csv
+    read an IANSEO-derived scores csv and apply the DNS filter
+
+    Parameters
+    ----------
+    fname : str
+        path to the source csv file
+
+    Returns
+    -------
+    dataset : pandas dataframe
+        scores with the store schema columns, zero/DNS scores removed
+
+    """
+    dataset = pd.read_csv(fname, usecols=list(STORE_SCHEMA))
+    # Drop any zero/DNS scores as cause issues with analysis.
+    dataset = dataset[dataset['Score'] != 0]
+    return dataset[list(STORE_SCHEMA)]
+
+
+def _column_array(values, kind):
+    # Array of a column as stored, missing labels are held as empty strings
+    if kind == 'label':
+        return np.asarray(values.fillna('').astype(str).to_numpy(dtype=object), dtype=str)
+    if pd.api.types.is_integer_dtype(values):
+        return values.to_numpy(dtype='<i8')
+    return values.to_numpy(dtype='<f8')
+
+
+def ingest_event(fname, event_dir, source_hash=None):
+    """ function ingest_event
+    parse a source csv once and write it to the store as typed columns
+
+    Parameters
+    ----------
+    fname : str
+        path to the source csv file
+    event_dir : str
+        directory of the store entry for this event
+    source_hash : str
+        content hash of the source file, computed if not provided
+
+    Returns
+    -------
+    meta : dict
+        metadata describing the stored event
+
+    """
+    dataset = read_source_csv(fname)
+    arrays = {col: _column_array(dataset[col], kind) for col, (_, kind) in STORE_SCHEMA.items()}
+    if source_hash is None:
+        source_hash = file_hash(fname)
+    stat = os.stat(fname)
+
+    meta = {
+        'version': STORE_VERSION,
+        'source': os.path.abspath(fname),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': source_hash,
+        'n_rows': len(dataset),
+        'schema': {col: array.dtype.str for col, array in arrays.items()},
+    }
+
+    # Write to a temporary directory and swap into place so readers never see a partial entry
+    parent = os.path.dirname(os.path.abspath(event_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp_')
+    try:
+        for col, (col_file, _) in STORE_SCHEMA.items():
+            np.save(os.path.join(tmp_dir, col_file), arrays[col])
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+        if os.path.isdir(event_dir):
+            shutil.rmtree(event_dir)
+        os.replace(tmp_dir, event_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return meta
+
+
+def read_meta(event_dir):
+    """ function read_meta
+    read the metadata of a store entry
+
+    Parameters
+    ----------
+    event_dir : str
+        directory of the store entry for this event
+
+    Returns
+    -------
+    dict or None
+        metadata of the entry, or None if there is no valid entry
+
+    """
+    try:
+        with open(os.path.join(event_dir, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != STORE_VERSION:
+        return None
+    return meta
+
+
+def is_fresh(fname, event_dir):
+    """ function is_fresh
+    check whether a store entry is up to date with its source csv
+
+    The cheap size/mtime check is tried first; if that fails the content hash is compared
+    so that touching a file (e.g. by a git checkout) does not force a re-ingest.
+
+    Parameters
+    ----------
+    fname : str
+        path to the source csv file
+    event_dir : str
+        directory of the store entry for this event
+
+    Returns
+    -------
+    fresh : bool
+        True if the stored entry matches the source file
+    source_hash : str or None
+        content hash of the source if it had to be computed
+
+    """
+    meta = read_meta(event_dir)
+    if meta is None:
+        return False, None
+
+    stat = os.stat(fname)
+    if stat.st_size == meta['size'] and stat.st_mtime_ns == meta['mtime_ns']:
+        return True, None
+
+    source_hash = file_hash(fname)
+    if source_hash != meta['sha256']:
+        return False, source_hash
+
+    # Contents unchanged, record the new mtime to keep the fast path for next time
+    meta['size'] = stat.st_size
+    meta['mtime_ns'] = stat.st_mtime_ns
+    with open(os.path.join(event_dir, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return True, source_hash
+
+
+def load_event(event_dir, mmap_mode='c'):
+    """ function load_event
+    load a stored event as a dataframe backed by memory-mapped arrays
+
+    Parameters
+    ----------
+    event_dir : str
+        directory of the store entry for this event
+    mmap_mode : str or None
+        mode passed to numpy.load, None reads the arrays into memory. The default maps them
+        copy-on-write, so the dataframe may be edited in place without changing the store.
+
+    Returns
+    -------
+    pandas dataframe
+        scores with the store schema columns
+
+    """
+    # Plain array views of the maps, so that results computed from them are not memmaps too
+    columns = {col: np.asarray(np.load(os.path.join(event_dir, col_file), mmap_mode=mmap_mode))
+               for col, (col_file, _) in STORE_SCHEMA.items()}
+    # Label columns are held as python strings in the analysis, numeric columns are not copied
+    for col, (_, kind) in STORE_SCHEMA.items():
+        if kind == 'label':
+            labels = columns[col].astype(object)
+            labels[columns[col] == ''] = np.nan
+            columns[col] = labels
+    return pd.DataFrame(columns, copy=False)
+
+
+def get_event(fname, store_path, f_id):
+    """ function get_event
+    load an event from the store, (re)ingesting the source csv if it has changed
+
+    Parameters
+    ----------
+    fname : str
+        path to the source csv file
+    store_path : str
+        root directory of the event store
+    f_id : str
+        identifier of the event
+
+    Returns
+    -------
+    pandas dataframe
+        scores with the store schema columns
+
+    """
+    event_dir = os.path.join(store_path, f_id.replace(' ', '_'))
+    fresh, source_hash = is_fresh(fname, event_dir)
+    if not fresh:
+        ingest_event(fname, event_dir, source_hash=source_hash)
+    return load_event(event_dir)
+
+
+def event_hash(fname, store_path, f_id):
+    """ function event_hash
+    content hash of the source csv of an event, as recorded in the store
+
+    Parameters
+    ----------
+    fname : str
+        path to the source csv file
+    store_path : str
+        root directory of the event store
+    f_id : str
+        identifier of the event
+
+    Returns
+    -------
+    str
+        hex digest of the sha256 hash of the source file contents
+
+    """
+    event_dir = os.path.join(store_path, f_id.replace(' ', '_'))
+    fresh, _ = is_fresh(fname, event_dir)
+    if not fresh:
+        return ingest_event(fname, event_dir)['sha256']
+    return read_meta(event_dir)['sha256']
@@ -2,57 +2,79 @@
 #                 @jatkinson1000
 #
 # Date Created  : 2022-07-18
-# Last Modified : 2022-07-18
+# Last Modified : 2026-10-17
 #
 # Summary       : AGB Gender investigation for indoor competition.  general routines
 #
 
+import os
+
 import numpy as np
 import pandas as pd
-from scipy.stats import ttest_ind
+
+from archery_gender_analysis import event_store, group_stats, instrument, rank_tests, ranking, resampling, results_io
+from archery_gender_analysis import schema
+
+RAW_COLUMNS = ['Event', 'Division', 'Class', 'Score', '10', '9', 'Sep rank', 'Mixed rank']
 
 
-def read_from_files(flist, datapath='./data/', fname_fmt='.csv', f_pref='', f_suff='Scores'):
+def read_from_files(flist, datapath='./data/', fname_fmt='.csv', f_pref='', f_suff='Scores',
+                    use_store=True, store_path=None, compact=False):
+
+    # Events are read from a typed columnar store, kept in .store under datapath unless given a store_path,
+    # only re-parsing the csv if it has changed. use_store=False reads the csv files directly.
+    if store_path is None:
+        store_path = os.path.join(datapath, '.store')
 
     li_df = []
     fields = ['Division', 'Class', 'Score', '10', '9', 'Category Rank']
     for f_id in flist:
-        dataset = pd.read_csv(f'{datapath}{f_pref}{f_id.replace(" ","_")}{f_suff}{fname_fmt}', usecols=fields)
-        # Drop any zero/DNS scores as cause issues with analysis.
-        dataset = dataset.drop(dataset[dataset.Score == 0].index)
-        dataset["Event"] = f_id
+        fname = f'{datapath}{f_pref}{f_id.replace(" ","_")}{f_suff}{fname_fmt}'
+        with instrument.stage('read', event=f_id) as stage:
+            if use_store:
+                dataset = event_store.get_event(fname, store_path, f_id)
+            else:
+                dataset = pd.read_csv(fname, usecols=fields)
+                # Drop any zero/DNS scores as cause issues with analysis.
+                dataset = dataset.drop(dataset[dataset.Score == 0].index)
+            dataset["Event"] = f_id
+            if compact:
+                # Shared categories keep the label columns categorical when the events are combined
+                dataset = schema.apply_compact_schema(dataset, categories=dict(schema.CATEGORIES, Event=flist))
+            stage.add_rows(len(dataset))
         li_df.append(dataset)
     # Combine all events into a single dataset
     df_comb = pd.concat(li_df, axis=0, ignore_index=True)
+    if compact:
+        # Only recasts label columns left as strings by events with unusual divisions or classes
+        df_comb = schema.apply_compact_schema(df_comb)
 
     return df_comb
 
 
-def calc_separate_rank_percentiles(df_in):
+def calc_separate_rank_percentiles(df_in, tie_breaks=None):
 
-    # Generate seperate gender category rank based on score and then 10s
-    df_in["Sep rank"] = (df_in.groupby(['Event', 'Division', 'Class'])["Score"].rank(ascending=False, method='min')
-                         + df_in.groupby(['Event', 'Division', 'Class', 'Score'])["10"].rank(ascending=False, method='min')
-                         - 1)
-    # Get separate percentile
-    df_in['Sep pc'] = 100 * ((df_in['Sep rank'] - 1)
-                             / (df_in.groupby(['Event', 'Division', 'Class'])['Score'].transform('count') - 1))
+    # Generate seperate gender category rank based on score and then 10s (or other tie breaks), and percentile
+    with instrument.stage('rank', rows=len(df_in)):
+        results = ranking.rank_percentiles(df_in, tie_breaks=tie_breaks)
+    if schema.is_compact(df_in):
+        results = schema.compact_columns(results)
+    df_in["Sep rank"] = results["Sep rank"]
+    df_in['Sep pc'] = results["Sep pc"]
 
     return df_in
 
 
-def calc_mixed_rank_percentiles(df_in):
-
-    # Check we have generated separate rank and percentile already, if not do so first
-    if ('Sep rank' not in df_in.columns) or 'Sep pc' not in df_in.columns:
-        df_in = calc_separate_rank_percentiles(df_in)
+def calc_mixed_rank_percentiles(df_in, tie_breaks=None):
 
-    # Generate mixed gender category rank based on score and then 10s and percentile
-    df_in["Mixed rank"] = (df_in.groupby(['Event', 'Division'])["Score"].rank(ascending=False, method='min')
-                           + df_in.groupby(['Event', 'Division', 'Score'])["10"].rank(ascending=False, method='min')
-                           - 1)
-    df_in['Mixed pc'] = 100 * ((df_in['Mixed rank'] - 1)
-                               / (df_in.groupby(['Event', 'Division'])['Score'].transform('count') - 1))
+    # Generate separate and mixed gender category rank based on score and then 10s and percentile.
+    # Both rankings come from the same sorted index, so separate ones are refreshed here too.
+    with instrument.stage('rank', rows=len(df_in)):
+        results = ranking.rank_percentiles(df_in, tie_breaks=tie_breaks)
+    if schema.is_compact(df_in):
+        results = schema.compact_columns(results)
+    for col in ["Sep rank", "Sep pc", "Mixed rank", "Mixed pc"]:
+        df_in[col] = results[col]
 
     return df_in
 
@@ -70,30 +92,55 @@ def calc_delta_sep_mixed(df_in):
     return df_in
 
 
-def get_pos_changes(df_in, fpref=''):
+def calc_pos_changes(df_in, k=3):
 
     # Check we have generated separate rank and percentile already, if not do so first
     if 'Delta rank' not in df_in.columns:
         df_in = calc_delta_sep_mixed(df_in)
 
-    # Group by event, division, class, take top 3
-    df_in = df_in.sort_values(by=['Event', 'Division', 'Class', 'Score', '10'],
-                              ascending=[False, True, True, False, False], ignore_index=True)
-    delta_pos = (df_in.groupby(['Event', 'Division', 'Class'])
-                 [['Event', 'Division', 'Class', 'Sep rank', 'Mixed rank', 'Delta rank']].head(3))
+    # Group by event, division, class, take top k (3 for the podium, or e.g. 8/16/32 elimination seeds)
+    with instrument.stage('pos_changes', rows=len(df_in)):
+        rows = ranking.top_k(df_in, k, keys=['Event', 'Division', 'Class'], sort_keys=['Score', '10'])
+        delta_pos = (df_in[['Event', 'Division', 'Class', 'Sep rank', 'Mixed rank', 'Delta rank']]
+                     .iloc[rows].reset_index(drop=True))
+
+    return delta_pos
+
+
+def write_pos_changes(delta_pos, fpath='./results/', fpref='', formats=results_io.DEFAULT_FORMATS, text=True,
+                      writer=None):
+
+    # Written as the fixed-width text view, and in any machine-readable formats asked for
+    with results_io.use_writer(writer, fpath=fpath, fpref=fpref, formats=formats, text=text) as writer:
+        with instrument.stage('write:delta_pos', rows=len(delta_pos)):
+            writer.write_table('delta_pos', delta_pos, index=False)
+
 
-    with open(f'./results/{fpref}delta_pos.txt', 'w') as f:
-        f.write(delta_pos.to_string(index=False))
+def get_pos_changes(df_in, fpref='', fpath='./results/', formats=results_io.DEFAULT_FORMATS, text=True,
+                    writer=None, k=3):
+
+    delta_pos = calc_pos_changes(df_in, k=k)
+    write_pos_changes(delta_pos, fpath=fpath, fpref=fpref, formats=formats, text=text, writer=writer)
 
     return delta_pos
 
 
+def write_raw_data(df_in, fpath='./results/', fpref='', formats=results_io.DEFAULT_FORMATS, text=True,
+                   writer=None):
+
+    # Save the raw dataset, sorted by event, division, class and score
+    df_out = df_in.sort_values(by=['Event', 'Division', 'Class', 'Score', '10'],
+                               ascending=[False, True, True, False, False], ignore_index=True)
+    with results_io.use_writer(writer, fpath=fpath, fpref=fpref, formats=formats, text=text) as writer:
+        with instrument.stage('write:raw_data', rows=len(df_out)):
+            writer.write_table('raw_data', df_out[RAW_COLUMNS], index=False)
+
+
 def set_rank_band(data, band_edges=None):
     if band_edges is None:
-        band_edges = [1, 6, 11, 21, 51, np.inf]
+        band_edges = group_stats.DEFAULT_BAND_EDGES
 
-    cat_lab = [f'>{band_edges[i-1]-1}' if band_edges[i] == np.inf else f'{band_edges[i-1]}-{band_edges[i]-1}'
-               for i in range(1, len(band_edges))]
+    cat_lab = group_stats.band_labels(band_edges)
     cat_sc = (2*np.asarray(band_edges) - 1)/2
 
     Qm = pd.cut(data["Sep rank"],
@@ -105,44 +152,127 @@ def set_rank_band(data, band_edges=None):
     return data
 
 
-def conduct_t_test(data, fpath='./results/', fpref='', display_summary=False, display_all=False):
-
-    if 'Rank band' not in data.columns:
-        data = set_rank_band(data)
-
-    # Conduct ttest for all scores for each event and bowstyle(Division)
-    groups_ed = data.groupby(['Event', 'Division'])
-    with open(f'{fpath}{fpref}t_test_results_all.txt', 'w') as f:
-        to_print = groups_ed.apply(lambda df: ttest_ind(df.loc[df['Class'] == 'M']['Score'],
-                                                     df.loc[df['Class'] == 'W']['Score'],
-                                                     equal_var=False)[1]).to_string()
-        f.write(to_print)
-        if display_summary:
-            print(to_print)
-
-    groups_edc = data.groupby(['Event', 'Division', 'Class'])
-    with open(f'{fpath}{fpref}all_stats.txt', 'w') as f:
-        to_print = groups_edc['Score'].aggregate(['mean', 'std', 'max', 'min', 'count']).to_string()
-        f.write(to_print)
-        if display_summary:
-            print(to_print)
-
-    # Conduct ttest for separate bands within each event and bowstyle(Division)
-    groups_edb = data.groupby(['Event', 'Division', 'Rank band'], observed=True)
-    with open(f'{fpath}{fpref}t_test_results_bands.txt', 'w') as f:
-        to_print = groups_edb.apply(lambda df: ttest_ind(df.loc[df['Class'] == 'M']['Score'],
-                                                      df.loc[df['Class'] == 'W']['Score'],
-                                                      equal_var=False)[1]).to_string()
-        f.write(to_print)
-        if display_all:
-            print(to_print)
-
-    groups_edcb = data.groupby(['Event', 'Division', 'Rank band', 'Class'], observed=True)
-    with open(f'{fpath}{fpref}score_band_stats.txt', 'w') as f:
-        to_print = groups_edcb['Score'].aggregate(['mean', 'std', 'max', 'min', 'count']).to_string()
-        f.write(to_print)
-        if display_all:
-            print(to_print)
+def calc_t_test_tables(data, method='welch', **resample_args):
+
+    with instrument.stage('t_test', rows=len(data)):
+        if 'Rank band' not in data.columns:
+            data = set_rank_band(data)
+
+        tables = {}
+
+        # Count, sum and sum of squares of scores for each event, bowstyle(Division), rank band and class
+        # in one aggregation. Overall and band statistics and Welch t-tests all derive from these.
+        sums_edbc = group_stats.sufficient_stats(data, ['Event', 'Division', 'Rank band'])
+        sums_edc = (sums_edbc.groupby(['Event', 'Division', 'Class'], observed=True)
+                    .agg({'count': 'sum', 'sum': 'sum', 'sumsq': 'sum', 'max': 'max', 'min': 'min'}))
+
+        # Conduct ttest for all scores for each event and bowstyle(Division)
+        tables['t_test_results_all'] = group_stats.welch_by_group(sums_edc)['p']
+        tables['all_stats'] = group_stats.describe(sums_edc)
+
+        # Conduct ttest for separate bands within each event and bowstyle(Division)
+        tables['t_test_results_bands'] = group_stats.welch_by_group(sums_edbc)['p']
+        tables['score_band_stats'] = group_stats.describe(sums_edbc)
+
+        # Resampling tests suit the small groups (top bands, barebow/longbow) better than the t-test.
+        # The test results hold the p-values whatever the method, the bootstrap intervals are tabled separately.
+        if method == 'permutation':
+            tables['t_test_results_all'] = resampling.permutation_test(data, ['Event', 'Division'],
+                                                                       **resample_args)['p']
+            tables['t_test_results_bands'] = resampling.permutation_test(data, ['Event', 'Division', 'Rank band'],
+                                                                         **resample_args)['p']
+        elif method == 'bootstrap':
+            for name, keys in [('all', ['Event', 'Division']), ('bands', ['Event', 'Division', 'Rank band'])]:
+                results = resampling.bootstrap_test(data, keys, **resample_args)
+                tables[f't_test_results_{name}'] = results['p']
+                tables[f'bootstrap_ci_{name}'] = results[['diff', 'ci_low', 'ci_high']]
+        elif method != 'welch':
+            raise ValueError(f"Unknown test method '{method}', expected 'welch', 'permutation' or 'bootstrap'")
+
+    return tables
+
+
+# Tables written by conduct_t_test, and whether each is part of the summary (or only of the full display)
+T_TEST_TABLES = {
+    't_test_results_all': True,
+    'all_stats': True,
+    't_test_results_bands': False,
+    'score_band_stats': False,
+}
+
+# Confidence intervals of the difference in means, also written by conduct_t_test with method='bootstrap'
+BOOTSTRAP_TABLES = {
+    'bootstrap_ci_all': True,
+    'bootstrap_ci_bands': False,
+}
+
+
+def write_t_test_tables(tables, fpath='./results/', fpref='', display_summary=False, display_all=False,
+                        formats=results_io.DEFAULT_FORMATS, text=True, writer=None):
+
+    with results_io.use_writer(writer, fpath=fpath, fpref=fpref, formats=formats, text=text) as writer:
+        with instrument.stage('write:t_test'):
+            for name, summary in {**T_TEST_TABLES, **BOOTSTRAP_TABLES}.items():
+                if name not in tables:
+                    continue
+                writer.write_table(name, tables[name])
+                if (display_summary and summary) or (display_all and not summary):
+                    print(tables[name].to_string())
+
+
+def conduct_t_test(data, fpath='./results/', fpref='', display_summary=False, display_all=False, method='welch',
+                   formats=results_io.DEFAULT_FORMATS, text=True, writer=None, **resample_args):
+
+    # method may be 'welch' (default), 'permutation' or 'bootstrap', see resampling for the options.
+    # All give the same t_test_results tables of p-values, bootstrap adds the bootstrap_ci tables.
+    tables = calc_t_test_tables(data, method=method, **resample_args)
+    write_t_test_tables(tables, fpath=fpath, fpref=fpref, display_summary=display_summary, display_all=display_all,
+                        formats=formats, text=text, writer=writer)
+
+    return None
+
+
+def calc_rank_test_tables(data):
+
+    with instrument.stage('rank_tests', rows=len(data)):
+        if 'Rank band' not in data.columns:
+            data = set_rank_band(data)
+
+        # Mann-Whitney U and KS tests of the score distributions, which are skewed and capped, for each
+        # event and bowstyle(Division) and for each rank band. Both share the order of the mixed ranking.
+        order = rank_tests.mixed_order(data)
+        tables = {
+            'rank_tests_all': rank_tests.rank_tests(data, ['Event', 'Division'], order=order),
+            'rank_tests_bands': rank_tests.rank_tests(data, ['Event', 'Division', 'Rank band'], order=order),
+        }
+
+    return tables
+
+
+# Tables written by conduct_rank_tests, and whether each is part of the summary
+RANK_TEST_TABLES = {
+    'rank_tests_all': True,
+    'rank_tests_bands': False,
+}
+
+
+def write_rank_test_tables(tables, fpath='./results/', fpref='', display_summary=False, display_all=False,
+                           formats=results_io.DEFAULT_FORMATS, text=True, writer=None):
+
+    with results_io.use_writer(writer, fpath=fpath, fpref=fpref, formats=formats, text=text) as writer:
+        with instrument.stage('write:rank_tests'):
+            for name, summary in RANK_TEST_TABLES.items():
+                writer.write_table(name, tables[name])
+                if (display_summary and summary) or (display_all and not summary):
+                    print(tables[name].to_string())
+
+
+def conduct_rank_tests(data, fpath='./results/', fpref='', display_summary=False, display_all=False,
+                       formats=results_io.DEFAULT_FORMATS, text=True, writer=None):
+
+    tables = calc_rank_test_tables(data)
+    write_rank_test_tables(tables, fpath=fpath, fpref=fpref, display_summary=display_summary,
+                           display_all=display_all, formats=formats, text=text, writer=writer)
 
     return None
 
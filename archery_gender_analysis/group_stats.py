@@ -0,0 +1,354 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Group statistics and vectorised Welch t-tests from sufficient statistics
+#
+
+import numpy as np
+import pandas as pd
+
+STATS_COLUMNS = ['mean', 'std', 'max', 'min', 'count']
+
+# Rank bands of set_rank_band: 1-5, 6-10, 11-20, 21-50 and >50
+DEFAULT_BAND_EDGES = [1, 6, 11, 21, 51, np.inf]
+
+
+def sufficient_stats(data, keys, value='Score', cls='Class'):
+    """ function sufficient_stats
+    count, sum, sum of squares, max and min of a value for each group and class
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        dataframe containing the key, class and value columns
+    keys : list of str
+        columns defining the groups
+    value : str
+        column to summarise
+    cls : str
+        column splitting each group into the classes to compare
+
+    Returns
+    -------
+    pandas dataframe
+        columns count, sum, sumsq, max and min indexed by keys and class
+
+    """
+    values = data[value]
+    frame = data[list(keys) + [cls]].assign(_value=values, _square=values.astype(np.float64)**2)
+    grouped = frame.groupby(list(keys) + [cls], observed=True)
+    return grouped.agg(count=('_value', 'count'), sum=('_value', 'sum'), sumsq=('_square', 'sum'),
+                       max=('_value', 'max'), min=('_value', 'min'))
+
+
+def _mean_var(count, total, sumsq):
+    count = np.asarray(count, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    sumsq = np.asarray(sumsq, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        var = (sumsq - total * mean) / (count - 1)
+    # Sample (ddof=1) variance is undefined for fewer than two values
+    var = np.where(count > 1, np.maximum(var, 0.0), np.nan)
+    return mean, var
+
+
+def describe(sums):
+    """ function describe
+    mean, std, max, min and count of each group from its sufficient statistics
+
+    Parameters
+    ----------
+    sums : pandas dataframe
+        output of sufficient_stats
+
+    Returns
+    -------
+    pandas dataframe
+        the same table as aggregating ['mean', 'std', 'max', 'min', 'count'] on the raw data
+
+    """
+    mean, var = _mean_var(sums['count'].to_numpy(), sums['sum'].to_numpy(), sums['sumsq'].to_numpy())
+    return pd.DataFrame({'mean': mean, 'std': np.sqrt(var), 'max': sums['max'], 'min': sums['min'],
+                         'count': sums['count']}, index=sums.index)
+
+
+def welch_t_test(n1, mean1, var1, n2, mean2, var2):
+    """ function welch_t_test
+    Welch's unequal variances t-test for arrays of sample statistics
+
+    Equivalent to scipy.stats.ttest_ind(..., equal_var=False) for each element.
+
+    Parameters
+    ----------
+    n1, mean1, var1 : array_like
+        size, mean and (ddof=1) variance of the first samples
+    n2, mean2, var2 : array_like
+        size, mean and (ddof=1) variance of the second samples
+
+    Returns
+    -------
+    t : numpy array
+        t statistics
+    dof : numpy array
+        Welch-Satterthwaite degrees of freedom
+    p : numpy array
+        two-sided p-values
+
+    """
+    # Deferred so that scipy is only loaded by analyses running a test
+    from scipy.special import stdtr
+
+    n1 = np.asarray(n1, dtype=np.float64)
+    n2 = np.asarray(n2, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se1 = np.asarray(var1, dtype=np.float64) / n1
+        se2 = np.asarray(var2, dtype=np.float64) / n2
+        t = (np.asarray(mean1, dtype=np.float64) - np.asarray(mean2, dtype=np.float64)) / np.sqrt(se1 + se2)
+        dof = (se1 + se2)**2 / (se1**2 / (n1 - 1) + se2**2 / (n2 - 1))
+        # As for scipy, samples without variance take one degree of freedom, so differing means give p = 0
+        dof = np.where((se1 + se2 == 0) & (n1 > 1) & (n2 > 1), 1.0, dof)
+        p = 2 * stdtr(dof, -np.abs(t))
+
+    # As for scipy, samples with fewer than two values give no result
+    invalid = (n1 < 2) | (n2 < 2) | np.isnan(n1) | np.isnan(n2)
+    return np.where(invalid, np.nan, t), np.where(invalid, np.nan, dof), np.where(invalid, np.nan, p)
+
+
+def welch_by_group(sums, cls='Class', classes=('M', 'W')):
+    """ function welch_by_group
+    Welch t-test between two classes for every group of a sufficient statistics table
+
+    Parameters
+    ----------
+    sums : pandas dataframe
+        output of sufficient_stats
+    cls : str
+        index level holding the classes
+    classes : tuple of str
+        the two classes to compare
+
+    Returns
+    -------
+    pandas dataframe
+        columns t, dof and p indexed by the group keys
+
+    """
+    groups = sums.index.droplevel(cls).unique()
+    stats = {}
+    for c in classes:
+        try:
+            class_sums = sums.xs(c, level=cls).reindex(groups)
+        except KeyError:
+            class_sums = pd.DataFrame(np.nan, index=groups, columns=sums.columns)
+        mean, var = _mean_var(class_sums['count'], class_sums['sum'], class_sums['sumsq'])
+        stats[c] = (class_sums['count'].to_numpy(dtype=np.float64), mean, var)
+
+    t, dof, p = welch_t_test(*stats[classes[0]], *stats[classes[1]])
+    return pd.DataFrame({'t': t, 'dof': dof, 'p': p}, index=groups)
+
+
+def band_labels(band_edges):
+    # Labels of the rank bands between consecutive edges, e.g. '1-5' and '>50'
+    return [f'>{band_edges[i-1]-1}' if band_edges[i] == np.inf else f'{band_edges[i-1]}-{band_edges[i]-1}'
+            for i in range(1, len(band_edges))]
+
+
+class BandSweep:
+    """ class BandSweep
+    band statistics and Welch t-tests for any number of rank band configurations
+
+    Rows are sorted once by rank within each group and class, and prefix sums of the count,
+    value and value squared are taken. Statistics of any band are then differences of the
+    prefix sums at its edges, found by binary search, so each configuration costs
+    O(groups x bands) without touching the rows again. Where the ranks order the values, as
+    Sep rank does within an event, division and class, the max and min of a band are its first
+    and last values, otherwise they take one vectorised pass over the rows.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        dataframe containing the key, class, rank and value columns
+    keys : list of str
+        columns defining the groups that are split into bands
+    rank : str
+        column banded on
+    value : str
+        column to summarise and compare
+    cls : str
+        column holding the class of each row
+    classes : tuple of str
+        the two classes to compare
+
+    """
+
+    def __init__(self, data, keys=('Event', 'Division'), rank='Sep rank', value='Score', cls='Class',
+                 classes=('M', 'W')):
+        self.keys = list(keys)
+        self.classes = tuple(classes)
+        data = data[data[cls].isin(classes) & data[rank].notna() & data[value].notna()]
+
+        grouped = data.groupby(self.keys + [cls], observed=True)
+        index = grouped.size().index
+        codes = grouped.ngroup().to_numpy()
+        ranks = data[rank].to_numpy(dtype=np.float64)
+        order = np.lexsort([ranks, codes])
+        self.ranks = ranks[order]
+        self.values = data[value].to_numpy(dtype=np.float64)[order]
+
+        # Groups and ranks combined into one sorted key, every rank is below the scale
+        self.scale = (self.ranks.max(initial=0) + 2)
+        self.sorted_keys = codes[order] * self.scale + self.ranks
+        self.cum_sum = np.concatenate([[0.0], np.cumsum(self.values)])
+        self.cum_sumsq = np.concatenate([[0.0], np.cumsum(self.values**2)])
+        # When ranks are within the groups (e.g. Sep rank by Event, Division and Class) they order
+        # the values, otherwise band maxima and minima are reduced over the rows
+        new_group = np.diff(codes[order], prepend=-1) != 0
+        self.ranks_order_values = bool(np.all((np.diff(self.values, prepend=np.inf) <= 0) | new_group))
+        self.padded_values = np.append(self.values, np.nan)
+
+        # Group number of each class within each group of keys, -1 where it has no rows
+        self.index = index.droplevel(cls).unique()
+        self.class_groups = {}
+        for c in self.classes:
+            groups = np.full(len(self.index), -1, dtype=np.int64)
+            if c in index.get_level_values(cls):
+                mask = index.get_level_values(cls) == c
+                groups[self.index.get_indexer(index[mask].droplevel(cls))] = np.flatnonzero(mask)
+            self.class_groups[c] = groups
+
+    def _class_stats(self, groups, lo, hi):
+        # count, mean, (ddof=1) variance, max and min of each group (rows) in each band (columns)
+        first = np.searchsorted(self.sorted_keys, groups[:, None] * self.scale + lo[None, :], side='left')
+        last = np.searchsorted(self.sorted_keys, groups[:, None] * self.scale + hi[None, :], side='left')
+        count = np.where(groups[:, None] < 0, 0, last - first)
+        total = np.where(count > 0, self.cum_sum[last] - self.cum_sum[first], np.nan)
+        sumsq = np.where(count > 0, self.cum_sumsq[last] - self.cum_sumsq[first], np.nan)
+        mean, var = _mean_var(count, total, sumsq)
+        has_rows = count > 0
+        if self.ranks_order_values:
+            vmax = self.values[np.where(has_rows, first, 0)]
+            vmin = self.values[np.where(has_rows, last - 1, 0)]
+        else:
+            # Segment reductions over the rows, with a sentinel so that bands may end at the last row
+            bounds = np.stack([first.ravel(), last.ravel()], axis=1).ravel()
+            vmax = np.maximum.reduceat(self.padded_values, bounds)[::2].reshape(count.shape)
+            vmin = np.minimum.reduceat(self.padded_values, bounds)[::2].reshape(count.shape)
+        return count, mean, var, np.where(has_rows, vmax, np.nan), np.where(has_rows, vmin, np.nan)
+
+    def _columns(self, band_edges):
+        # Statistics of every group (outer) and band (inner) as flat arrays, and the band labels
+        edges = np.asarray(band_edges, dtype=np.float64)
+        # Edges are kept within a group's range of keys, an infinite upper edge becoming a rank above
+        # every rank in the data and a lower edge at or below zero one below every rank
+        edges = np.clip(edges, 0, self.scale - 1)
+        lo, hi = edges[:-1], edges[1:]
+
+        columns = {}
+        stats = {}
+        for c in self.classes:
+            count, mean, var, vmax, vmin = self._class_stats(self.class_groups[c], lo, hi)
+            stats[c] = (count, mean, var)
+            columns.update({f'{c} count': count, f'{c} mean': mean, f'{c} std': np.sqrt(var),
+                            f'{c} max': vmax, f'{c} min': vmin})
+        t, dof, p = welch_t_test(*stats[self.classes[0]], *stats[self.classes[1]])
+        columns.update({'t': t, 'dof': dof, 'p': p})
+        return {name: np.asarray(values).ravel() for name, values in columns.items()}, band_labels(band_edges)
+
+    def _frame(self, names, configs):
+        # One table from the columns of each configuration. The index is built from integer codes,
+        # as building it from tuples would be most of the time taken for many configurations.
+        if isinstance(self.index, pd.MultiIndex):
+            key_levels, key_codes = list(self.index.levels), list(self.index.codes)
+        else:
+            key_levels, key_codes = [self.index], [np.arange(len(self.index))]
+
+        label_codes = {}
+        codes = [[] for _ in range(len(key_codes) + 2)]
+        columns = {}
+        for i, (config_columns, labels) in enumerate(configs):
+            observed = sum(config_columns[f'{c} count'] for c in self.classes) > 0
+            band_codes = np.array([label_codes.setdefault(label, len(label_codes)) for label in labels])
+            codes[0].append(np.full(observed.sum(), i))
+            for level, level_codes in zip(codes[1:-1], key_codes):
+                level.append(np.repeat(level_codes, len(labels))[observed])
+            codes[-1].append(np.tile(band_codes, len(self.index))[observed])
+            for name, values in config_columns.items():
+                columns.setdefault(name, []).append(values[observed])
+
+        index = pd.MultiIndex(levels=[list(names)] + key_levels + [list(label_codes)],
+                              codes=[np.concatenate(level) for level in codes],
+                              names=['Bands'] + self.keys + ['Rank band'], verify_integrity=False)
+        return pd.DataFrame({name: np.concatenate(values) for name, values in columns.items()}, index=index)
+
+    def stats(self, band_edges=None):
+        """ method stats
+        statistics of each class and Welch t-test between them for every group and band
+
+        Parameters
+        ----------
+        band_edges : list
+            rank band edges, as for set_rank_band. Band i holds ranks from band_edges[i] to
+            below band_edges[i+1].
+
+        Returns
+        -------
+        pandas dataframe
+            '<class> <stat>' columns of count, mean, std, max and min of each class, and t,
+            dof and p of the test, indexed by the keys and 'Rank band'. Bands with no rows
+            are dropped.
+
+        """
+        if band_edges is None:
+            band_edges = DEFAULT_BAND_EDGES
+        return self.sweep([band_edges]).droplevel('Bands')
+
+    def sweep(self, edge_sets):
+        """ method sweep
+        statistics and tests for many rank band configurations
+
+        Parameters
+        ----------
+        edge_sets : list or dict
+            band edges of each configuration, a dict maps configuration names to edges
+
+        Returns
+        -------
+        pandas dataframe
+            the tables of stats for every configuration, with an outer 'Bands' index level
+            holding the name or position of the configuration
+
+        """
+        if not isinstance(edge_sets, dict):
+            edge_sets = dict(enumerate(edge_sets))
+        return self._frame(edge_sets, [self._columns(edges) for edges in edge_sets.values()])
+
+
+def band_sweep(data, edge_sets, keys=('Event', 'Division'), rank='Sep rank', value='Score'):
+    """ function band_sweep
+    rank band statistics and Welch t-tests between genders for many band configurations
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        ranked data, as from calc_delta_sep_mixed
+    edge_sets : list or dict
+        band edges of each configuration, see BandSweep.sweep
+    keys : list of str
+        columns defining the groups that are split into bands
+    rank : str
+        column banded on
+    value : str
+        column compared
+
+    Returns
+    -------
+    pandas dataframe
+        see BandSweep.sweep
+
+    """
+    return BandSweep(data, keys=keys, rank=rank, value=value).sweep(edge_sets)
@@ -0,0 +1,266 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Persistent on-disk cache of scraped pages with revalidation and LRU eviction
+#
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+import requests
+
+from archery_gender_analysis import instrument
+
+INDEX_FILE = 'index.json'
+
+# Cache the scraper fetches through unless given another
+DEFAULT_CACHE_DIR = './data/.http_cache'
+
+
+def closed_tournament(url, years_open=1):
+    """ function closed_tournament
+    decide whether a page belongs to a tournament whose results can no longer change
+
+    IANSEO urls are of the form .../TourData/<year>/<id>/..., so results from before the
+    current season are treated as final.
+
+    Parameters
+    ----------
+    url : str
+        url of the page
+    years_open : int
+        number of years, including the current one, for which results may still change
+
+    Returns
+    -------
+    bool
+        True if the page can be cached without revalidation
+
+    """
+    match = re.search(r'/TourData/(\d{4})/', url)
+    if match is None:
+        return False
+    return int(match.group(1)) <= datetime.date.today().year - years_open
+
+
+class ResponseCache:
+    """ class ResponseCache
+    on-disk cache of page responses keyed by url
+
+    Entries for closed tournaments are served without contacting the server, all others
+    are revalidated with If-None-Match/If-Modified-Since. The least recently used entries
+    are evicted once the cache exceeds max_bytes or max_entries.
+
+    Parameters
+    ----------
+    cache_dir : str
+        directory to hold the cached pages
+    max_bytes : int
+        maximum total size of the cached pages
+    max_entries : int
+        maximum number of cached pages, unlimited if None
+    immutable : callable
+        function of the url returning True if the page never changes
+    offline : bool
+        serve only from the cache, raising KeyError on a miss
+
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=512 * 2**20, max_entries=None,
+                 immutable=closed_tournament, offline=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.immutable = immutable
+        self.offline = offline
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(os.path.join(cache_dir, INDEX_FILE)) as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def __contains__(self, url):
+        return url in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def total_bytes(self):
+        return sum(entry['size'] for entry in self._index.values())
+
+    def get(self, url, session=None, raise_server_errors=False):
+        """ method get
+        text of a page, from the cache where possible
+
+        Parameters
+        ----------
+        url : str
+            url of the page
+        session : requests.Session
+            session to fetch through. A plain request is made if None.
+        raise_server_errors : bool
+            raise requests.HTTPError for server error or rate limit (429) responses, rather
+            than returning their text as if it were the page
+
+        Returns
+        -------
+        str
+            text of the page
+
+        """
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is not None:
+                entry = dict(entry)
+
+        if entry is not None and (entry['immutable'] or self.offline):
+            text = self._hit(url, entry)
+            if text is not None:
+                return text
+            entry = None
+        if self.offline:
+            raise KeyError(f'{url} is not in the cache and the cache is offline')
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        getter = requests if session is None else session
+        page = getter.get(url, headers=headers)
+        instrument.count('http_requests')
+        instrument.count('http_bytes', len(page.content))
+
+        if entry is not None and page.status_code == 304:
+            text = self._hit(url, entry)
+            if text is not None:
+                return text
+            # Body has gone missing since the request was made, fetch it unconditionally
+            page = getter.get(url)
+            instrument.count('http_requests')
+            instrument.count('http_bytes', len(page.content))
+        if raise_server_errors and (page.status_code >= 500 or page.status_code == 429):
+            page.raise_for_status()
+        if page.status_code != 200:
+            # Only successful responses are cached
+            return page.text
+
+        self._store(url, page)
+        return page.text
+
+    def _body_file(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest() + '.body')
+
+    def _hit(self, url, entry):
+        try:
+            with open(self._body_file(url), 'rb') as f:
+                content = f.read()
+        except OSError:
+            # Body has gone missing, forget the entry so it is fetched again
+            with self._lock:
+                self._index.pop(url, None)
+                self._save_index()
+            return None
+
+        with self._lock:
+            if url in self._index:
+                self._index[url]['last_used'] = time.time()
+        instrument.count('cache_hits')
+        return content.decode(entry['encoding'] or 'utf-8', errors='replace')
+
+    def _store(self, url, page):
+        content = page.content
+        body_file = self._body_file(url)
+        with open(body_file + '.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(body_file + '.tmp', body_file)
+
+        with self._lock:
+            self._index[url] = {
+                'size': len(content),
+                'etag': page.headers.get('ETag'),
+                'last_modified': page.headers.get('Last-Modified'),
+                'encoding': page.encoding or page.apparent_encoding,
+                'immutable': bool(self.immutable(url)) if self.immutable else False,
+                'last_used': time.time(),
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        total = self.total_bytes
+        lru = sorted(self._index, key=lambda url: self._index[url]['last_used'])
+        for url in lru:
+            over_size = total > self.max_bytes
+            over_count = self.max_entries is not None and len(self._index) > self.max_entries
+            if not (over_size or over_count):
+                break
+            total -= self._index.pop(url)['size']
+            try:
+                os.remove(self._body_file(url))
+            except OSError:
+                pass
+
+    def _save_index(self):
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, prefix='.index_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_file, os.path.join(self.cache_dir, INDEX_FILE))
+
+    def flush(self):
+        """ method flush
+        write the access times of the cache index to disk
+
+        """
+        with self._lock:
+            self._save_index()
+
+    def clear(self):
+        """ method clear
+        remove all entries from the cache
+
+        """
+        with self._lock:
+            for url in list(self._index):
+                try:
+                    os.remove(self._body_file(url))
+                except OSError:
+                    pass
+            self._index = {}
+            self._save_index()
+
+
+def open_cache(cache):
+    """ function open_cache
+    response cache to fetch through
+
+    Parameters
+    ----------
+    cache : ResponseCache, str or None
+        a cache, the directory of one, or None to fetch without a cache
+
+    Returns
+    -------
+    ResponseCache or None
+        the cache, opened if given as a directory
+
+    """
+    if isinstance(cache, (str, os.PathLike)):
+        return ResponseCache(cache)
+    return cache
@@ -0,0 +1,189 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Single pass parser for IANSEO qualification tables
+#
+
+import lxml.html
+import numpy as np
+import pandas as pd
+
+# Output column -> header labels used for it in the IANSEO table layouts
+COLUMN_LABELS = {
+    'Category Rank': ('Pos.', 'Rank'),
+    'Athlete': ('Athlete', 'Name'),
+    'Score': ('Tot.', 'Score'),
+    '10': ('10',),
+    '9': ('9',),
+}
+INT_COLUMNS = ['Category Rank', 'Score', '10', '9']
+
+
+def _span(cell, attr, default):
+    try:
+        span = int(cell.get(attr, 1))
+    except ValueError:
+        span = 1
+    # A span of 0 means "to the end", approximate that with the default
+    return span if span > 0 else default
+
+
+def iter_grid_rows(rows):
+    """ function iter_grid_rows
+    expand the cells of html table rows onto a grid, accounting for rowspan and colspan
+
+    Parameters
+    ----------
+    rows : list of lxml elements
+        <tr> elements of the table
+
+    Yields
+    ------
+    dict
+        mapping of column index to cell text for each row
+
+    """
+    pending = {}  # column -> [rows remaining, text] for active rowspans
+    n_rows = len(rows)
+    for r, row in enumerate(rows):
+        grid_row = {}
+        for col, span in list(pending.items()):
+            grid_row[col] = span[1]
+            span[0] -= 1
+            if span[0] == 0:
+                del pending[col]
+
+        col = 0
+        for cell in row.iterchildren('td', 'th'):
+            while col in grid_row:
+                col += 1
+            text = cell.text_content().strip()
+            rowspan = _span(cell, 'rowspan', n_rows - r)
+            colspan = _span(cell, 'colspan', 1)
+            for c in range(col, col + colspan):
+                grid_row[c] = text
+                if rowspan > 1:
+                    pending[c] = [rowspan - 1, text]
+            col += colspan
+
+        yield grid_row
+
+
+def _header_columns(header):
+    columns = {}
+    for out_col, labels in COLUMN_LABELS.items():
+        for col in sorted(header):
+            if header[col] in labels:
+                columns[out_col] = col
+                break
+        else:
+            raise ValueError(f'No {out_col} column in qualification table header')
+    return columns
+
+
+def _to_int(text):
+    # Integer value of a cell, None for anything else, e.g. DSQ, DNS or a blank
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def parse_qual_table(page_text):
+    """ function parse_qual_table
+    extract the qualification results of an IANSEO category page into typed arrays
+
+    Both the old layout (a table with class Griglia, one row per athlete) and the new
+    layout (first table on the page, a title row, a header row, then three rows per
+    athlete) are supported.
+
+    Parameters
+    ----------
+    page_text : str or bytes
+        html of the category page
+
+    Returns
+    -------
+    dict
+        mapping of column name to numpy array of results, with a boolean 'Unscored' array
+        flagging athletes whose score is not a number (DSQ, DNS or blank), whose results are
+        zero. Other cells that are not numbers are missing, making their column float.
+
+    """
+    root = lxml.html.fromstring(page_text)
+
+    tables = root.xpath('//table[contains(concat(" ", normalize-space(@class), " "), " Griglia ")]')
+    if tables:
+        header_idx, data_step = 0, 1
+    else:
+        tables = root.xpath('//table')
+        header_idx, data_step = 1, 3
+    if not tables:
+        raise ValueError('No qualification table found')
+
+    rows = tables[0].xpath('./tr | ./thead/tr | ./tbody/tr | ./tfoot/tr')
+    if len(rows) <= header_idx:
+        raise ValueError('No qualification table header found')
+
+    n_data = len(range(header_idx + 1, len(rows), data_step))
+    results = {col: np.zeros(n_data, dtype=np.int64) for col in INT_COLUMNS}
+    results['Athlete'] = np.empty(n_data, dtype=object)
+    results['Unscored'] = np.zeros(n_data, dtype=bool)
+    missing = {col: np.zeros(n_data, dtype=bool) for col in INT_COLUMNS}
+
+    columns = None
+    n = 0
+    for r, grid_row in enumerate(iter_grid_rows(rows)):
+        if r == header_idx:
+            columns = _header_columns(grid_row)
+        elif r > header_idx and (r - header_idx - 1) % data_step == 0:
+            results['Athlete'][n] = grid_row.get(columns['Athlete'], '')
+            if _to_int(grid_row.get(columns['Score'], '')) is None:
+                results['Unscored'][n] = True
+            else:
+                for col in INT_COLUMNS:
+                    value = _to_int(grid_row.get(columns[col], ''))
+                    if value is None:
+                        missing[col][n] = True
+                    else:
+                        results[col][n] = value
+            n += 1
+
+    for col in INT_COLUMNS:
+        if missing[col].any():
+            results[col] = np.where(missing[col], np.nan, results[col])
+    return results
+
+
+def parse_cat(page_text, div, gen):
+    """ function parse_cat
+    parse an IANSEO category page into the table used for analysis
+
+    Parameters
+    ----------
+    page_text : str or bytes
+        html of the category page
+    div : str
+        division (bowstyle) of the page
+    gen : str
+        gender class of the page
+
+    Returns
+    -------
+    table : pandas dataframe
+        Category Rank, Athlete, Score, 10 and 9 for each athlete with Event, Division, Class.
+        Unlike the full parser the Country and distance columns are not extracted. Athletes
+        without a score (DSQ, DNS) have zero results, so are dropped with the DNS scores.
+
+    """
+    results = parse_qual_table(page_text)
+    table = pd.DataFrame({col: results[col] for col in ['Category Rank', 'Athlete', 'Score', '10', '9']})
+    table["Event"] = f'{div}{gen}'
+    table["Division"] = div
+    table["Class"] = gen
+
+    return table
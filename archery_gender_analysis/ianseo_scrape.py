@@ -2,32 +2,160 @@
 #                 @jatkinson1000
 #
 # Date Created  : 2022-07-18
-# Last Modified : 2022-07-18
+# Last Modified : 2026-10-17
 #
 # Summary       : AGB Gender investigation for indoor competition.
 #                 Code to scrape results from ianseo pages into a csv for processing
 #
 
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from itertools import product
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
+from itertools import product
 
-def get_cat(url_main, url_suffix, div, gen):
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from archery_gender_analysis import http_cache, ianseo_parse, instrument
+
+# Divisions in the order they are combined, and whether each is expected at every event
+DIVISIONS = ['R', 'C', 'L', 'B']
+REQUIRED_DIVISIONS = ['R', 'C']
+GENDERS = ['M', 'W']
+
+
+def make_session(pool_size=8, max_retries=3):
+    """ function make_session
+    create a requests session with a connection pool shared by all fetches
+
+    Parameters
+    ----------
+    pool_size : int
+        maximum number of pooled connections per host
+    max_retries : int
+        number of retries for failed connections
+
+    Returns
+    -------
+    requests.Session
+        session with pooled adapters mounted for http and https
+
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=max_retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_page(url, session=None, cache=None, raise_server_errors=False):
+    """ function fetch_page
+    download a single page
+
+    Parameters
+    ----------
+    url : str
+        url of the page
+    session : requests.Session
+        session to fetch through. A plain request is made if None.
+    cache : http_cache.ResponseCache
+        response cache to serve the page from where possible
+    raise_server_errors : bool
+        raise requests.HTTPError for server error or rate limit (429) responses, rather than
+        returning their text as if it were the page
+
+    Returns
+    -------
+    str
+        text of the page
+
+    """
+    if cache is not None:
+        return cache.get(url, session=session, raise_server_errors=raise_server_errors)
+    if session is None:
+        page = requests.get(url)
+    else:
+        page = session.get(url)
+    instrument.count('http_requests')
+    instrument.count('http_bytes', len(page.content))
+    if raise_server_errors and (page.status_code >= 500 or page.status_code == 429):
+        page.raise_for_status()
+    return page.text
+
+
+def fetch_pages(urls, max_workers=8, session=None, cache=None):
+    """ function fetch_pages
+    download a set of pages concurrently, fetching each distinct url exactly once
+
+    Parameters
+    ----------
+    urls : iterable of str
+        urls of the pages
+    max_workers : int
+        maximum number of concurrent requests
+    session : requests.Session
+        session to fetch through. A pooled session sized to max_workers is created if None.
+    cache : http_cache.ResponseCache
+        response cache to serve pages from where possible
+
+    Returns
+    -------
+    dict
+        mapping of url to page text
+
+    """
+    urls = list(dict.fromkeys(urls))
+    if session is None:
+        session = make_session(pool_size=max_workers)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = executor.map(lambda url: fetch_page(url, session=session, cache=cache), urls)
+        return dict(zip(urls, pages))
+
+
+def cat_url(url_main, div, gen):
+    return f'{url_main.rstrip("/")}/IQ{div}{gen}.php'
+
+
+def parse_cat(page_text, div, gen, fast=False):
+    """ function parse_cat
+    parse the qualification table of an IANSEO category page
+
+    Parameters
+    ----------
+    page_text : str
+        html of the category page
+    div : str
+        division (bowstyle) of the page
+    gen : str
+        gender class of the page
+    fast : bool
+        use the single pass parser, which only extracts the columns used in the analysis: Category
+        Rank, Athlete, Score, 10 and 9 as integers, without Country or the distance columns.
+        Athletes without a score (DSQ, DNS) have zero results, as DSQ rows do with the full parser.
+
+    Returns
+    -------
+    table : pandas dataframe
+        qualification results for the category
+
+    """
+    if fast:
+        return ianseo_parse.parse_cat(page_text, div, gen)
+
+    # Only the full parser needs BeautifulSoup
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page_text, 'lxml')
 
     # Old IANSEO Table layout
     try:
-        page = requests.get(f'{url_main}/{url_suffix}')
-        soup = BeautifulSoup(page.text, 'lxml')
         table1 = soup.find('table', {'class': 'Griglia'})
 
         table = pd.read_html(StringIO(str(table1)))[0]
 
-    # New IANSEO Table layout
+    # New IANSEO Table layout, parsed from the same download
     except ImportError:
-        page = requests.get(f'{url_main}/{url_suffix}')
-        soup = BeautifulSoup(page.text, 'lxml')
         table = table_to_2d(soup.find('table'))
 
         # Remove excess headers/rows without useful data
@@ -50,6 +178,107 @@ def get_cat(url_main, url_suffix, div, gen):
     return table
 
 
+def get_cat(url_main, url_suffix, div, gen, session=None, cache=http_cache.DEFAULT_CACHE_DIR, fast=False):
+
+    # Pages are served from the response cache where possible, pass cache=None to always download
+    page_text = fetch_page(f'{url_main}/{url_suffix}', session=session, cache=http_cache.open_cache(cache))
+
+    return parse_cat(page_text, div, gen, fast=fast)
+
+
+def combine_cats(pages, url_main, divisions=None, fast=False):
+    """ function combine_cats
+    parse the downloaded category pages of one tournament into a single table
+
+    Recurve and compound are assumed to always exist, other divisions are dropped if
+    either of their pages does not contain a results table.
+
+    Parameters
+    ----------
+    pages : dict
+        mapping of url to page text, as returned by fetch_pages
+    url_main : str
+        base url of the tournament
+    divisions : list of str
+        divisions to combine, defaults to all of DIVISIONS
+    fast : bool
+        use the single pass parser, which only extracts the columns used in the analysis
+
+    Returns
+    -------
+    pandas dataframe
+        qualification results for all categories of the tournament
+
+    """
+    if divisions is None:
+        divisions = DIVISIONS
+
+    tables = []
+    for div in divisions:
+        try:
+            div_tables = [parse_cat(pages[cat_url(url_main, div, gen)], div, gen, fast=fast) for gen in GENDERS]
+        except (ValueError, AttributeError):
+            if div in REQUIRED_DIVISIONS:
+                raise
+            continue
+        tables += div_tables
+
+    return pd.concat(tables, ignore_index=True)
+
+
+def get_tournaments(urls, divisions=None, max_workers=8, session=None, cache=http_cache.DEFAULT_CACHE_DIR,
+                    fast=False):
+    """ function get_tournaments
+    fetch all category pages for a set of tournaments in parallel
+
+    Parameters
+    ----------
+    urls : dict
+        mapping of tournament identifier to base url of the tournament
+    divisions : list of str
+        divisions to fetch, defaults to all of DIVISIONS
+    max_workers : int
+        maximum number of concurrent requests
+    session : requests.Session
+        session to fetch through. A pooled session is created if None.
+    cache : http_cache.ResponseCache or str
+        response cache to serve pages from where possible, or its directory. Closed tournaments
+        are then never downloaded twice and others only when changed. None downloads every page.
+    fast : bool
+        use the single pass parser, which only extracts the columns used in the analysis
+
+    Returns
+    -------
+    dict
+        mapping of tournament identifier to combined results table
+
+    """
+    if divisions is None:
+        divisions = DIVISIONS
+    cache = http_cache.open_cache(cache)
+
+    page_urls = [cat_url(url_main, div, gen)
+                 for url_main in urls.values() for div in divisions for gen in GENDERS]
+    with instrument.stage('fetch', rows=len(page_urls)):
+        pages = fetch_pages(page_urls, max_workers=max_workers, session=session, cache=cache)
+        if cache is not None:
+            cache.flush()
+
+    tournaments = {}
+    for t_id, url_main in urls.items():
+        with instrument.stage('parse', event=t_id) as stage:
+            tournaments[t_id] = combine_cats(pages, url_main, divisions, fast=fast)
+            stage.add_rows(len(tournaments[t_id]))
+    return tournaments
+
+
+def get_tournament(url_main, divisions=None, max_workers=8, session=None, cache=http_cache.DEFAULT_CACHE_DIR,
+                   fast=False):
+
+    return get_tournaments({url_main: url_main}, divisions=divisions,
+                           max_workers=max_workers, session=session, cache=cache, fast=fast)[url_main]
+
+
 def table_to_2d(table_tag):
     # Credit: Martijn Pieters
     # https://stackoverflow.com/questions/48393253/how-to-parse-table-with-rowspan-and-colspan
@@ -113,96 +342,7 @@ def table_to_2d(table_tag):
 
 
 if __name__ == "__main__":
-    # # Nimes 2015
-    # url = 'https://www.ianseo.net/TourData/2015/797'
-    # fname = 'Nimes15Scores'
-
-    # # Nimes 2016
-    # url = 'https://www.ianseo.net/TourData/2016/1276'
-    # fname = 'Nimes16Scores'
-
-    # # Nimes 2017
-    # url = 'https://www.ianseo.net/TourData/2017/2013'
-    # fname = 'Nimes17Scores'
-
-    # # Nimes 2018
-    # url = 'https://www.ianseo.net/TourData/2018/3113'
-    # fname = 'Nimes18Scores'
-
-    # # Nimes 2019
-    # url = 'https://www.ianseo.net/TourData/2019/4785'
-    # fname = 'Nimes19Scores'
-
-    # # Nimes 2020
-    # url = 'https://www.ianseo.net/TourData/2020/6255'
-    # fname = 'Nimes20Scores'
-
-    # # Nimes 2021
-    # url = 'https://www.ianseo.net/TourData/2021/8006'
-    # fname = 'Nimes21Scores'
-
-    # # Nimes 2022
-    # url = 'https://www.ianseo.net/TourData/2022/9959'
-    # fname = 'Nimes22Scores'
-
-    # # AGB NI 2021
-    # url = 'https://www.ianseo.net/TourData/2021/9399/'
-    # fname = 'AGBNI21Scores'
-
-    # # AGB NI 2019
-    # url = 'https://www.ianseo.net/TourData/2019/6526'
-    # fname = 'AGBNI19Scores'
-
-    # # AGB NI 2018
-    # url = 'https://www.ianseo.net/TourData/2018/4739'
-    # fname = 'AGBNI18Scores'
-
-    # # AGB NI 2017
-    # url = 'https://www.ianseo.net/TourData/2017/3214'
-    # fname = 'AGBNI17Scores'
-
-    # # AGB NI 2016
-    # url = 'https://www.ianseo.net/TourData/2016/2192'
-    # fname = 'AGBNI16Scores'
-
-    # # AGB NI 2015
-    # url = 'https://www.ianseo.net/TourData/2015/1322'
-    # fname = 'AGBNI15Scores'
-
-    # # AGB NI 2014
-    # url = 'https://www.ianseo.net/TourData/2014/861'
-    # fname = 'AGBNI14Scores'
-
-    # # AGB NI 2011
-    # url = 'https://www.ianseo.net/TourData/2011/237'
-    # fname = 'AGBNI11Scores'
-
-    # Assume recurve and compound always exist and combine into one table
-    RM = get_cat(url, 'IQRM.php', div='R', gen='M')
-    RW = get_cat(url, 'IQRW.php', div='R', gen='W')
-    CM = get_cat(url, 'IQCM.php', div='C', gen='M')
-    CW = get_cat(url, 'IQCW.php', div='C', gen='W')
-    full_results = pd.concat([RM, RW, CM, CW], ignore_index=True)
-
-    # Try Longbow
-    try:
-        LM = get_cat(url, 'IQLM.php', div='L', gen='M')
-        LW = get_cat(url, 'IQLW.php', div='L', gen='W')
-        full_results = pd.concat([full_results, LM, LW], ignore_index=True)
-    except ValueError:
-        pass
-    except AttributeError:
-        pass
-
-    # Try Barebow
-    try:
-        BM = get_cat(url, 'IQBM.php', div='B', gen='M')
-        BW = get_cat(url, 'IQBW.php', div='B', gen='W')
-        full_results = pd.concat([full_results, BM, BW], ignore_index=True)
-    except ValueError:
-        pass
-    except AttributeError:
-        pass
-
-    # Save to file
-    full_results.to_csv(f'data/{fname}.csv')
+    # Tournaments are listed in data/tournaments.json, see backfill for the options
+    from archery_gender_analysis import backfill
+
+    raise SystemExit(backfill.main())
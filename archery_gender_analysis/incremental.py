@@ -0,0 +1,189 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Incremental analysis, recomputing only events whose source data has changed
+#
+
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from archery_gender_analysis import event_store, pipeline, results_io
+from archery_gender_analysis import general_routines as gr
+
+# Bump to invalidate cached results when the per-event analysis changes
+RESULTS_VERSION = 1
+
+# Library modules run by the per-event analysis. Their source is hashed into the cache keys, so
+# editing e.g. the ranking recomputes every event.
+ANALYSIS_MODULES = [f'archery_gender_analysis.{name}' for name in
+                    ['incremental', 'general_routines', 'ranking', 'group_stats', 'resampling', 'schema']]
+
+
+def analyse_event(data, band_edges=None):
+    """ function analyse_event
+    all derived results for a single event
+
+    Every ranking, test and statistic is partitioned by Event, so results for one event
+    do not depend on any other.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        scores for a single event as returned by read_from_files
+    band_edges : list
+        rank band edges passed to set_rank_band
+
+    Returns
+    -------
+    dict
+        ranked data ('data'), medal position changes ('delta_pos') and the tables of
+        general_routines.calc_t_test_tables
+
+    """
+    data = gr.calc_mixed_rank_percentiles(data)
+    data = gr.calc_delta_sep_mixed(data)
+    data = gr.set_rank_band(data, band_edges=band_edges)
+    results = {'data': data, 'delta_pos': gr.calc_pos_changes(data)}
+    results.update(gr.calc_t_test_tables(data))
+    return results
+
+
+def merge_results(event_results):
+    """ function merge_results
+    combine per-event results into the outputs for the whole dataset
+
+    Parameters
+    ----------
+    event_results : dict
+        mapping of event identifier to the results of analyse_event, the ranked data may be
+        omitted in which case it is not combined
+
+    Returns
+    -------
+    dict
+        combined results, ordered as if computed on the combined dataset
+
+    """
+    events = list(event_results)
+    merged = {}
+    if all('data' in event_results[e] for e in events):
+        merged['data'] = pd.concat([event_results[e]['data'] for e in events], ignore_index=True)
+
+    # Position changes are listed by descending event
+    merged['delta_pos'] = pd.concat([event_results[e]['delta_pos'] for e in sorted(events, reverse=True)],
+                                    ignore_index=True)
+
+    for name in gr.T_TEST_TABLES:
+        merged[name] = pd.concat([event_results[e][name] for e in events]).sort_index(kind='stable')
+
+    return merged
+
+
+def _code_hash():
+    return ':'.join(pipeline.module_hash(name) for name in ANALYSIS_MODULES)
+
+
+def _cache_key(source_hash, band_edges, code_hash):
+    key = f'{RESULTS_VERSION}:{source_hash}:{band_edges}:{code_hash}'
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def run_incremental(flist, datapath='./data/', fname_fmt='.csv', f_pref='', f_suff='Scores', store_path=None,
+                    cache_path=None, band_edges=None):
+    """ function run_incremental
+    analyse a dataset, reusing cached per-event results for unchanged source files
+
+    Per-event results are persisted in cache_path keyed by the content hash of the event's
+    source file, so adding or changing one event only costs that event's analysis. The source
+    of the library code run is part of the key, so editing it recomputes every event.
+
+    Parameters
+    ----------
+    flist : list of str
+        identifiers of the events in the dataset
+    datapath, fname_fmt, f_pref, f_suff : str
+        location and naming of the source files, as for read_from_files
+    store_path : str
+        root directory of the event store, defaults to <datapath>/.store
+    cache_path : str
+        directory for per-event results, defaults to <datapath>/.results_cache
+    band_edges : list
+        rank band edges passed to set_rank_band
+
+    Returns
+    -------
+    merged : dict
+        combined results as returned by merge_results
+    recomputed : list of str
+        events that had to be analysed
+
+    """
+    if store_path is None:
+        store_path = os.path.join(datapath, '.store')
+    if cache_path is None:
+        cache_path = os.path.join(datapath, '.results_cache')
+    os.makedirs(cache_path, exist_ok=True)
+
+    code_hash = _code_hash()
+    event_results = {}
+    recomputed = []
+    for f_id in flist:
+        fname = f'{datapath}{f_pref}{f_id.replace(" ","_")}{f_suff}{fname_fmt}'
+        key = _cache_key(event_store.event_hash(fname, store_path, f_id), band_edges, code_hash)
+        cache_file = os.path.join(cache_path, f'{f_id.replace(" ","_")}.pkl')
+
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            cached = None
+
+        if cached is not None and cached['key'] == key:
+            event_results[f_id] = cached['results']
+            continue
+
+        data = gr.read_from_files([f_id], datapath=datapath, fname_fmt=fname_fmt, f_pref=f_pref, f_suff=f_suff,
+                                  store_path=store_path)
+        event_results[f_id] = analyse_event(data, band_edges=band_edges)
+        recomputed.append(f_id)
+
+        with open(cache_file + '.tmp', 'wb') as f:
+            pickle.dump({'key': key, 'results': event_results[f_id]}, f)
+        os.replace(cache_file + '.tmp', cache_file)
+
+    return merge_results(event_results), recomputed
+
+
+def write_results(merged, fpath='./results/', fpref='', formats=results_io.DEFAULT_FORMATS, text=True,
+                  background=False):
+    """ function write_results
+    write combined results to the same files as the full analysis
+
+    Parameters
+    ----------
+    merged : dict
+        combined results as returned by merge_results
+    fpath : str
+        directory to write results to
+    fpref : str
+        prefix for the result file names
+    formats : list of str
+        machine-readable results formats, as for results_io.ResultWriter, none by default
+    text : bool
+        write the human-readable text view of each table, the default output
+    background : bool
+        write results from a background thread
+
+    """
+    with results_io.ResultWriter(fpath=fpath, fpref=fpref, formats=formats, text=text,
+                                 background=background) as writer:
+        gr.write_raw_data(merged['data'], writer=writer)
+        gr.write_pos_changes(merged['delta_pos'], writer=writer)
+        gr.write_t_test_tables(merged, writer=writer)
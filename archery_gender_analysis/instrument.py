@@ -0,0 +1,315 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Per-stage timing, memory, row and HTTP instrumentation of the analysis
+#
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+# Counters accumulated by count() and attributed to every stage open while they change
+COUNTERS = ['http_requests', 'http_bytes', 'cache_hits']
+
+# Active recorder, None while instrumentation is disabled
+_RECORDER = None
+
+
+class _NullStage:
+    # Shared stand-in for a stage while instrumentation is disabled, so that instrumented
+    # code costs one function call and no allocation
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def add_rows(self, n_rows):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """ class Stage
+    a timed region of the analysis, recorded when it exits
+
+    Parameters
+    ----------
+    recorder : Recorder
+        recorder to report to
+    name : str
+        name of the stage, e.g. 'read' or 'plot:scores'
+    event : str
+        event the stage processed, if any
+    rows : int
+        rows processed, may be added to with add_rows while the stage runs
+
+    """
+
+    def __init__(self, recorder, name, event=None, rows=None):
+        self.recorder = recorder
+        self.name = name
+        self.event = event
+        self.rows = rows
+        self.child_peak = 0
+
+    def add_rows(self, n_rows):
+        self.rows = (self.rows or 0) + n_rows
+
+    def __enter__(self):
+        stack = self.recorder._stack()
+        self.parent = stack[-1] if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+
+        self.counters = self.recorder.counters_snapshot()
+        self.recorder._open(self)
+        if self.recorder.trace_memory and not self.overlapped:
+            # Resetting loses the peak of the enclosing stage so far, keep it for when this one exits
+            self.mem_start, self.outer_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        self.recorder._stack().pop()
+        self.recorder._close(self)
+
+        peak = None
+        if self.recorder.trace_memory and not self.overlapped:
+            abs_peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            peak = abs_peak - self.mem_start
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, abs_peak, self.outer_peak)
+
+        counters = self.recorder.counters_snapshot()
+        record = {'name': self.name, 'event': self.event, 'start': self.start - self.recorder.origin,
+                  'duration': end - self.start, 'peak_bytes': peak, 'rows': self.rows,
+                  'thread': threading.get_ident(), 'depth': self.depth,
+                  'parent': None if self.parent is None else self.parent.name,
+                  'error': None if exc_type is None else exc_type.__name__}
+        record.update({name: counters[name] - self.counters[name] for name in COUNTERS})
+        self.recorder._add(record)
+        return False
+
+
+class Recorder:
+    """ class Recorder
+    collects the records of instrumented stages
+
+    Parameters
+    ----------
+    trace_memory : bool
+        record the peak memory allocated by Python during each stage using tracemalloc.
+        This slows allocation-heavy code, so may be turned off to record only times.
+        The peak is process-wide, so it is only recorded for stages that no stage in another
+        thread overlaps, and is None for the others. It needs Python 3.9 or later, memory is
+        not traced on earlier versions.
+
+    """
+
+    def __init__(self, trace_memory=True):
+        # The peak of a stage is found by resetting it when the stage starts
+        self.trace_memory = trace_memory and hasattr(tracemalloc, 'reset_peak')
+        self.records = []
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.open_stages = []
+        self.started_tracing = False
+
+    def _stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def _open(self, stage):
+        # Note a stage starting, marking it and any stages open in other threads as overlapped
+        thread = threading.get_ident()
+        with self.lock:
+            others = [other for other in self.open_stages if other.thread != thread]
+            for other in others:
+                other.overlapped = True
+            stage.thread = thread
+            stage.overlapped = bool(others)
+            self.open_stages.append(stage)
+
+    def _close(self, stage):
+        with self.lock:
+            self.open_stages.remove(stage)
+
+    def _add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    def counters_snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def to_frame(self):
+        """ method to_frame
+        every record as a row of a dataframe, in the order stages finished
+
+        """
+        return pd.DataFrame(self.records, columns=['name', 'event', 'start', 'duration', 'peak_bytes', 'rows']
+                            + COUNTERS + ['thread', 'depth', 'parent', 'error'])
+
+    def summary(self):
+        """ method summary
+        totals for each stage name: calls, total and maximum time, largest peak memory,
+        rows and counters
+
+        """
+        records = self.to_frame()
+        return records.groupby('name', sort=False).agg(
+            calls=('duration', 'size'), total_s=('duration', 'sum'), max_s=('duration', 'max'),
+            peak_bytes=('peak_bytes', 'max'), rows=('rows', 'sum'),
+            **{name: (name, 'sum') for name in COUNTERS}).sort_values('total_s', ascending=False)
+
+    def write_json(self, fname):
+        with open(fname, 'w') as f:
+            json.dump({'records': self.records, 'counters': self.counters}, f, indent=1, default=str)
+
+    def write_chrome_trace(self, fname):
+        """ method write_chrome_trace
+        write the records in the Chrome trace event format, for chrome://tracing or Perfetto
+
+        """
+        events = []
+        for record in self.records:
+            args = {key: record[key] for key in ['event', 'rows', 'peak_bytes'] + COUNTERS
+                    if record[key] is not None}
+            name = record['name'] if record['event'] is None else f"{record['name']} [{record['event']}]"
+            events.append({'name': name, 'cat': record['name'].split(':')[0], 'ph': 'X', 'pid': os.getpid(),
+                           'tid': record['thread'], 'ts': 1e6 * record['start'], 'dur': 1e6 * record['duration'],
+                           'args': args})
+        with open(fname, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+
+def enable(trace_memory=True):
+    """ function enable
+    start recording instrumented stages
+
+    Parameters
+    ----------
+    trace_memory : bool
+        record peak memory of each stage, see Recorder
+
+    Returns
+    -------
+    Recorder
+        the recorder stages report to until disable is called
+
+    """
+    global _RECORDER
+    disable()
+    _RECORDER = Recorder(trace_memory=trace_memory)
+    _RECORDER.start()
+    return _RECORDER
+
+
+def disable():
+    """ function disable
+    stop recording, returning the recorder that was active (or None)
+
+    """
+    global _RECORDER
+    recorder, _RECORDER = _RECORDER, None
+    if recorder is not None:
+        recorder.stop()
+    return recorder
+
+
+def get_recorder():
+    return _RECORDER
+
+
+def stage(name, event=None, rows=None):
+    """ function stage
+    context manager recording a stage of the analysis, which does nothing if disabled
+
+    Parameters
+    ----------
+    name : str
+        name of the stage
+    event : str
+        event the stage processes, if any
+    rows : int
+        rows processed, if known up front
+
+    Returns
+    -------
+    context manager
+        yielding an object with add_rows(n) to report rows processed
+
+    """
+    if _RECORDER is None:
+        return _NULL_STAGE
+    return Stage(_RECORDER, name, event=event, rows=rows)
+
+
+def count(name, n=1):
+    # Add to a counter, e.g. http_bytes, if recording
+    if _RECORDER is not None:
+        _RECORDER.count(name, n)
+
+
+class recording:
+    """ class recording
+    context manager enabling instrumentation for a block and writing its records on exit
+
+    Parameters
+    ----------
+    json_file : str
+        file to write the records to as json, not written if None
+    trace_file : str
+        file to write a Chrome trace to, not written if None
+    trace_memory : bool
+        record peak memory of each stage, see Recorder
+
+    """
+
+    def __init__(self, json_file=None, trace_file=None, trace_memory=True):
+        self.json_file = json_file
+        self.trace_file = trace_file
+        self.trace_memory = trace_memory
+
+    def __enter__(self):
+        self.recorder = enable(trace_memory=self.trace_memory)
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        disable()
+        if self.json_file is not None:
+            self.recorder.write_json(self.json_file)
+        if self.trace_file is not None:
+            self.recorder.write_chrome_trace(self.trace_file)
+        return False
@@ -2,13 +2,12 @@
 #                 @jatkinson1000
 #
 # Date Created  : 2022-07-14
-# Last Modified : 2022-07-30
+# Last Modified : 2026-10-17
 #
 # Summary       : AGB Gender investigation for indoor competition.  Main script
 #
 
-import plotting_routines as plot
-import general_routines as gr
+from archery_gender_analysis import cli
 
 if __name__ == "__main__":
     dataset_id = 'Nimes_'
@@ -32,32 +31,10 @@ if __name__ == "__main__":
     #            "AGBNI14",
     #            "AGBNI11"]
 
-    df_all = gr.read_from_files(data_in, datapath='./data/', fname_fmt='.csv', f_pref='', f_suff='Scores')
-
-    # Calculate split and mixed gender rankings and percentiles, and the position changes that result for individuals
-    df_all = gr.calc_mixed_rank_percentiles(df_all)
-    df_all = gr.calc_delta_sep_mixed(df_all)
-
-    # Save the raw dataset
-    df_out = df_all.sort_values(by=['Event', 'Division', 'Class', 'Score', '10'],
-                                ascending=[False, True, True, False, False], ignore_index=True)
-    with open(f'./results/{dataset_id}raw_data.txt', 'w') as f:
-        f.write(df_out.to_string(index=False,
-                                 columns=['Event', 'Division', 'Class', 'Score', '10', '9', 'Sep rank', 'Mixed rank']))
-
-    # Scatter all scores against separate percentile position
-    plot.scatter_scores(df_all, fsave=True)
-    # Scatter mixed scores against mixed percentile position (but showing gender)
-    plot.scatter_mixed_scores(df_all, fsave=True)
-    # Scatter change in percentile when going from separate to mixed gender competition
-    plot.mixed_split_percentile(df_all, fsave=True)
-
-    # Examine the effect on medalists across all events and plot
-    delta_pos = gr.get_pos_changes(df_all, fpref=dataset_id)
-    plot.plot_pos_changes(delta_pos, fid=dataset_id)
-
-    # Conduct a t_test on the data by event and write to file along with key stats
-    ttest = gr.conduct_t_test(df_all, fpref=dataset_id)
+    # Read, rank, write the raw dataset, plot scores and percentiles, examine the effect on medalists, and
+    # conduct t_tests by event, skipping any stage whose inputs are unchanged since the last run.
+    # Results are kept in results/ as text tables.
+    cli.main(data_in + ['--prefix', dataset_id])
 
 
 # Plot error bars of t test probability
@@ -0,0 +1,235 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Analysis of partitions of the dataset by event on a process pool
+#
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import schema
+
+# Columns written by the workers for every row
+RANK_COLUMNS = ['Sep rank', 'Sep pc', 'Mixed rank', 'Mixed pc', 'Delta rank', 'Delta pc']
+
+# Every ranking, position change and test is grouped by event then division, so either may partition
+PARTITIONS = {'event': ['Event'], 'division': ['Event', 'Division']}
+
+
+class SharedFrame:
+    """ class SharedFrame
+    columns of a dataframe in memory-mapped .npy files, which worker processes open by path
+
+    Label columns are stored as integer codes with their categories, so every column is a
+    plain numpy array and a worker opening some rows reads only those pages.
+
+    Parameters
+    ----------
+    directory : str
+        directory holding the column files
+    columns : dict
+        column name -> (file name, categories or None, pandas dtype)
+
+    """
+
+    def __init__(self, directory, columns):
+        self.directory = directory
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, data, directory, rows=None):
+        """ method from_frame
+        write the columns of a dataframe, optionally reordering its rows
+
+        Parameters
+        ----------
+        data : pandas dataframe
+            dataframe to share
+        directory : str
+            directory to write the column files to
+        rows : numpy array of int
+            positions of the rows to write, in order, all rows if None
+
+        Returns
+        -------
+        SharedFrame
+            the shared columns
+
+        """
+        columns = {}
+        for i, (name, column) in enumerate(data.items()):
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                values, categories = column.cat.codes.to_numpy(), column.cat.categories
+            elif column.dtype.kind in 'biuf':
+                values, categories = column.to_numpy(), None
+            else:
+                values, categories = pd.factorize(column)
+            fname = f'{i}.npy'
+            array = np.lib.format.open_memmap(os.path.join(directory, fname), mode='w+', dtype=values.dtype,
+                                              shape=(len(data) if rows is None else len(rows),))
+            array[:] = values if rows is None else values[rows]
+            array.flush()
+            columns[name] = (fname, None if categories is None else list(categories), column.dtype)
+        return cls(directory, columns)
+
+    @classmethod
+    def empty(cls, directory, n_rows, names, dtype=np.float64, fill=np.nan):
+        # Output columns for workers to write to
+        columns = {}
+        for i, name in enumerate(names):
+            fname = f'out_{i}.npy'
+            array = np.lib.format.open_memmap(os.path.join(directory, fname), mode='w+', dtype=dtype,
+                                              shape=(n_rows,))
+            array[:] = fill
+            array.flush()
+            columns[name] = (fname, None, np.dtype(dtype))
+        return cls(directory, columns)
+
+    def array(self, name, mode='r'):
+        return np.load(os.path.join(self.directory, self.columns[name][0]), mmap_mode=mode)
+
+    def frame(self, start=0, stop=None):
+        """ method frame
+        rows of the shared frame as a dataframe with the original column types
+
+        """
+        frame = {}
+        for name, (_, categories, dtype) in self.columns.items():
+            values = self.array(name)[start:stop]
+            if categories is None:
+                frame[name] = np.array(values)
+            elif isinstance(dtype, pd.CategoricalDtype):
+                frame[name] = pd.Categorical.from_codes(values, dtype=dtype)
+            else:
+                # Code -1, a missing label, takes the None appended to the categories
+                labels = np.asarray(categories + [None], dtype=object)[values]
+                frame[name] = pd.Series(labels).astype(dtype)
+        return pd.DataFrame(frame)
+
+
+def _analyse_partition(shared, ranks, start, stop, band_edges):
+    # Worker: analyse rows start:stop, writing their ranks to the shared output columns
+    data = shared.frame(start, stop)
+    data = gr.calc_mixed_rank_percentiles(data)
+    data = gr.calc_delta_sep_mixed(data)
+    for col in RANK_COLUMNS:
+        out = ranks.array(col, mode='r+')
+        out[start:stop] = data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        out.flush()
+
+    results = {'delta_pos': gr.calc_pos_changes(data)}
+    results.update(gr.calc_t_test_tables(gr.set_rank_band(data, band_edges=band_edges)))
+    return results
+
+
+def _merge(data, ranks, order, partition_results, compact):
+    # Reassemble the outputs of the partitions in the order of the serial analysis
+    merged = {}
+    data = data.copy()
+    values = {}
+    for col in RANK_COLUMNS:
+        full = np.full(len(data), np.nan)
+        full[order] = ranks.array(col)
+        values[col] = full
+    if compact:
+        values = schema.compact_columns(values)
+    for col in RANK_COLUMNS:
+        data[col] = values[col]
+    merged['data'] = data
+
+    # Position changes are listed by descending event, then ascending division
+    keys = sorted(partition_results, key=lambda key: key[1:])
+    keys = sorted(keys, key=lambda key: key[0], reverse=True)
+    delta_pos = pd.concat([partition_results[key]['delta_pos'] for key in keys], ignore_index=True)
+    # Labels are rebuilt in each worker, give them the types of the serial output
+    merged['delta_pos'] = delta_pos.astype({col: data[col].dtype for col in ['Event', 'Division', 'Class']})
+
+    for name in gr.T_TEST_TABLES:
+        merged[name] = pd.concat([partition_results[key][name] for key in partition_results]).sort_index(kind='stable')
+
+    return merged
+
+
+def run_parallel(data, max_workers=None, partition='event', band_edges=None, tmp_dir=None):
+    """ function run_parallel
+    ranks, position changes and t-test tables of a dataset, computed per event on a process pool
+
+    Rows are written once, grouped by partition, to memory-mapped column files that the workers
+    open by path, so only row ranges and small result tables are passed between processes.
+    Workers write the ranks of their rows into shared output columns and return the position
+    changes and t-test tables of their partition, which are combined in the serial order.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        scores as returned by read_from_files
+    max_workers : int
+        number of worker processes, the number of CPUs if None
+    partition : str
+        'event' to give each worker whole events, or 'division' for each division of an event
+    band_edges : list
+        rank band edges passed to set_rank_band
+    tmp_dir : str
+        directory under which to create the shared column files, the system default if None
+
+    Returns
+    -------
+    dict
+        ranked data ('data') as from calc_delta_sep_mixed, position changes ('delta_pos') as
+        from calc_pos_changes and the tables of calc_t_test_tables, identical to the serial analysis
+
+    """
+    if partition not in PARTITIONS:
+        raise ValueError(f"Unknown partition '{partition}', expected one of {list(PARTITIONS)}")
+    keys = PARTITIONS[partition]
+
+    codes = np.zeros(len(data), dtype=np.int64)
+    missing = np.zeros(len(data), dtype=bool)
+    uniques = []
+    for key in keys:
+        key_codes, key_uniques = pd.factorize(data[key])
+        missing |= key_codes < 0
+        codes = codes * len(key_uniques) + key_codes
+        uniques.append(list(key_uniques))
+    # Rows with missing keys belong to no group of the serial analysis, they are left unranked
+    order = np.argsort(np.where(missing, -1, codes), kind='stable')[missing.sum():]
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.diff(sorted_codes, prepend=-1))
+    stops = np.append(starts[1:], len(order))
+
+    inputs = [col for col in ['Event', 'Division', 'Class', 'Score', '10', '9', 'Category Rank']
+              if col in data.columns]
+    compact = schema.is_compact(data)
+    directory = tempfile.mkdtemp(prefix='agb_parallel_', dir=tmp_dir)
+    try:
+        shared = SharedFrame.from_frame(data[inputs], directory, rows=order)
+        ranks = SharedFrame.empty(directory, len(order), RANK_COLUMNS)
+
+        partition_results = {}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Largest partitions first, so that small ones fill in at the end
+            futures = {}
+            for start, stop in sorted(zip(starts, stops), key=lambda bounds: bounds[0] - bounds[1]):
+                code = sorted_codes[start]
+                key = []
+                for key_uniques in reversed(uniques):
+                    code, key_code = divmod(code, len(key_uniques))
+                    key.append(key_uniques[key_code])
+                futures[tuple(reversed(key))] = executor.submit(_analyse_partition, shared, ranks, int(start),
+                                                                int(stop), band_edges)
+            for key, future in futures.items():
+                partition_results[key] = future.result()
+
+        return _merge(data, ranks, order, partition_results, compact)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
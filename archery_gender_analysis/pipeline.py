@@ -0,0 +1,464 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Cached stage DAG running the analysis, skipping stages whose inputs are unchanged
+#
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+from archery_gender_analysis import event_store, instrument, results_io
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis.plot_data import DENSITY_THRESHOLD, PlotIndex
+
+# Bump to rerun every stage, e.g. when the format of cached artifacts changes
+PIPELINE_VERSION = 1
+
+STATE_FILE = 'state.json'
+
+
+def _modules(*names):
+    return [f'archery_gender_analysis.{name}' for name in names]
+
+
+# Library modules run by each kind of stage. Their source is hashed into the stage keys, so
+# editing e.g. the ranking reruns the stages that rank but leaves the plots cached.
+READ_MODULES = _modules('general_routines', 'event_store', 'schema')
+RANK_MODULES = _modules('general_routines', 'ranking', 'schema')
+PLOT_INDEX_MODULES = _modules('plot_data')
+PLOT_MODULES = _modules('plotting', 'plot_data')
+RESULTS_MODULES = _modules('general_routines', 'ranking', 'results_io')
+T_TEST_MODULES = _modules('general_routines', 'group_stats', 'resampling', 'results_io')
+RANK_TEST_MODULES = _modules('general_routines', 'rank_tests', 'ranking', 'results_io')
+
+
+class Stage:
+    """ class Stage
+    one step of a pipeline
+
+    A stage is called with its input artifacts and parameters as keyword arguments and
+    returns a dict of its output artifacts (or None if it has none). It may also write
+    files, declared as products so that a stage whose products are missing is rerun.
+
+    Parameters
+    ----------
+    name : str
+        unique name of the stage
+    func : callable
+        function run by the stage
+    inputs : list of str
+        artifacts produced by other stages that func takes
+    outputs : list of str
+        artifacts returned by func
+    params : dict
+        further keyword arguments for func, part of the stage's cache key
+    files : list of str
+        source files read by func, their content is part of the stage's cache key
+    products : list of str
+        files written by func
+    modules : list of str
+        modules func calls into, e.g. 'archery_gender_analysis.ranking', whose source is part of
+        the stage's cache key so that editing them reruns the stage
+
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, files=(), products=(), modules=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = {} if params is None else dict(params)
+        self.files = list(files)
+        self.products = list(products)
+        self.modules = list(modules)
+
+    def code_hash(self):
+        # Editing the stage function, or the modules it calls into, invalidates its cached results
+        try:
+            source = inspect.getsource(self.func)
+        except (OSError, TypeError):
+            source = f'{self.func.__module__}.{self.func.__qualname__}'
+        sha = hashlib.sha256(source.encode())
+        for module in self.modules:
+            sha.update(f'\n{module}:{module_hash(module)}'.encode())
+        return sha.hexdigest()
+
+
+def module_hash(name):
+    """ function module_hash
+    hash of the source file of a module, found without importing it
+
+    Parameters
+    ----------
+    name : str
+        full name of the module
+
+    Returns
+    -------
+    str
+        hash of the source, or of the name if the module has no source file
+
+    """
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.has_location:
+        return hashlib.sha256(name.encode()).hexdigest()
+    with open(spec.origin, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _stable_repr(value):
+    return json.dumps(value, sort_keys=True, default=repr)
+
+
+class Pipeline:
+    """ class Pipeline
+    dependency-aware runner for a set of stages
+
+    Every stage has a key hashing its code, parameters, the content of its source files and
+    the content hashes of its input artifacts. A stage is skipped when its key matches the
+    last run and its products still exist; its artifacts are then loaded from the cache only
+    if a later stage needs them. Stages whose inputs are ready run concurrently.
+
+    Parameters
+    ----------
+    stages : list of Stage
+        stages of the pipeline, each artifact produced by exactly one stage
+    cache_dir : str
+        directory holding the cached artifacts and the state of the last run
+
+    """
+
+    def __init__(self, stages, cache_dir):
+        self.stages = {stage.name: stage for stage in stages}
+        self.producer = {}
+        for stage in stages:
+            for artifact in stage.outputs:
+                if artifact in self.producer:
+                    raise ValueError(f"Artifact '{artifact}' is produced by both '{self.producer[artifact]}' "
+                                     f"and '{stage.name}'")
+                self.producer[artifact] = stage.name
+        for stage in stages:
+            for artifact in stage.inputs:
+                if artifact not in self.producer:
+                    raise ValueError(f"Stage '{stage.name}' needs artifact '{artifact}' which no stage produces")
+
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.state = {}
+        self.artifacts = {}
+        self.artifact_hashes = {}
+
+    def dependencies(self, name):
+        return {self.producer[artifact] for artifact in self.stages[name].inputs}
+
+    def _required(self, targets):
+        # Targets and every stage they depend on
+        required = set()
+        todo = list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}', expected one of {list(self.stages)}")
+            if name not in required:
+                required.add(name)
+                todo.extend(self.dependencies(name))
+        return required
+
+    def _artifact_file(self, artifact):
+        return os.path.join(self.cache_dir, f'{artifact}.pkl')
+
+    def _load_state(self):
+        try:
+            with open(os.path.join(self.cache_dir, STATE_FILE)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if state.get('version') != PIPELINE_VERSION:
+            return {}
+        return state.get('stages', {})
+
+    def _save_state(self):
+        # Saved after every stage so that an interrupted run keeps its progress
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': PIPELINE_VERSION, 'stages': self.state}, f, indent=1, sort_keys=True)
+        os.replace(tmp, os.path.join(self.cache_dir, STATE_FILE))
+
+    def stage_key(self, name):
+        stage = self.stages[name]
+        sha = hashlib.sha256()
+        sha.update(f'{PIPELINE_VERSION}\n{name}\n{stage.code_hash()}\n{_stable_repr(stage.params)}\n'.encode())
+        for fname in stage.files:
+            sha.update(f'{fname}:{event_store.file_hash(fname)}\n'.encode())
+        for artifact in stage.inputs:
+            sha.update(f'{artifact}:{self.artifact_hashes[artifact]}\n'.encode())
+        return sha.hexdigest()
+
+    def _is_fresh(self, name, key):
+        stage = self.stages[name]
+        previous = self.state.get(name)
+        if previous is None or previous.get('key') != key:
+            return False
+        if not all(os.path.exists(product) for product in stage.products):
+            return False
+        if not all(os.path.exists(self._artifact_file(artifact)) for artifact in stage.outputs):
+            return False
+        with self.lock:
+            self.artifact_hashes.update(previous['artifacts'])
+        return True
+
+    def _get_artifact(self, artifact):
+        with self.lock:
+            if artifact not in self.artifacts:
+                with open(self._artifact_file(artifact), 'rb') as f:
+                    self.artifacts[artifact] = pickle.load(f)
+            return self.artifacts[artifact]
+
+    def _store_artifact(self, artifact, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, self._artifact_file(artifact))
+        with self.lock:
+            self.artifacts[artifact] = value
+        return hashlib.sha256(payload).hexdigest()
+
+    def _run_stage(self, name, force):
+        stage = self.stages[name]
+        key = self.stage_key(name)
+        if not force and self._is_fresh(name, key):
+            return 'skipped'
+
+        with instrument.stage(f'pipeline:{name}'):
+            kwargs = {artifact: self._get_artifact(artifact) for artifact in stage.inputs}
+            kwargs.update(stage.params)
+            outputs = stage.func(**kwargs) or {}
+
+        hashes = {}
+        for artifact in stage.outputs:
+            hashes[artifact] = self._store_artifact(artifact, outputs[artifact])
+        with self.lock:
+            self.artifact_hashes.update(hashes)
+            self.state[name] = {'key': key, 'artifacts': hashes}
+            self._save_state()
+        return 'ran'
+
+    def run(self, targets=None, force=False, max_workers=None):
+        """ method run
+        run the stages needed for some targets, skipping those that are up to date
+
+        Parameters
+        ----------
+        targets : list of str
+            stages to bring up to date, all if None. Stages they depend on are included.
+        force : bool
+            rerun stages even if they are up to date
+        max_workers : int
+            maximum number of stages to run at once, serial if None or 1
+
+        Returns
+        -------
+        dict
+            'ran' or 'skipped' for each stage run, in the order they finished
+
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.state = self._load_state()
+        self.artifacts = {}
+        self.artifact_hashes = {}
+
+        required = self._required(self.stages if targets is None else targets)
+        waiting = {name: self.dependencies(name) for name in self.stages if name in required}
+        status = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers or 1) as executor:
+            running = {}
+            while waiting or running:
+                ready = [name for name, deps in waiting.items() if deps <= status.keys()]
+                for name in ready:
+                    del waiting[name]
+                    running[executor.submit(self._run_stage, name, force)] = name
+                if not running:
+                    raise ValueError(f"Stages {list(waiting)} have circular dependencies")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Stop scheduling on a failure, but let stages already running finish
+                    try:
+                        status[name] = future.result()
+                    except Exception:
+                        waiting = {}
+                        wait(running)
+                        raise
+
+        return status
+
+
+# Stage functions of the analysis
+
+
+def read_stage(events, datapath, fname_fmt, f_pref, f_suff, compact):
+    return {'scores': gr.read_from_files(events, datapath=datapath, fname_fmt=fname_fmt, f_pref=f_pref,
+                                         f_suff=f_suff, compact=compact)}
+
+
+def rank_stage(scores, tie_breaks):
+    # Artifacts are shared between stages, so are never modified in place
+    ranked = gr.calc_mixed_rank_percentiles(scores.copy(), tie_breaks=tie_breaks)
+    return {'ranked': gr.calc_delta_sep_mixed(ranked)}
+
+
+def raw_data_stage(ranked, fpath, fpref, formats, text):
+    gr.write_raw_data(ranked, fpath=fpath, fpref=fpref, formats=formats, text=text)
+
+
+def plot_index_stage(ranked):
+    return {'plot_index': PlotIndex(ranked)}
+
+
+def plot_stage(plot_index, plot_type, fpath, fmt, mode, density_threshold):
+    # matplotlib is only loaded by runs that plot
+    from archery_gender_analysis import plotting
+
+    plotting.render_plots(plot_index, plot_types=[plot_type], fpath=fpath, fmt=fmt, mode=mode,
+                          density_threshold=density_threshold)
+
+
+def pos_changes_stage(ranked, fpath, fpref, formats, text, k):
+    return {'delta_pos': gr.get_pos_changes(ranked, fpath=fpath, fpref=fpref, formats=formats, text=text, k=k)}
+
+
+def pos_changes_plot_stage(delta_pos, fpath, fpref, fmt, k):
+    from archery_gender_analysis import plotting
+
+    plotting.plot_pos_changes(delta_pos, fid=fpref, fpath=fpath, fmt=fmt, k=k)
+
+
+def t_test_stage(ranked, fpath, fpref, formats, text, method, resample_args):
+    gr.conduct_t_test(ranked.copy(), fpath=fpath, fpref=fpref, formats=formats, text=text, method=method,
+                      **resample_args)
+
+
+def rank_tests_stage(ranked, fpath, fpref, formats, text):
+    gr.conduct_rank_tests(ranked.copy(), fpath=fpath, fpref=fpref, formats=formats, text=text)
+
+
+# Per-event plot stages: stage name -> (plotting.PLOT_TYPES key, file name suffix)
+PLOT_STAGES = {
+    'plot_scores': ('scores', '_scores'),
+    'plot_scores_mixed': ('scores_mixed', '_scores_mixed'),
+    'plot_percentile_scatter': ('percentile_scatter', '_percentile_scatter'),
+}
+
+
+def _result_files(fpath, fpref, names, formats, text):
+    exts = [results_io.FORMATS[fmt] for fmt in formats] + (['txt'] if text else [])
+    return [f'{fpath}{fpref}{name}.{ext}' for name in names for ext in exts]
+
+
+def build_analysis(events, fpref='', datapath='./data/', fname_fmt='.csv', f_pref='', f_suff='Scores',
+                   fpath='./results/', formats=results_io.DEFAULT_FORMATS, text=True, fmt='png', plot_mode='auto',
+                   density_threshold=None, tie_breaks=None, method='welch', resample_args=None, cache_dir=None,
+                   compact=False, top_k=3, rank_tests=False):
+    """ function build_analysis
+    pipeline of the full analysis of a dataset
+
+    Stages: read, rank, raw_data, plot_index, plot_scores, plot_scores_mixed,
+    plot_percentile_scatter, pos_changes, plot_pos_changes, t_test and, if asked for,
+    rank_tests. Output stages depend
+    only on the ranked data, so changing a plotting option reruns only that plot.
+
+    Parameters
+    ----------
+    events : list of str
+        identifiers of the events in the dataset
+    fpref : str
+        prefix for the result file names, e.g. 'Nimes_'
+    datapath, fname_fmt, f_pref, f_suff
+        location and naming of the source files, as for read_from_files
+    fpath : str
+        directory to write results to
+    formats : list of str
+        machine-readable results formats, as for results_io.ResultWriter, none by default
+    text : bool
+        write the human-readable text view of each table, the default output
+    fmt : str
+        image file format
+    plot_mode : str
+        'auto', 'markers' or 'density', as for plotting.scatter_scores
+    density_threshold : int
+        archers in a division above which 'auto' plots draw density, the plotting default if None
+    tie_breaks : list of str
+        columns to break ties on score, the 10s if None
+    method : str
+        test method, as for general_routines.conduct_t_test
+    resample_args : dict
+        options for the resampling test methods
+    cache_dir : str
+        directory for cached artifacts and state, <fpath>.pipeline/<fpref> if None
+    compact : bool
+        hold the data in the compact schema, see schema.apply_compact_schema
+    top_k : int
+        positions in each category to study the changes of, 3 for the podium
+    rank_tests : bool
+        add a stage of Mann-Whitney U and KS tests, see general_routines.conduct_rank_tests
+
+    Returns
+    -------
+    Pipeline
+        the analysis pipeline
+
+    """
+    if density_threshold is None:
+        density_threshold = DENSITY_THRESHOLD
+    if cache_dir is None:
+        cache_dir = os.path.join(fpath, '.pipeline', fpref or 'default')
+    formats = list(formats)
+    out = {'fpath': fpath, 'fpref': fpref, 'formats': formats, 'text': text}
+    t_test_tables = list(gr.T_TEST_TABLES) + (list(gr.BOOTSTRAP_TABLES) if method == 'bootstrap' else [])
+
+    sources = [f'{datapath}{f_pref}{f_id.replace(" ", "_")}{f_suff}{fname_fmt}' for f_id in events]
+    stages = [
+        Stage('read', read_stage, outputs=['scores'], files=sources,
+              params={'events': list(events), 'datapath': datapath, 'fname_fmt': fname_fmt, 'f_pref': f_pref,
+                      'f_suff': f_suff, 'compact': compact}, modules=READ_MODULES),
+        Stage('rank', rank_stage, inputs=['scores'], outputs=['ranked'], params={'tie_breaks': tie_breaks},
+              modules=RANK_MODULES),
+        Stage('raw_data', raw_data_stage, inputs=['ranked'], params=out,
+              products=_result_files(fpath, fpref, ['raw_data'], formats, text), modules=RESULTS_MODULES),
+        Stage('plot_index', plot_index_stage, inputs=['ranked'], outputs=['plot_index'],
+              modules=PLOT_INDEX_MODULES),
+    ]
+    for name, (plot_type, suffix) in PLOT_STAGES.items():
+        stages.append(Stage(name, plot_stage, inputs=['plot_index'],
+                            params={'plot_type': plot_type, 'fpath': fpath, 'fmt': fmt, 'mode': plot_mode,
+                                    'density_threshold': density_threshold},
+                            products=[f'{fpath}{event}{suffix}.{fmt}' for event in events], modules=PLOT_MODULES))
+    stages += [
+        Stage('pos_changes', pos_changes_stage, inputs=['ranked'], outputs=['delta_pos'], params=dict(out, k=top_k),
+              products=_result_files(fpath, fpref, ['delta_pos'], formats, text), modules=RESULTS_MODULES),
+        Stage('plot_pos_changes', pos_changes_plot_stage, inputs=['delta_pos'],
+              params={'fpath': fpath, 'fpref': fpref, 'fmt': fmt, 'k': top_k},
+              products=[f'{fpath}{fpref}position_changes.{fmt}'], modules=PLOT_MODULES),
+        Stage('t_test', t_test_stage, inputs=['ranked'],
+              params=dict(out, method=method, resample_args=resample_args or {}),
+              products=_result_files(fpath, fpref, t_test_tables, formats, text), modules=T_TEST_MODULES),
+    ]
+    if rank_tests:
+        stages.append(Stage('rank_tests', rank_tests_stage, inputs=['ranked'], params=out,
+                            products=_result_files(fpath, fpref, gr.RANK_TEST_TABLES, formats, text),
+                            modules=RANK_TEST_MODULES))
+    return Pipeline(stages, cache_dir)
@@ -0,0 +1,127 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Grouped index of plot data shared by the plotting routines
+#
+
+import numpy as np
+import pandas as pd
+
+DIVISION_ORDER = ['R', 'C', 'B', 'L']
+
+# Rendering modes for the score scatters, and the number of archers in a division above
+# which 'auto' switches from individual markers to binned density. Defined here rather than
+# in plotting so that they can be used without loading matplotlib.
+PLOT_MODES = ['auto', 'markers', 'density']
+DENSITY_THRESHOLD = 5000
+DENSITY_GRIDSIZE = 60
+
+
+def sort_divisions(divisions):
+    return sorted(divisions, key=lambda x: DIVISION_ORDER.index(x[0]))
+
+
+class PlotIndex:
+    """ class PlotIndex
+    plot data sorted once by Event, Division and Class, with positional slices per group
+
+    Percentiles used by the plots are precomputed for every row: the separate percentile
+    relative to the size of the archer's class and the mixed percentile relative to the
+    combined size of the M and W classes of the division.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        pandas dataframe containing AGB tournament data with separate and mixed ranks
+
+    """
+
+    def __init__(self, data):
+        events, event_codes = self._codes(data['Event'])
+        divisions, div_codes = self._codes(data['Division'])
+        classes, cls_codes = self._codes(data['Class'])
+
+        # Stable sort keeps archers in their original order within each group, as a mask would
+        order = np.lexsort([cls_codes, div_codes, event_codes])
+        self.score = data['Score'].to_numpy()[order]
+        self.sep_rank = data['Sep rank'].to_numpy()[order]
+        self.mixed_rank = data['Mixed rank'].to_numpy()[order]
+
+        keys = np.stack([event_codes[order], div_codes[order], cls_codes[order]], axis=1)
+        new_group = np.ones(len(keys), dtype=bool)
+        new_group[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+        starts = np.flatnonzero(new_group)
+        ends = np.append(starts[1:], len(keys))
+
+        self.events = list(events)
+        self.slices = {}
+        self.divisions = {event: [] for event in self.events}
+        for start, end in zip(starts, ends):
+            event, div, cls = events[keys[start, 0]], divisions[keys[start, 1]], classes[keys[start, 2]]
+            self.slices[(event, div, cls)] = slice(start, end)
+            if div not in self.divisions[event]:
+                self.divisions[event].append(div)
+        self.divisions = {event: sort_divisions(divs) for event, divs in self.divisions.items()}
+
+        # Group sizes for every row, then the percentiles as computed by the plots
+        n_class = np.repeat(ends - starts, ends - starts)
+        n_mixed = np.zeros(len(keys), dtype=np.int64)
+        for (event, div, cls), group in self.slices.items():
+            n_mixed[group] = self.count(event, div, 'M') + self.count(event, div, 'W')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.sep_pc = 100 * (self.sep_rank - 1) / (n_class - 1)
+            self.mixed_pc = 100 * ((self.mixed_rank - 1) / (n_mixed - 1))
+
+    @staticmethod
+    def _codes(column):
+        # Codes in order of first appearance, as for Series.unique()
+        codes, uniques = pd.factorize(column)
+        return list(uniques), codes
+
+    def group(self, event, div, cls):
+        """ method group
+        positional slice of the rows of a group, empty if the group has no rows
+
+        """
+        return self.slices.get((event, div, cls), slice(0, 0))
+
+    def count(self, event, div, cls):
+        group = self.group(event, div, cls)
+        return group.stop - group.start
+
+    def rows(self, event):
+        return sum(group.stop - group.start for key, group in self.slices.items() if key[0] == event)
+
+    def subset(self, events):
+        """ method subset
+        index restricted to some events, e.g. to send a single event to a worker process
+
+        Parameters
+        ----------
+        events : list of str
+            events to keep
+
+        Returns
+        -------
+        PlotIndex
+            index holding only the given events
+
+        """
+        sub = PlotIndex.__new__(PlotIndex)
+        sub.events = [event for event in self.events if event in events]
+        sub.divisions = {event: self.divisions[event] for event in sub.events}
+        groups = [(key, group) for key, group in self.slices.items() if key[0] in sub.events]
+        rows = np.concatenate([np.arange(group.start, group.stop) for _, group in groups]) if groups else []
+
+        sub.slices = {}
+        start = 0
+        for key, group in groups:
+            sub.slices[key] = slice(start, start + group.stop - group.start)
+            start += group.stop - group.start
+        for attr in ['score', 'sep_rank', 'mixed_rank', 'sep_pc', 'mixed_pc']:
+            setattr(sub, attr, getattr(self, attr)[rows])
+        return sub
@@ -2,26 +2,129 @@
 #                 @jatkinson1000
 #
 # Date Created  : 2022-07-14
-# Last Modified : 2022-07-30
+# Last Modified : 2026-10-17
 #
 # Summary       : AGB Gender investigation for indoor competition.  plotting routines
 #
 
-import matplotlib.pyplot as plt
-from mpl_toolkits.axes_grid1.inset_locator import zoomed_inset_axes, mark_inset
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.colors import LinearSegmentedColormap, to_rgba
+from matplotlib.figure import Figure
 import numpy as np
 
+from archery_gender_analysis import instrument
+from archery_gender_analysis.plot_data import DENSITY_GRIDSIZE, DENSITY_THRESHOLD, PLOT_MODES, PlotIndex, sort_divisions
+
+
+def _new_figure(fsave):
+    # Figures that are only saved are not registered with pyplot, so need no GUI backend and
+    # are freed once they go out of scope
+    if fsave:
+        return Figure()
+    # pyplot is only loaded to show figures interactively
+    import matplotlib.pyplot as plt
+    return plt.figure()
+
+
+def _finish_figure(fig, fsave, fname):
+    if fsave:
+        fig.savefig(fname)
+    else:
+        import matplotlib.pyplot as plt
+        plt.show()
+        plt.close(fig)
+
+
+def _plot_index(data):
+    # Plotting routines accept either the raw dataframe or a prebuilt PlotIndex
+    if isinstance(data, PlotIndex):
+        return data
+    return PlotIndex(data)
+
+
+def _use_density(mode, n_points, threshold):
+    if mode not in PLOT_MODES:
+        raise ValueError(f"Unknown plot mode '{mode}', expected one of {PLOT_MODES}")
+    return mode == 'density' or (mode == 'auto' and n_points > threshold)
+
+
+def _extent(xs, ys, pad=0.5):
+    # Shared extent so the hexagons of both genders line up
+    x = np.concatenate(xs)
+    y = np.concatenate(ys)
+    x, y = x[np.isfinite(x)], y[np.isfinite(y)]
+    if len(x) == 0 or len(y) == 0:
+        return None
+    return x.min() - pad, x.max() + pad, y.min() - pad, y.max() + pad
+
 
-def scatter_scores(data, fsave=True, fpath='./results/'):
+def _draw_points(ax, x, y, colour, label, density=False, extent=None, s=None):
+    # Either one marker per archer, or a rasterised hexbin of counts shaded from transparent to
+    # the gender colour so that rendering time and file size do not depend on the number of archers
+    if not density:
+        if s is None:
+            ax.scatter(x, y, c=colour, label=label)
+        else:
+            ax.scatter(x, y, c=colour, s=s, label=label)
+        return
+
+    keep = np.isfinite(x) & np.isfinite(y)
+    if extent is not None:
+        keep &= (x >= extent[0]) & (x <= extent[1]) & (y >= extent[2]) & (y <= extent[3])
+    cmap = LinearSegmentedColormap.from_list(f'density_{colour}', [to_rgba(colour, 0.15), to_rgba(colour, 0.9)])
+    if keep.any():
+        ax.hexbin(x[keep], y[keep], gridsize=DENSITY_GRIDSIZE, extent=extent, bins='log', mincnt=1,
+                  cmap=cmap, linewidths=0, rasterized=True)
+    # Empty proxy so the legend shows the gender colour
+    ax.scatter([], [], c=colour, label=label)
+
+
+def _plot_scores(fig, index, event, mode='auto', density_threshold=DENSITY_THRESHOLD):
+
+    cat = index.divisions[event]
+
+    fig.set_size_inches(5*len(cat), 5)
+    ax = fig.subplots(1, len(cat), sharey='row', squeeze=False)[0]
+    for i, cat_i in enumerate(cat):
+        cat_m = index.group(event, cat_i, 'M')
+        cat_f = index.group(event, cat_i, 'W')
+        density = _use_density(mode, cat_m.stop - cat_m.start + cat_f.stop - cat_f.start, density_threshold)
+        extent = _extent([index.sep_pc[cat_m], index.sep_pc[cat_f]],
+                         [index.score[cat_m], index.score[cat_f]]) if density else None
+        _draw_points(ax[i], index.sep_pc[cat_m], index.score[cat_m], 'c', 'male', density, extent)
+        _draw_points(ax[i], index.sep_pc[cat_f], index.score[cat_f], 'r', 'female', density, extent)
+
+        ax[i].invert_xaxis()
+        ax[i].set_title(cat_i)
+        ax[i].set_xlabel('Split Ranking Position')
+        ax[i].legend(loc='lower right')
+
+    ax[0].set_ylabel('Score')
+    fig.suptitle(event)
+
+
+def scatter_scores(data, fsave=True, fpath='./results/', fmt='png', mode='auto',
+                   density_threshold=DENSITY_THRESHOLD):
     """ function scatter_scores
     plot a scatter of scores comparing 2 genders for a specific category
 
     Parameters
     ----------
-    data : pandas dataframe
-        pandas dataframe containing AGB tournament data
+    data : pandas dataframe or PlotIndex
+        pandas dataframe containing AGB tournament data, or a PlotIndex built from it
     fsave : bool
         string identifying file to save image to. Displays plot if None.
+    fpath : str
+        directory to save images to
+    fmt : str
+        image file format, e.g. 'png', 'pdf' or 'svg'
+    mode : str
+        'markers' to draw every archer, 'density' to draw rasterised hexbins of counts, or
+        'auto' to use density for divisions with more than density_threshold archers
+    density_threshold : int
+        number of archers in a division above which 'auto' mode draws density
 
     Returns
     -------
@@ -30,47 +133,60 @@ def scatter_scores(data, fsave=True, fpath='./results/'):
 
     """
 
-    for event in data["Event"].unique():
-
-        data_event = data[data["Event"] == event]
-        cat = data_event["Division"].unique()
-        cat = sorted(cat, key=lambda x: ['R', 'C', 'B', 'L'].index(x[0]))
-
-        fig, ax = plt.subplots(1, len(cat), figsize=(5*len(cat), 5), sharey='row')
-        for i, cat_i in enumerate(cat):
-            data_cat_m = data_event[(data_event['Class'] == f'M')
-                                    & (data_event['Division'] == f'{cat_i}')]
-            data_cat_f = data_event[(data_event['Class'] == f'W')
-                                    & (data_event['Division'] == f'{cat_i}')]
-            ax[i].scatter(100 * (data_cat_m['Sep rank'] - 1) / (len(data_cat_m) - 1),
-                          data_cat_m['Score'], c='c', label='male')
-            ax[i].scatter(100 * (data_cat_f['Sep rank'] - 1) / (len(data_cat_f) - 1),
-                          data_cat_f['Score'], c='r', label='female')
-
-            ax[i].invert_xaxis()
-            ax[i].set_title(cat_i)
-            ax[i].set_xlabel('Split Ranking Position')
-            ax[i].legend(loc='lower right')
-
-        ax[0].set_ylabel('Score')
-        plt.suptitle(event)
-
-        if fsave:
-            plt.savefig(f'{fpath}{event}_scores.png')
-        else:
-            plt.show()
+    index = _plot_index(data)
+    for event in index.events:
+
+        with instrument.stage('plot:scores', event=event, rows=index.rows(event)):
+            fig = _new_figure(fsave)
+            _plot_scores(fig, index, event, mode=mode, density_threshold=density_threshold)
+            _finish_figure(fig, fsave, f'{fpath}{event}_scores.{fmt}')
+
+
+def _plot_mixed_scores(fig, index, event, mode='auto', density_threshold=DENSITY_THRESHOLD):
+
+    cat = index.divisions[event]
 
+    fig.set_size_inches(5*len(cat), 5)
+    ax = fig.subplots(1, len(cat), sharey='row', squeeze=False)[0]
+    for cat_i, ax_i in zip(cat, ax.ravel()):
+        cat_m = index.group(event, cat_i, 'M')
+        cat_f = index.group(event, cat_i, 'W')
+        density = _use_density(mode, cat_m.stop - cat_m.start + cat_f.stop - cat_f.start, density_threshold)
+        extent = _extent([index.mixed_rank[cat_m], index.mixed_rank[cat_f]],
+                         [index.score[cat_m], index.score[cat_f]]) if density else None
 
-def scatter_mixed_scores(data, fsave=True, fpath='./results/'):
+        _draw_points(ax_i, index.mixed_rank[cat_m], index.score[cat_m], 'c', 'male', density, extent, s=2)
+        _draw_points(ax_i, index.mixed_rank[cat_f], index.score[cat_f], 'r', 'female', density, extent, s=2)
+
+        ax_i.invert_xaxis()
+        ax_i.set_title(cat_i)
+        ax_i.set_xlabel('Mixed Ranking Position')
+        ax_i.legend(loc='lower right')
+
+    ax[0].set_ylabel('Score')
+    fig.suptitle(event)
+
+
+def scatter_mixed_scores(data, fsave=True, fpath='./results/', fmt='png', mode='auto',
+                         density_threshold=DENSITY_THRESHOLD):
     """ function scatter_scores
     plot a scatter of scores comparing 2 genders for a specific category
 
     Parameters
     ----------
-    data : pandas dataframe
-        pandas dataframe containing AGB tournament data
+    data : pandas dataframe or PlotIndex
+        pandas dataframe containing AGB tournament data, or a PlotIndex built from it
     fsave : bool
         string identifying file to save image to. Displays plot if None.
+    fpath : str
+        directory to save images to
+    fmt : str
+        image file format, e.g. 'png', 'pdf' or 'svg'
+    mode : str
+        'markers' to draw every archer, 'density' to draw rasterised hexbins of counts, or
+        'auto' to use density for divisions with more than density_threshold archers
+    density_threshold : int
+        number of archers in a division above which 'auto' mode draws density
 
     Returns
     -------
@@ -78,147 +194,231 @@ def scatter_mixed_scores(data, fsave=True, fpath='./results/'):
         Plots to screen
 
     """
-    for event in data["Event"].unique():
-
-        data_event = data[data["Event"] == event]
-        cat = data_event["Division"].unique()
-        cat = sorted(cat, key=lambda x: ['R', 'C', 'B', 'L'].index(x[0]))
-
-        fig, ax = plt.subplots(1, len(cat), figsize=(5*len(cat), 5), sharey='row')
-        for cat_i, ax_i in zip(cat, ax.ravel()):
-            data_cat_m = data_event[(data_event['Class'] == f'M')
-                                    & (data_event['Division'] == f'{cat_i}')]
-            data_cat_f = data_event[(data_event['Class'] == f'W')
-                                    & (data_event['Division'] == f'{cat_i}')]
+    index = _plot_index(data)
+    for event in index.events:
+
+        with instrument.stage('plot:scores_mixed', event=event, rows=index.rows(event)):
+            fig = _new_figure(fsave)
+            _plot_mixed_scores(fig, index, event, mode=mode, density_threshold=density_threshold)
+            _finish_figure(fig, fsave, f'{fpath}{event}_scores_mixed.{fmt}')
+
+
+def _plot_percentile_scatter(fig, index, event, mode='auto', density_threshold=DENSITY_THRESHOLD):
+    # Only this plot has insets, so the toolkit is loaded here
+    from mpl_toolkits.axes_grid1.inset_locator import zoomed_inset_axes, mark_inset
+
+    cat = index.divisions[event]
+
+    fig.set_size_inches(5*len(cat), 5)
+    ax = fig.subplots(1, len(cat), sharey='row', squeeze=False)[0]
+    for cat_i, ax_i in zip(cat, ax.ravel()):
+        cat_m = index.group(event, cat_i, 'M')
+        cat_f = index.group(event, cat_i, 'W')
+        n_m = index.count(event, cat_i, 'M')
+        n_f = index.count(event, cat_i, 'W')
+        density = _use_density(mode, n_m + n_f, density_threshold)
+        # Percentiles span 0-100, so both genders share a fixed grid
+        extent = (-0.5, 100.5, -0.5, 100.5) if density else None
+
+        _draw_points(ax_i, index.sep_pc[cat_m], index.mixed_pc[cat_m], 'c', f'male ({n_m})', density, extent)
+        _draw_points(ax_i, index.sep_pc[cat_f], index.mixed_pc[cat_f], 'r', f'female ({n_f})', density, extent)
+
+        ax_i.plot([-10, 110], [-10, 110], 'k')
+
+        ax_i.set_title(cat_i)
+        ax_i.set_xlabel('Split Qualification Percentile')
+
+        ax_i.invert_yaxis()
+        ax_i.invert_xaxis()
+
+        if cat_i in 'RC':
+            # Insert axis
+            axins2 = zoomed_inset_axes(ax_i, zoom=2, loc='upper left', borderpad=2.5)
+            # sub-region of the original image
+            x1, x2, y1, y2 = -1.0, 16.0, -1.0, 16.0
+            # The inset bins only its own sub-region so keeps its resolution in density mode
+            inset_extent = (x1, x2, y1, y2) if density else None
+            _draw_points(axins2, index.sep_pc[cat_m], index.mixed_pc[cat_m], 'c', f'male ({n_m})', density,
+                         inset_extent)
+            _draw_points(axins2, index.sep_pc[cat_f], index.mixed_pc[cat_f], 'r', f'female ({n_f})', density,
+                         inset_extent)
+            axins2.plot([-10, 110], [-10, 110], 'k')
+
+            axins2.set_xlim(x1, x2)
+            axins2.set_ylim(y1, y2)
+            # fix the number of ticks on the inset axes
+            # axins2.yaxis.get_major_locator().set_params(nbins=7)
+            # axins2.xaxis.get_major_locator().set_params(nbins=7)
+            axins2.tick_params(labelleft=True, labelbottom=True)
+            axins2.invert_yaxis()
+            axins2.invert_xaxis()
+            axins2.set_aspect('equal')
+
+            # draw a bbox of the region of the inset axes in the parent axes and
+            # connecting lines between the bbox and the inset axes area
+            patch, pp1, pp2 = mark_inset(ax_i, axins2, loc1=2, loc2=1, fc="none", ec="0.0")
+            pp1.loc1 = 2
+            pp1.loc2 = 4
+            pp2.loc1 = 4
+            pp2.loc2 = 2
+
+        ax_i.set_xlim([105, -5])
+        ax_i.set_ylim([105, -5])
+        ax_i.set_aspect('equal')
+        ax_i.legend(loc='lower right')
+
+    ax[0].set_ylabel('Mixed Qualification Percentile')
+    fig.suptitle(event)
+
+
+def mixed_split_percentile(data, fsave=True, fpath='./results/', fmt='png', mode='auto',
+                           density_threshold=DENSITY_THRESHOLD):
+
+    index = _plot_index(data)
+    for event in index.events:
+
+        with instrument.stage('plot:percentile_scatter', event=event, rows=index.rows(event)):
+            fig = _new_figure(fsave)
+            _plot_percentile_scatter(fig, index, event, mode=mode, density_threshold=density_threshold)
+            _finish_figure(fig, fsave, f'{fpath}{event}_percentile_scatter.{fmt}')
+
+
+def plot_pos_changes(delta_pos, fid='', fpath='./results/', fmt='png', k=3):
+
+    # k is the number of positions in delta_pos, as passed to calc_pos_changes
+    with instrument.stage('plot:pos_changes', rows=len(delta_pos)):
+        _plot_pos_changes(delta_pos, fid, fpath, fmt, k)
 
-            ax_i.scatter(data_cat_m['Mixed rank'], data_cat_m['Score'], c='c', s=2, label='male')
-            ax_i.scatter(data_cat_f['Mixed rank'], data_cat_f['Score'], c='r', s=2, label='female')
-
-            ax_i.invert_xaxis()
-            ax_i.set_title(cat_i)
-            ax_i.set_xlabel('Mixed Ranking Position')
-            ax_i.legend(loc='lower right')
+    return None
 
-        ax[0].set_ylabel('Score')
-        plt.suptitle(event)
 
-        if fsave:
-            plt.savefig(f'{fpath}{event}_scores_mixed.png')
-        else:
-            plt.show()
-
-
-def mixed_split_percentile(data, fsave=True, fpath='./results/'):
-
-    for event in data["Event"].unique():
-
-        data_event = data[data["Event"] == event]
-        cat = data_event["Division"].unique()
-        cat = sorted(cat, key=lambda x: ['R', 'C', 'B', 'L'].index(x[0]))
-
-        fig, ax = plt.subplots(1, len(cat), figsize=(5*len(cat), 5), sharey='row')
-        for cat_i, ax_i in zip(cat, ax.ravel()):
-            data_cat_m = data_event[(data_event['Class'] == f'M')
-                                    & (data_event['Division'] == f'{cat_i}')]
-            data_cat_f = data_event[(data_event['Class'] == f'W')
-                                    & (data_event['Division'] == f'{cat_i}')]
-            n_mixed = len(data_cat_m) + len(data_cat_f)
-
-            ax_i.scatter(100*(data_cat_m['Sep rank']-1)/(len(data_cat_m)-1),
-                          100*((data_cat_m['Mixed rank']-1)/(n_mixed-1)), c='c', label=f'male ({len(data_cat_m)})')
-            ax_i.scatter(100*(data_cat_f['Sep rank']-1)/(len(data_cat_f)-1),
-                          100*((data_cat_f['Mixed rank']-1)/(n_mixed-1)), c='r', label=f'female ({len(data_cat_f)})')
-
-            ax_i.plot([-10, 110], [-10, 110], 'k')
-
-            ax_i.set_title(cat_i)
-            ax_i.set_xlabel('Split Qualification Percentile')
-
-            ax_i.invert_yaxis()
-            ax_i.invert_xaxis()
-
-            if cat_i in 'RC':
-                # Insert axis
-                axins2 = zoomed_inset_axes(ax_i, zoom=2, loc='upper left', borderpad=2.5)
-                axins2.scatter(100*(data_cat_m['Sep rank']-1)/(len(data_cat_m)-1),
-                               100*((data_cat_m['Mixed rank']-1)/(n_mixed-1)), c='c', label=f'male ({len(data_cat_m)})')
-                axins2.scatter(100*(data_cat_f['Sep rank']-1)/(len(data_cat_f)-1),
-                               100*((data_cat_f['Mixed rank']-1)/(n_mixed-1)), c='r', label=f'female ({len(data_cat_f)})')
-                axins2.plot([-10, 110], [-10, 110], 'k')
-
-                # sub-region of the original image
-                x1, x2, y1, y2 = -1.0, 16.0, -1.0, 16.0
-                axins2.set_xlim(x1, x2)
-                axins2.set_ylim(y1, y2)
-                # fix the number of ticks on the inset axes
-                # axins2.yaxis.get_major_locator().set_params(nbins=7)
-                # axins2.xaxis.get_major_locator().set_params(nbins=7)
-                axins2.tick_params(labelleft=True, labelbottom=True)
-                axins2.invert_yaxis()
-                axins2.invert_xaxis()
-                axins2.set_aspect('equal')
-
-                # draw a bbox of the region of the inset axes in the parent axes and
-                # connecting lines between the bbox and the inset axes area
-                patch, pp1, pp2 = mark_inset(ax_i, axins2, loc1=2, loc2=1, fc="none", ec="0.0")
-                pp1.loc1 = 2
-                pp1.loc2 = 4
-                pp2.loc1 = 4
-                pp2.loc2 = 2
-
-            ax_i.set_xlim([105, -5])
-            ax_i.set_ylim([105, -5])
-            ax_i.set_aspect('equal')
-            ax_i.legend(loc='lower right')
-
-        ax[0].set_ylabel('Mixed Qualification Percentile')
-        plt.suptitle(event)
-
-        if fsave:
-            plt.savefig(f'{fpath}{event}_percentile_scatter.png')
-        else:
-            plt.show()
+def _position_colours(k):
+    # Medal colours for the podium, shading from gold through to brown for longer lists of positions
+    if k <= 3:
+        return ['gold', 'silver', 'saddlebrown'][:k]
+    cmap = LinearSegmentedColormap.from_list('positions', ['gold', 'silver', 'saddlebrown'])
+    return [cmap(i / (k - 1)) for i in range(k)]
 
 
-def plot_pos_changes(delta_pos, fid='', fpath='./results/'):
+def _plot_pos_changes(delta_pos, fid, fpath, fmt, k=3):
     gen = ['M', 'W']
     gen_c = ['c', 'r']
-    pos_c = ['gold', 'silver', 'saddlebrown']
+    pos_c = _position_colours(k)
 
     # generate list of bowstyles for this event and sort as desired
-    cat = delta_pos["Division"].unique()
-    cat = sorted(cat, key=lambda x: ['R', 'C', 'B', 'L'].index(x[0]))
+    cat = sort_divisions(delta_pos["Division"].unique())
+
+    # Median and range of the position change for every division, class and position in one pass
+    dr_stats = (delta_pos.groupby(['Division', 'Class', 'Sep rank'], observed=True)['Delta rank']
+                .agg(['median', 'min', 'max']))
+    dr_xmin = delta_pos.groupby('Division', observed=True)['Delta rank'].min()
 
-    fig, ax = plt.subplots(1, len(cat), figsize=(3*len(cat), 4.5), sharey='row')
+    fig = Figure(figsize=(3*len(cat), 1.5*k))
+    ax = fig.subplots(1, len(cat), sharey='row', squeeze=False)[0]
     for j, cat_j in enumerate(cat):
         for i, gen_i in enumerate(gen):
-            for pos in range(1, 4):
-                dr_cr = delta_pos.loc[(delta_pos['Class'] == f'{gen[i]}')
-                                      & (delta_pos['Sep rank'] == pos)
-                                      & (delta_pos['Division'] == f'{cat_j}')]['Delta rank']
-
-                dr_err = [[dr_cr.median() - dr_cr.min()],
-                          [dr_cr.max() - dr_cr.median()]]
-                ax[j].scatter(dr_cr.median(), 3*(4-pos)-i-1, c=gen_c[i])
-                ax[j].errorbar(dr_cr.median(), 3*(4-pos)-i-1, xerr=dr_err, c=pos_c[pos-1],
+            for pos in range(1, k+1):
+                if (cat_j, gen_i, pos) in dr_stats.index:
+                    dr_med, dr_min, dr_max = dr_stats.loc[(cat_j, gen_i, pos)]
+                else:
+                    dr_med, dr_min, dr_max = np.nan, np.nan, np.nan
+
+                dr_err = [[dr_med - dr_min],
+                          [dr_max - dr_med]]
+                ax[j].scatter(dr_med, 3*(k+1-pos)-i-1, c=gen_c[i])
+                ax[j].errorbar(dr_med, 3*(k+1-pos)-i-1, xerr=dr_err, c=pos_c[pos-1],
                                capsize=5.0)
 
-            xmin = delta_pos.loc[delta_pos['Division'] == f'{cat_j}']['Delta rank'].min()
+            xmin = dr_xmin[cat_j]
             ax[j].set_xlim([(np.floor(xmin/5))*5-1, 1])
-            ax[j].set_ylim([0, 9])
+            ax[j].set_ylim([0, 3*k])
             ax[j].axvline(0.0, c='k', ls='--', alpha=0.1)
-            ax[j].axvline(-1.0, ymin=1/3, c='k', ls='--', alpha=0.1)
-            ax[j].axvline(-2.0, ymin=2/3, c='k', ls='--', alpha=0.1)
-            # ax[j].axvline(-3.0, ymin=2/3, c='k', ls='--', alpha=0.1)
+            # Position p can move down at most p-1 places
+            for pos in range(2, k+1):
+                ax[j].axvline(1.0-pos, ymin=(pos-1)/k, c='k', ls='--', alpha=0.1)
             ax[j].set_title(cat_j)
 
-        plt.suptitle(f'Position Changes for {fid}')
+        fig.suptitle(f'Position Changes for {fid}')
         fig.supxlabel('Change in position, split -> mixed gender')
 
-        y = [1.5, 4.5, 7.5]
-        labels = ['Bronze', 'Silver', 'Gold']
-        ax[0].set_yticks(y, labels, rotation='vertical', va='center')
+        y = [3*pos-1.5 for pos in range(1, k+1)]
+        if k == 3:
+            labels = ['Bronze', 'Silver', 'Gold']
+        else:
+            labels = [str(pos) for pos in range(k, 0, -1)]
+        ax[0].set_yticks(y, labels, rotation='vertical' if k <= 3 else 'horizontal', va='center')
+
+    fig.savefig(f'{fpath}{fid}position_changes.{fmt}')
 
-    plt.savefig(f'{fpath}{fid}position_changes.png')
 
-    return None
+# Per-event plot types: name -> (figure builder, file name suffix)
+PLOT_TYPES = {
+    'scores': (_plot_scores, '_scores'),
+    'scores_mixed': (_plot_mixed_scores, '_scores_mixed'),
+    'percentile_scatter': (_plot_percentile_scatter, '_percentile_scatter'),
+}
+
+
+def _use_agg():
+    matplotlib.use('Agg')
+
+
+def _render_job(plot_type, index, event, fname, mode='auto', density_threshold=DENSITY_THRESHOLD):
+    # Only recorded when rendering in this process, workers do not share the recorder
+    with instrument.stage(f'plot:{plot_type}', event=event, rows=index.rows(event)):
+        fig = Figure()
+        PLOT_TYPES[plot_type][0](fig, index, event, mode=mode, density_threshold=density_threshold)
+        fig.savefig(fname)
+    return fname
+
+
+def render_plots(data, plot_types=None, fpath='./results/', fmt='png', max_workers=None, mode='auto',
+                 density_threshold=DENSITY_THRESHOLD):
+    """ function render_plots
+    save the per-event figures of several plot types, optionally in parallel
+
+    Each (plot type, event) figure is an independent job. With max_workers > 1 jobs are
+    fanned out over a process pool using the non-interactive Agg backend; otherwise they are
+    rendered in turn. Figures are never registered with pyplot, so none are left open.
+
+    Parameters
+    ----------
+    data : pandas dataframe or PlotIndex
+        pandas dataframe containing AGB tournament data with separate and mixed ranks, or a
+        PlotIndex built from it
+    plot_types : list of str
+        plot types to render, keys of PLOT_TYPES. Defaults to all.
+    fpath : str
+        directory to save images to
+    fmt : str
+        image file format, e.g. 'png', 'pdf' or 'svg'
+    max_workers : int
+        number of processes to render with, serial if None or 1
+    mode : str
+        'markers', 'density' or 'auto', as for scatter_scores
+    density_threshold : int
+        number of archers in a division above which 'auto' mode draws density
+
+    Returns
+    -------
+    list of str
+        files written
+
+    """
+    if plot_types is None:
+        plot_types = list(PLOT_TYPES)
+
+    index = _plot_index(data)
+    jobs = []
+    for event in index.events:
+        # Workers only receive the rows of their own event
+        index_event = index.subset([event]) if max_workers is not None and max_workers > 1 else index
+        for plot_type in plot_types:
+            jobs.append((plot_type, index_event, event, f'{fpath}{event}{PLOT_TYPES[plot_type][1]}.{fmt}',
+                         mode, density_threshold))
+
+    if max_workers is None or max_workers <= 1:
+        return [_render_job(*job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_use_agg) as executor:
+        return list(executor.map(_render_job, *zip(*jobs)))
@@ -0,0 +1,178 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Mann-Whitney U and two-sample Kolmogorov-Smirnov tests for every group in one sorted pass
+#
+
+import numpy as np
+import pandas as pd
+
+from archery_gender_analysis import ranking
+
+
+def mixed_order(data, rank='Mixed rank', value='Score', mixed_keys=None):
+    """ function mixed_order
+    order of the rows by mixed group, best score first, from their mixed ranks
+
+    Mixed ranks already place each row within its group, so the order is recovered by an
+    integer sort of the rank offsets, which is close to linear as score files are grouped by
+    category, rather than ranking on the scores again. Rows without a rank are left out.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        dataframe of scores, ranked by calc_mixed_rank_percentiles
+    rank : str
+        column of mixed ranks, the rows are sorted on value within each group if it is missing
+    value : str
+        column ranked on
+    mixed_keys : list of str
+        columns defining the mixed groups, defaults to Event and Division
+
+    Returns
+    -------
+    numpy array of int
+        positions of the ranked rows in sorted order
+
+    """
+    if mixed_keys is None:
+        mixed_keys = ranking.MIXED_KEYS
+    groups, _ = ranking.group_codes(data, mixed_keys)
+
+    if rank not in data.columns:
+        values = data[value].to_numpy(dtype=np.float64)
+        groups[np.isnan(values)] = -1
+        order = ranking.sort_order(groups, [values])
+        return order[groups[order] >= 0]
+
+    ranks = data[rank].to_numpy(dtype=np.float64)
+    ranked = (groups >= 0) & ~np.isnan(ranks)
+    rows = np.flatnonzero(ranked)
+    groups = groups[rows]
+    # Offset of each group in the sorted rows, ties share the offset of their first slot
+    sizes = np.bincount(groups)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    slots = starts[groups] + ranks[rows].astype(np.int64) - 1
+    return rows[np.argsort(slots, kind='stable')]
+
+
+def rank_tests(data, keys, value='Score', cls='Class', classes=('M', 'W'), order=None):
+    """ function rank_tests
+    Mann-Whitney U and two-sample Kolmogorov-Smirnov tests between two classes, for every group
+
+    Rows in the mixed order are regrouped by the test groups with a stable sort, keeping
+    each group sorted by score. Midranks, rank sums, tie corrections and the difference of the
+    empirical distributions of the classes at every distinct score then come from cumulative
+    counts over that one sorted array, with no per-group loop.
+
+    p-values are two-sided and asymptotic, as scipy.stats.mannwhitneyu with
+    method='asymptotic' (with continuity and tie corrections) and scipy.stats.ks_2samp with
+    method='asymp'.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        dataframe containing the key, class and value columns, ranked by
+        calc_mixed_rank_percentiles
+    keys : list of str
+        columns defining the groups, which must include the mixed keys (Event and Division),
+        e.g. ['Event', 'Division'] or ['Event', 'Division', 'Rank band']
+    value : str
+        column to compare
+    cls : str
+        column holding the class of each row
+    classes : tuple of str
+        the two classes to compare, U is the statistic of classes[0]
+    order : numpy array of int
+        sorted order of the rows, from mixed_order if None
+
+    Returns
+    -------
+    pandas dataframe
+        size of each class ('n_M', 'n_W'), U statistic ('U') and p-value ('U p'), largest
+        difference of the empirical distributions ('D') and p-value ('D p'), indexed by the
+        group keys. Statistics are NaN for groups missing either class.
+
+    """
+    keys = list(keys)
+    missing_keys = [key for key in ranking.MIXED_KEYS if key not in keys]
+    if missing_keys:
+        raise ValueError(f'Test groups must be within the mixed groups, keys are missing {missing_keys}')
+    if order is None:
+        order = mixed_order(data, value=value)
+
+    groups, _ = ranking.group_codes(data, keys, sort=True)
+    class_values = data[cls].to_numpy()
+    in_classes = (class_values == classes[0]) | (class_values == classes[1])
+    order = order[(groups[order] >= 0) & in_classes[order]]
+    # A subsequence of the mixed order is still sorted by score within each test group
+    order = ranking.regroup(groups, order)
+
+    groups = groups[order]
+    values = data[value].to_numpy(dtype=np.float64)[order]
+    first = class_values[order] == classes[0]
+    n_rows = len(order)
+    pos = np.arange(n_rows)
+
+    new_group = np.ones(n_rows, dtype=bool)
+    new_group[1:] = groups[1:] != groups[:-1]
+    new_run = new_group.copy()
+    new_run[1:] |= values[1:] != values[:-1]
+    group_starts = np.flatnonzero(new_group)
+    run_starts = np.flatnonzero(new_run)
+    group_id = np.cumsum(new_group) - 1
+    run_id = np.cumsum(new_run) - 1
+
+    n = np.diff(np.append(group_starts, n_rows)).astype(np.float64)
+    n1 = np.add.reduceat(first.astype(np.float64), group_starts) if n_rows else np.zeros(0)
+    n2 = n - n1
+    run_len = np.diff(np.append(run_starts, n_rows)).astype(np.float64)
+
+    # Ascending midrank of each row: rows are sorted best first, so the run at descending
+    # positions a..b holds ascending ranks n+1-b..n+1-a
+    run_offset = (run_starts - group_starts[group_id[run_starts]]).astype(np.float64)
+    run_midrank = n[group_id[run_starts]] + 1 - (2*run_offset + run_len + 1) / 2
+    rank_sum = np.bincount(group_id, weights=run_midrank[run_id] * first, minlength=len(group_starts))
+    u1 = rank_sum - n1 * (n1 + 1) / 2
+    tie_term = np.bincount(group_id[run_starts], weights=run_len**3 - run_len, minlength=len(group_starts))
+
+    # Empirical survival functions of each class at the end of every run of equal scores,
+    # whose largest difference is the KS statistic
+    cum_first = np.cumsum(first) - np.concatenate([[0], np.cumsum(first)])[group_starts][group_id]
+    cum_second = pos + 1 - group_starts[group_id] - cum_first
+    run_end = np.append(run_starts[1:], n_rows) - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ecdf_diff = np.abs(cum_first[run_end] / n1[group_id[run_end]] - cum_second[run_end] / n2[group_id[run_end]])
+    d = np.maximum.reduceat(ecdf_diff, np.searchsorted(run_end, group_starts)) if n_rows else np.zeros(0)
+
+    u_p, d_p = _asymptotic_p(u1, d, n1, n2, tie_term)
+    valid = (n1 > 0) & (n2 > 0)
+    index = pd.MultiIndex.from_frame(data[keys].iloc[order[group_starts]])
+    return pd.DataFrame({
+        f'n_{classes[0]}': n1.astype(np.int64),
+        f'n_{classes[1]}': n2.astype(np.int64),
+        'U': np.where(valid, u1, np.nan),
+        'U p': np.where(valid, u_p, np.nan),
+        'D': np.where(valid, d, np.nan),
+        'D p': np.where(valid, d_p, np.nan),
+    }, index=index)
+
+
+def _asymptotic_p(u1, d, n1, n2, tie_term):
+    # Deferred so that scipy is only loaded by analyses running a test
+    from scipy.special import ndtr
+    from scipy.stats import kstwo
+
+    n = n1 + n2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Normal approximation of U with tie and continuity corrections, on the larger of U1 and U2
+        u = np.maximum(u1, n1 * n2 - u1)
+        s = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+        u_p = np.clip(2 * ndtr(-(u - n1 * n2 / 2 - 0.5) / s), 0, 1)
+        # Smirnov's distribution for the effective sample size
+        d_p = np.clip(kstwo.sf(d, np.round(n1 * n2 / n)), 0, 1)
+    return u_p, d_p
@@ -0,0 +1,319 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Vectorised ranking of scores within groups from a single sorted index
+#
+
+import numpy as np
+import pandas as pd
+
+from archery_gender_analysis import schema
+
+SEP_KEYS = ['Event', 'Division', 'Class']
+MIXED_KEYS = ['Event', 'Division']
+TIE_BREAKS = ['10']
+
+
+def group_codes(df_in, keys, sort=False, descending=()):
+    """ function group_codes
+    integer code identifying the group of each row for a set of key columns
+
+    Parameters
+    ----------
+    df_in : pandas dataframe
+        dataframe containing the key columns
+    keys : list of str
+        columns defining the groups
+    sort : bool
+        number the groups in the sorted order of their keys (as for sort_values)
+        rather than in order of first appearance
+    descending : list of str
+        keys sorted in descending order when sort is True
+
+    Returns
+    -------
+    codes : numpy array of int64
+        group code of each row, -1 where any key is missing
+    n_groups : int
+        upper bound on the number of distinct codes
+
+    """
+    codes = np.zeros(len(df_in), dtype=np.int64)
+    missing = np.zeros(len(df_in), dtype=bool)
+    n_groups = 1
+    for key in keys:
+        column = df_in[key]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Categorical columns are already factorised
+            key_codes, uniques = column.cat.codes.to_numpy(dtype=np.int64), column.cat.categories
+        else:
+            key_codes, uniques = pd.factorize(column, sort=sort)
+        if sort and key in descending:
+            key_codes = np.where(key_codes < 0, key_codes, len(uniques) - 1 - key_codes)
+        missing |= key_codes < 0
+        codes = codes * len(uniques) + key_codes
+        n_groups *= max(len(uniques), 1)
+        if n_groups > 2**31:
+            # Keep the combined codes compact so they cannot overflow
+            codes, uniques = pd.factorize(codes, sort=sort)
+            n_groups = len(uniques)
+    codes[missing] = -1
+    return codes, n_groups
+
+
+def sort_order(groups, sort_keys):
+    """ function sort_order
+    order rows by group then descending by each sort key in turn
+
+    Parameters
+    ----------
+    groups : numpy array of int
+        group code of each row
+    sort_keys : list of numpy arrays
+        values to rank on, most significant first, higher is better
+
+    Returns
+    -------
+    numpy array of int
+        indices that sort the rows
+
+    """
+    # lexsort uses the last key as the primary sort key
+    keys = [-np.asarray(key, dtype=np.float64) for key in reversed(sort_keys)]
+    return np.lexsort(keys + [groups])
+
+
+def regroup(groups, order):
+    """ function regroup
+    reorder sorted rows by group, keeping their order within each group
+
+    Parameters
+    ----------
+    groups : numpy array of int
+        group code of each row, from -1
+    order : numpy array of int
+        indices of the rows in sorted order
+
+    Returns
+    -------
+    numpy array of int
+        indices of the rows sorted by group, then in the given order
+
+    """
+    codes = groups[order]
+    # numpy sorts 16 bit integers stably with a radix sort, several times faster than for int64
+    if len(codes) and codes.max() < np.iinfo(np.int16).max:
+        codes = codes.astype(np.int16)
+    return order[np.argsort(codes, kind='stable')]
+
+
+def _descending_key(values):
+    # Ascending sort key for values ranked highest first, with missing values last as in sort_values
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), np.inf, -values)
+
+
+def top_k(df_in, k, keys=None, sort_keys=None, descending=('Event',)):
+    """ function top_k
+    positions of the k best rows of each group, without sorting the whole dataframe
+
+    Selects the same rows in the same order as sorting by keys then descending by sort keys
+    and taking head(k) of each group. Rows are ordered by score then regrouped by group code,
+    which gives the k-th best score of every group. Only rows at least as good as it are kept,
+    and only those few are ordered on the tie breaks as well and cut to their first k in each
+    group. There is no dataframe sort and no loop over groups.
+
+    Parameters
+    ----------
+    df_in : pandas dataframe
+        dataframe of scores
+    k : int
+        number of rows to take from each group, e.g. 3 for the podium or 16 for elimination seeds
+    keys : list of str
+        columns defining the groups, defaults to Event, Division, Class
+    sort_keys : list of str
+        columns to order rows within a group on, highest first, defaults to the score then 10s
+    descending : list of str
+        keys whose groups are ordered in descending order, the rest are ascending
+
+    Returns
+    -------
+    numpy array of int64
+        positions of the selected rows, ordered by group then within each group
+
+    """
+    if keys is None:
+        keys = SEP_KEYS
+    if sort_keys is None:
+        sort_keys = ['Score'] + TIE_BREAKS
+    if k < 1:
+        return np.zeros(0, dtype=np.int64)
+
+    groups, _ = group_codes(df_in, keys, sort=True, descending=descending)
+    # Rows with missing keys are dropped, as by groupby
+    rows = np.flatnonzero(groups >= 0)
+    groups = groups[rows]
+    primary = _descending_key(df_in[sort_keys[0]].to_numpy()[rows])
+
+    # Keep ties with the k-th best score of each group, the tie breaks decide between them
+    order = regroup(groups, np.argsort(primary, kind='stable'))
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.diff(sorted_groups, prepend=-1))
+    ends = np.append(starts[1:], len(order))
+    kth = np.full(groups.max() + 1 if len(groups) else 0, np.inf)
+    kth[sorted_groups[starts]] = primary[order[np.minimum(starts + k, ends) - 1]]
+    keep = primary <= kth[groups]
+    rows, groups = rows[keep], groups[keep]
+
+    # The lexsort is stable, so full ties keep their original order as in a stable sort
+    values = [_descending_key(df_in[col].to_numpy()[rows]) for col in sort_keys]
+    order = np.lexsort(values[::-1] + [groups])
+
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.diff(sorted_groups, prepend=-1))
+    pos_in_group = np.arange(len(order)) - np.repeat(starts, np.diff(np.append(starts, len(order))))
+
+    return rows[order[pos_in_group < k]].astype(np.int64, copy=False)
+
+
+def sorted_ranks(groups, sort_keys):
+    """ function sorted_ranks
+    rank and group size of rows that are already sorted by group and sort keys
+
+    Rows that tie on all sort keys share the lowest rank (as pandas rank method 'min').
+
+    Parameters
+    ----------
+    groups : numpy array of int
+        group code of each row, in sorted order
+    sort_keys : list of numpy arrays
+        values ranked on, in sorted order
+
+    Returns
+    -------
+    ranks : numpy array of int64
+        rank of each row within its group
+    counts : numpy array of int64
+        number of rows in the group of each row
+
+    """
+    n_rows = len(groups)
+    pos = np.arange(n_rows)
+
+    new_group = np.ones(n_rows, dtype=bool)
+    new_group[1:] = groups[1:] != groups[:-1]
+    new_run = new_group.copy()
+    for key in sort_keys:
+        new_run[1:] |= key[1:] != key[:-1]
+
+    group_start = np.maximum.accumulate(np.where(new_group, pos, 0))
+    run_start = np.maximum.accumulate(np.where(new_run, pos, 0))
+    ranks = run_start - group_start + 1
+
+    sizes = np.diff(np.append(np.flatnonzero(new_group), n_rows))
+    counts = np.repeat(sizes, sizes)
+
+    return ranks, counts
+
+
+def percentile(ranks, counts):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * ((ranks - 1) / (counts - 1))
+
+
+def _scatter(values, order, missing):
+    out = np.empty(len(order), dtype=np.float64)
+    out[order] = values
+    out[missing] = np.nan
+    return out
+
+
+def rank_percentiles(df_in, sep_keys=None, mixed_keys=None, tie_breaks=None, score='Score'):
+    """ function rank_percentiles
+    separate and mixed ranks and percentiles from one sorted index
+
+    Rows are sorted once by mixed group, score and tie breaks. The separate ranking
+    reuses that order, regrouping it with a stable sort on the separating key.
+
+    Parameters
+    ----------
+    df_in : pandas dataframe
+        dataframe of scores
+    sep_keys : list of str
+        columns defining the separate groups, defaults to Event, Division, Class
+    mixed_keys : list of str
+        columns defining the mixed groups, defaults to Event, Division
+    tie_breaks : list of str
+        columns to break ties on score in order, defaults to the 10s
+    score : str
+        column to rank on
+
+    Returns
+    -------
+    dict
+        numpy arrays of 'Sep rank', 'Sep pc', 'Mixed rank' and 'Mixed pc' for each row
+
+    """
+    if sep_keys is None:
+        sep_keys = SEP_KEYS
+    if mixed_keys is None:
+        mixed_keys = MIXED_KEYS
+    if tie_breaks is None:
+        tie_breaks = TIE_BREAKS
+
+    sort_keys = [df_in[col].to_numpy() for col in [score] + list(tie_breaks)]
+    mixed_groups, _ = group_codes(df_in, mixed_keys)
+    split_groups, n_split = group_codes(df_in, [key for key in sep_keys if key not in mixed_keys])
+    sep_groups = mixed_groups * n_split + split_groups
+
+    # Rows with missing keys or scores are left unranked, as in pandas
+    unranked = (mixed_groups < 0) | (split_groups < 0)
+    for key in sort_keys:
+        unranked |= pd.isna(key)
+    mixed_groups[unranked] = -1
+    sep_groups[unranked] = -1
+
+    mixed_order = sort_order(mixed_groups, sort_keys)
+    sep_order = regroup(sep_groups, mixed_order)
+
+    results = {}
+    for label, groups, order in [('Sep', sep_groups, sep_order), ('Mixed', mixed_groups, mixed_order)]:
+        ranks, counts = sorted_ranks(groups[order], [key[order] for key in sort_keys])
+        missing = unranked
+        results[f'{label} rank'] = _scatter(ranks, order, missing)
+        results[f'{label} pc'] = _scatter(percentile(ranks, counts), order, missing)
+
+    return results
+
+
+def calc_rank_percentiles(df_in, tie_breaks=None):
+    """ function calc_rank_percentiles
+    add separate and mixed ranks, percentiles and their deltas to a dataframe
+
+    Parameters
+    ----------
+    df_in : pandas dataframe
+        dataframe of scores
+    tie_breaks : list of str
+        columns to break ties on score in order, defaults to the 10s
+
+    Returns
+    -------
+    df_in : pandas dataframe
+        input with Sep rank, Sep pc, Mixed rank, Mixed pc, Delta rank and Delta pc columns
+
+    """
+    results = rank_percentiles(df_in, tie_breaks=tie_breaks)
+    if schema.is_compact(df_in):
+        results = schema.compact_columns(results)
+    for col, values in results.items():
+        df_in[col] = values
+
+    df_in['Delta rank'] = df_in["Sep rank"] - df_in["Mixed rank"]
+    df_in['Delta pc'] = df_in["Sep pc"] - df_in["Mixed pc"]
+
+    return df_in
@@ -0,0 +1,223 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Batched permutation and bootstrap tests of the difference in mean score
+#
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Default memory allowed for the resample matrices of one chunk (bytes)
+MEMORY_BUDGET = 256 * 2**20
+
+# Peak number of (n_resamples x n_rows) float64/int64 matrices alive at once while evaluating a chunk:
+# the sort keys, their argsort and the permuted scores of a permutation chunk (a bootstrap chunk peaks at 2)
+_MATRICES_PER_CHUNK = 3
+
+
+class GroupedSamples:
+    """ class GroupedSamples
+    scores sorted by group then class, with the segment boundaries of each
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        dataframe containing the key, class and value columns
+    keys : list of str
+        columns defining the groups
+    value : str
+        column to compare
+    cls : str
+        column holding the class of each row
+    classes : tuple of str
+        the two classes to compare, differences are classes[0] - classes[1]
+
+    """
+
+    def __init__(self, data, keys, value='Score', cls='Class', classes=('M', 'W')):
+        data = data[data[cls].isin(classes)]
+        grouped = data.groupby(list(keys), observed=True)
+        self.index = grouped.size().index
+        group = grouped.ngroup().to_numpy()
+        first = (data[cls] == classes[0]).to_numpy()
+
+        # Sort by group, with the first class ahead of the second within each group
+        order = np.lexsort([~first, group])
+        self.values = data[value].to_numpy(dtype=np.float64)[order]
+        self.group = group[order]
+        first = first[order]
+
+        n_groups = len(self.index)
+        self.n_rows = np.bincount(self.group, minlength=n_groups)
+        self.n_first = np.bincount(self.group, weights=first, minlength=n_groups).astype(np.int64)
+        self.n_second = self.n_rows - self.n_first
+        self.starts = np.concatenate([[0], np.cumsum(self.n_rows)[:-1]])
+        self.totals = np.bincount(self.group, weights=self.values, minlength=n_groups)
+
+        # Slots holding the first class: the leading n_first rows of each group
+        pos_in_group = np.arange(len(self.group)) - self.starts[self.group]
+        self.first_slot = pos_in_group < self.n_first[self.group]
+
+    def mean_diff(self, first_sums):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return first_sums / self.n_first - (self.totals - first_sums) / self.n_second
+
+    def observed(self):
+        first_sums = np.bincount(self.group, weights=self.values * self.first_slot, minlength=len(self.index))
+        return self.mean_diff(first_sums)
+
+
+def _segment_sums(matrix, starts):
+    # Sum each row of a (resamples x rows) matrix over the group segments
+    return np.add.reduceat(matrix, starts, axis=1)
+
+
+def _permutation_chunk(samples, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    # Random keys offset by group code: sorting them permutes rows within each group only
+    keys = samples.group[None, :] + rng.random((n_resamples, len(samples.values)))
+    permuted = samples.values[np.argsort(keys, axis=1)]
+    del keys
+    first_sums = _segment_sums(permuted * samples.first_slot, samples.starts)
+    return samples.mean_diff(first_sums)
+
+
+def _bootstrap_chunk(samples, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    # Resample with replacement within each (group, class) segment
+    seg_start = np.where(samples.first_slot, samples.starts[samples.group],
+                         samples.starts[samples.group] + samples.n_first[samples.group])
+    seg_len = np.where(samples.first_slot, samples.n_first[samples.group], samples.n_second[samples.group])
+    idx = seg_start + (rng.random((n_resamples, len(samples.values))) * seg_len).astype(np.int64)
+    resampled = samples.values[idx]
+    del idx
+    first_sums = _segment_sums(resampled * samples.first_slot, samples.starts)
+    totals = _segment_sums(resampled, samples.starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return first_sums / samples.n_first - (totals - first_sums) / samples.n_second
+
+
+def _chunk_sizes(n_resamples, n_rows, memory_budget):
+    per_resample = max(n_rows, 1) * 8 * _MATRICES_PER_CHUNK
+    chunk = max(1, min(n_resamples, memory_budget // per_resample))
+    return [min(chunk, n_resamples - start) for start in range(0, n_resamples, chunk)]
+
+
+def _resample(samples, chunk_func, n_resamples, seed, max_workers, memory_budget):
+    if len(samples.values) == 0:
+        return np.zeros((n_resamples, 0))
+    parallel = max_workers is not None and max_workers > 1
+    # Every worker holds a chunk at once, so they share the budget
+    sizes = _chunk_sizes(n_resamples, len(samples.values), memory_budget // max_workers if parallel else memory_budget)
+    # One independent stream per chunk, so results depend only on the chunk sizes
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if parallel and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunks = list(executor.map(chunk_func, [samples] * len(sizes), sizes, seeds))
+    else:
+        chunks = [chunk_func(samples, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    return np.concatenate(chunks, axis=0)
+
+
+def permutation_test(data, keys, n_resamples=9999, seed=None, max_workers=None, memory_budget=MEMORY_BUDGET,
+                     value='Score', cls='Class', classes=('M', 'W')):
+    """ function permutation_test
+    two-sided permutation test of the difference in mean between two classes, for every group
+
+    Class labels are shuffled within each group. All groups are permuted together in batched
+    index matrices, processed in chunks that fit the memory budget and optionally spread
+    over a process pool. Results are reproducible for a given seed, memory budget and number
+    of workers.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        dataframe containing the key, class and value columns
+    keys : list of str
+        columns defining the groups
+    n_resamples : int
+        number of permutations
+    seed : int
+        seed for the random number generator
+    max_workers : int
+        number of processes to spread chunks over, serial if None
+    memory_budget : int
+        maximum bytes used by the resample matrices at once, shared between the workers of a pool
+    value, cls, classes
+        as for GroupedSamples
+
+    Returns
+    -------
+    pandas dataframe
+        observed difference in means ('diff') and p-value ('p') indexed by the group keys
+
+    """
+    samples = GroupedSamples(data, keys, value=value, cls=cls, classes=classes)
+    observed = samples.observed()
+    diffs = _resample(samples, _permutation_chunk, n_resamples, seed, max_workers, memory_budget)
+
+    # Allow for rounding in the sums so permutations equal to the observed value count
+    extreme = np.abs(diffs) >= np.abs(observed) * (1 - 1e-12)
+    p = (extreme.sum(axis=0) + 1) / (n_resamples + 1)
+    p = np.where(np.isfinite(observed), p, np.nan)
+
+    return pd.DataFrame({'diff': observed, 'p': p}, index=samples.index)
+
+
+def bootstrap_test(data, keys, n_resamples=9999, seed=None, max_workers=None, memory_budget=MEMORY_BUDGET,
+                   confidence=0.95, value='Score', cls='Class', classes=('M', 'W')):
+    """ function bootstrap_test
+    bootstrap confidence interval and test of the difference in mean between two classes,
+    for every group
+
+    Each class is resampled with replacement within its group. Batching, chunking and
+    seeding are as for permutation_test.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        dataframe containing the key, class and value columns
+    keys : list of str
+        columns defining the groups
+    n_resamples : int
+        number of bootstrap resamples
+    seed : int
+        seed for the random number generator
+    max_workers : int
+        number of processes to spread chunks over, serial if None
+    memory_budget : int
+        maximum bytes used by the resample matrices at once, shared between the workers of a pool
+    confidence : float
+        confidence level of the percentile interval
+    value, cls, classes
+        as for GroupedSamples
+
+    Returns
+    -------
+    pandas dataframe
+        observed difference in means ('diff'), percentile interval ('ci_low', 'ci_high') and
+        two-sided p-value for a zero difference ('p') indexed by the group keys
+
+    """
+    samples = GroupedSamples(data, keys, value=value, cls=cls, classes=classes)
+    observed = samples.observed()
+    diffs = _resample(samples, _bootstrap_chunk, n_resamples, seed, max_workers, memory_budget)
+
+    alpha = (1 - confidence) / 2
+    with np.errstate(invalid='ignore'):
+        ci_low, ci_high = np.quantile(diffs, [alpha, 1 - alpha], axis=0)
+        p = np.minimum(1.0, 2 * np.minimum((diffs <= 0).mean(axis=0), (diffs >= 0).mean(axis=0)))
+    valid = np.isfinite(observed)
+
+    return pd.DataFrame({'diff': observed,
+                         'ci_low': np.where(valid, ci_low, np.nan),
+                         'ci_high': np.where(valid, ci_high, np.nan),
+                         'p': np.where(valid, p, np.nan)}, index=samples.index)
@@ -0,0 +1,347 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Buffered writers for results tables as text and in machine-readable formats
+#
+
+from contextlib import contextmanager
+import queue
+import threading
+
+import pandas as pd
+
+# Machine-readable formats and their file extensions. json is written as JSON Lines, one
+# record per row, so it can be appended in batches and read with pd.read_json(..., lines=True)
+FORMATS = {'csv': 'csv', 'json': 'jsonl', 'parquet': 'parquet'}
+# Results are written as the fixed-width text tables by default, the machine-readable formats are opt-in
+DEFAULT_FORMATS = ()
+
+# Rows buffered by a stream before they are written out as one batch
+BATCH_ROWS = 100_000
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _as_frame(table, index):
+    # Tables are written flat, with any index written as ordinary leading columns
+    if isinstance(table, pd.Series):
+        table = table.to_frame()
+    if index:
+        table = table.reset_index()
+    return table
+
+
+class _CsvSink:
+    def __init__(self, fname):
+        self.f = open(fname, 'w', newline='')
+        self.header = True
+
+    def write(self, batch):
+        batch.to_csv(self.f, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        self.f.close()
+
+
+class _JsonSink:
+    def __init__(self, fname):
+        self.f = open(fname, 'w')
+
+    def write(self, batch):
+        if len(batch):
+            self.f.write(batch.to_json(orient='records', lines=True).rstrip('\n') + '\n')
+
+    def close(self):
+        self.f.close()
+
+
+class _ParquetSink:
+    def __init__(self, fname):
+        self.fname = fname
+        self.writer = None
+
+    def write(self, batch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.fname, table.schema)
+        else:
+            # Later batches may infer narrower types, e.g. categories, so follow the first batch
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _TextSink:
+    # Human-readable view, as the fixed-width text previously written. This needs the whole
+    # table, so batches are kept until the sink is closed.
+    def __init__(self, fname, index):
+        self.fname = fname
+        self.index = index
+        self.batches = []
+
+    def write(self, batch):
+        self.batches.append(batch)
+
+    def close(self):
+        if self.batches:
+            table = pd.concat(self.batches) if len(self.batches) > 1 else self.batches[0]
+        else:
+            table = pd.DataFrame()
+        with open(self.fname, 'w') as f:
+            f.write(table.to_string(index=self.index))
+
+
+_SINKS = {'csv': _CsvSink, 'json': _JsonSink, 'parquet': _ParquetSink}
+
+
+class TableStream:
+    """ class TableStream
+    table written in buffered batches as rows are appended
+
+    Created by ResultWriter.stream. Appended frames are buffered until at least batch_rows
+    rows are held, then written to every format as one batch.
+
+    """
+
+    def __init__(self, writer, name, columns=None):
+        self.writer = writer
+        self.name = name
+        self.columns = columns
+        self.buffer = []
+        self.n_buffered = 0
+        self.sinks = None
+
+    def append(self, frame):
+        """ method append
+        add rows to the table
+
+        Parameters
+        ----------
+        frame : pandas dataframe
+            rows to add, restricted to the stream's columns if given. The frame must not be
+            modified afterwards when writing in the background.
+
+        """
+        if self.columns is not None:
+            frame = frame[self.columns]
+        self.buffer.append(frame)
+        self.n_buffered += len(frame)
+        if self.n_buffered >= self.writer.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch = pd.concat(self.buffer, ignore_index=True) if len(self.buffer) > 1 else self.buffer[0]
+        self.buffer = []
+        self.n_buffered = 0
+        self.writer._submit(self._write, batch)
+
+    def close(self):
+        self.flush()
+        self.writer._submit(self._close)
+
+    def _open(self):
+        # Files are opened on first write, in the thread doing the writing
+        self.sinks = [_SINKS[fmt](self.writer.fname(self.name, FORMATS[fmt])) for fmt in self.writer.formats]
+        if self.writer.text:
+            self.sinks.append(_TextSink(self.writer.fname(self.name, 'txt'), index=False))
+
+    def _write(self, batch):
+        if self.sinks is None:
+            self._open()
+        for sink in self.sinks:
+            sink.write(batch)
+
+    def _close(self):
+        if self.sinks is None:
+            self._open()
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ResultWriter:
+    """ class ResultWriter
+    write results tables to <fpath><fpref><name>.<ext> as text and in machine-readable formats
+
+    Tables can be written whole with write_table or in buffered batches through a stream.
+    With background=True the writing is done in order by a single worker thread, so the
+    analysis can carry on while results are written. Any error raised while writing is
+    re-raised by close.
+
+    Parameters
+    ----------
+    fpath : str
+        directory to write results to
+    fpref : str
+        prefix for the result file names
+    formats : list of str
+        machine-readable formats to write, from 'csv', 'json' and 'parquet' (requires pyarrow)
+    text : bool
+        write the human-readable fixed-width text view of each table to .txt
+    batch_rows : int
+        rows buffered by a stream before each write
+    background : bool
+        write from a background thread
+
+    """
+
+    def __init__(self, fpath='./results/', fpref='', formats=DEFAULT_FORMATS, text=True, batch_rows=BATCH_ROWS,
+                 background=False):
+        formats = list(formats)
+        for fmt in formats:
+            if fmt not in FORMATS:
+                raise ValueError(f"Unknown results format '{fmt}', expected one of {list(FORMATS)}")
+        if 'parquet' in formats and not parquet_available():
+            raise ImportError("Writing parquet results requires pyarrow")
+
+        self.fpath = fpath
+        self.fpref = fpref
+        self.formats = formats
+        self.text = text
+        self.batch_rows = batch_rows
+        self.error = None
+
+        self.queue = None
+        self.thread = None
+        if background:
+            self.queue = queue.Queue()
+            self.thread = threading.Thread(target=self._work, daemon=True)
+            self.thread.start()
+
+    def fname(self, name, ext):
+        return f'{self.fpath}{self.fpref}{name}.{ext}'
+
+    def _work(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            if self.error is None:
+                func, args = task
+                try:
+                    func(*args)
+                except Exception as err:
+                    # Keep going to drain the queue, the error is raised by close
+                    self.error = err
+
+    def _submit(self, func, *args):
+        if self.queue is None:
+            func(*args)
+        else:
+            self.queue.put((func, args))
+
+    def write_table(self, name, table, index=True):
+        """ method write_table
+        write a whole table
+
+        Parameters
+        ----------
+        name : str
+            name of the table, used for the file name
+        table : pandas dataframe or series
+            table to write
+        index : bool
+            write the index (as leading columns), e.g. for the grouped statistics tables
+
+        """
+        frame = _as_frame(table, index)
+        for fmt in self.formats:
+            self._submit(self._write_whole, _SINKS[fmt], self.fname(name, FORMATS[fmt]), frame)
+        if self.text:
+            self._submit(self._write_text, self.fname(name, 'txt'), table, index)
+
+    @staticmethod
+    def _write_whole(sink_class, fname, frame):
+        sink = sink_class(fname)
+        try:
+            sink.write(frame)
+        finally:
+            sink.close()
+
+    @staticmethod
+    def _write_text(fname, table, index):
+        with open(fname, 'w') as f:
+            f.write(table.to_string(index=index))
+
+    def stream(self, name, columns=None):
+        """ method stream
+        open a table to be written in batches
+
+        Parameters
+        ----------
+        name : str
+            name of the table, used for the file name
+        columns : list of str
+            columns to write, all if None
+
+        Returns
+        -------
+        TableStream
+            stream to append rows to, closed with close() or as a context manager
+
+        """
+        return TableStream(self, name, columns)
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+@contextmanager
+def use_writer(writer=None, fpath='./results/', fpref='', formats=DEFAULT_FORMATS, text=True):
+    """ function use_writer
+    context giving the writer to use, either one passed in or a new one closed on exit
+
+    Parameters
+    ----------
+    writer : ResultWriter
+        writer shared with other output, left open. A new writer is made if None.
+    fpath, fpref, formats, text
+        options for a new ResultWriter
+
+    Yields
+    ------
+    ResultWriter
+        writer to write results with
+
+    """
+    if writer is not None:
+        yield writer
+        return
+    with ResultWriter(fpath=fpath, fpref=fpref, formats=formats, text=text) as new_writer:
+        yield new_writer
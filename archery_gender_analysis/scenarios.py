@@ -0,0 +1,231 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Ranking under many alternative category and tie-break rules in one vectorised run
+#
+
+import numpy as np
+import pandas as pd
+
+from archery_gender_analysis import ranking
+
+
+class Scenario:
+    """ class Scenario
+    a rule for forming competition fields and ranking archers within them
+
+    Examples
+    --------
+    Scenario('separate', keys=['Event', 'Division', 'Class'])
+        the separate categories of calc_separate_rank_percentiles
+    Scenario('mixed')
+        the mixed categories of calc_mixed_rank_percentiles
+    Scenario('mixed 10s 9s', tie_breaks=['10', '9'])
+        mixed categories breaking ties on 10s then 9s
+    Scenario('barebow with recurve', merge={'Division': {'B': 'R'}})
+        mixed categories with barebow archers shooting in the recurve field
+    Scenario('mixed quota 8', quota=8)
+        mixed fields of the best 8 archers of each class in a division
+
+    Parameters
+    ----------
+    name : str
+        name of the scenario in the results
+    keys : list of str
+        columns whose values define the fields, defaults to Event and Division
+    tie_breaks : list of str
+        columns to break ties on score in order, defaults to the 10s
+    merge : dict
+        for key columns, a mapping of values to the value of the field they join,
+        e.g. {'Division': {'B': 'R', 'L': 'R'}}. Unmapped values keep their own field.
+    quota : int
+        if given, only the best quota archers of each quota_key value within a field enter it,
+        the rest are unranked
+    quota_key : str
+        column the quota applies to each value of
+
+    """
+
+    def __init__(self, name, keys=None, tie_breaks=None, merge=None, quota=None, quota_key='Class'):
+        self.name = name
+        self.keys = list(ranking.MIXED_KEYS if keys is None else keys)
+        self.tie_breaks = tuple(ranking.TIE_BREAKS if tie_breaks is None else tie_breaks)
+        self.merge = {} if merge is None else dict(merge)
+        self.quota = quota
+        self.quota_key = quota_key
+
+    def __repr__(self):
+        return f'Scenario({self.name!r})'
+
+
+def _key_codes(column, mapping=None):
+    # Codes of a key column, with values that map to the same field sharing a code
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes, uniques = column.cat.codes.to_numpy(dtype=np.int64), column.cat.categories
+    else:
+        codes, uniques = pd.factorize(column)
+    if mapping:
+        merged, merged_uniques = pd.factorize(pd.Index([mapping.get(value, value) for value in uniques]))
+        codes = np.where(codes < 0, -1, merged[np.maximum(codes, 0)])
+        uniques = merged_uniques
+    return codes, max(len(uniques), 1)
+
+
+def field_codes(df_in, scenario, keys=None):
+    """ function field_codes
+    integer code identifying the field of each row under a scenario
+
+    Parameters
+    ----------
+    df_in : pandas dataframe
+        dataframe of scores
+    scenario : Scenario
+        scenario defining the fields
+    keys : list of str
+        key columns to use in place of the scenario's, merged as the scenario merges them
+
+    Returns
+    -------
+    numpy array of int64
+        field of each row, -1 where any key is missing. Fields are numbered from 0 but
+        not necessarily consecutively.
+
+    """
+    codes = np.zeros(len(df_in), dtype=np.int64)
+    missing = np.zeros(len(df_in), dtype=bool)
+    n_fields = 1
+    for key in scenario.keys if keys is None else keys:
+        key_codes, n_codes = _key_codes(df_in[key], scenario.merge.get(key))
+        missing |= key_codes < 0
+        codes = codes * n_codes + key_codes
+        n_fields *= n_codes
+        if n_fields > 2**31:
+            # Keep the combined codes compact so they cannot overflow, as in ranking.group_codes
+            codes, uniques = pd.factorize(codes)
+            n_fields = len(uniques)
+    codes[missing] = -1
+    if n_fields > np.iinfo(np.int16).max:
+        # Renumber the fields compactly, so that they can be regrouped by a radix sort
+        codes[~missing] = pd.factorize(codes[~missing])[0]
+    return codes
+
+
+def _grouped_ranks(groups, order, sort_keys):
+    # Ranks and group sizes of rows in a global order sorted by score, regrouped with a stable sort
+    grouped = ranking.regroup(groups, order)
+    ranks, counts = ranking.sorted_ranks(groups[grouped], [key[grouped] for key in sort_keys])
+    return grouped, ranks, counts
+
+
+def rank_scenarios(df_in, scenarios, score='Score'):
+    """ function rank_scenarios
+    ranks and percentiles of every archer under many scenarios at once
+
+    Rows are sorted once by score and tie breaks for each distinct set of tie breaks. Every
+    scenario using it reuses that order: the field codes of all of them are stacked and
+    regrouped by one stable sort, and ranked in one pass over the stacked arrays.
+
+    Parameters
+    ----------
+    df_in : pandas dataframe
+        dataframe of scores
+    scenarios : list of Scenario
+        scenarios to rank under, names must be unique
+    score : str
+        column to rank on
+
+    Returns
+    -------
+    pandas dataframe
+        one row per scenario and archer with columns Scenario, Archer (the index of df_in),
+        Rank, Percentile and Field size. Archers not in any field of a scenario are NaN.
+
+    """
+    names = [scenario.name for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError('Scenario names must be unique')
+
+    n_rows = len(df_in)
+    # Row s*n_rows + r of each array is row r of df_in under the s-th scenario
+    rank = np.full(len(scenarios) * n_rows, np.nan)
+    pc = np.full(len(scenarios) * n_rows, np.nan)
+    size = np.full(len(scenarios) * n_rows, np.nan)
+
+    by_tie_breaks = {}
+    for i, scenario in enumerate(scenarios):
+        by_tie_breaks.setdefault(scenario.tie_breaks, []).append(i)
+
+    for tie_breaks, members in by_tie_breaks.items():
+        sort_keys = [df_in[col].to_numpy() for col in [score] + list(tie_breaks)]
+        unranked = np.zeros(n_rows, dtype=bool)
+        for key in sort_keys:
+            unranked |= pd.isna(key)
+        sort_keys = [np.asarray(key, dtype=np.float64) for key in sort_keys]
+        # Shared by every scenario breaking ties this way
+        order = ranking.sort_order(np.where(unranked, -1, 0), sort_keys)
+
+        stacked, n_fields = [], 0
+        for i in members:
+            scenario = scenarios[i]
+            fields = field_codes(df_in, scenario)
+            fields[unranked] = -1
+            if scenario.quota is not None:
+                # Rank within each class of a field, only the best quota of each enter it
+                classes = field_codes(df_in, scenario, keys=scenario.keys + [scenario.quota_key])
+                classes[fields < 0] = -1
+                grouped, class_ranks, _ = _grouped_ranks(classes, order, sort_keys)
+                excluded = np.zeros(n_rows, dtype=bool)
+                excluded[grouped] = class_ranks > scenario.quota
+                fields[excluded | (classes < 0)] = -1
+            stacked.append(np.where(fields < 0, -1, fields + n_fields))
+            n_fields += fields.max(initial=-1) + 1
+
+        # All scenarios regrouped and ranked together, stacked row j*n_rows + r is row r of the j-th member
+        stacked = np.concatenate(stacked)
+        stacked_order = np.concatenate([order + j * n_rows for j in range(len(members))])
+        grouped = ranking.regroup(stacked, stacked_order)
+        member, row = np.divmod(grouped, n_rows)
+        ranks, counts = ranking.sorted_ranks(stacked[grouped], [key[row] for key in sort_keys])
+
+        out = np.asarray(members)[member] * n_rows + row
+        rank[out] = ranks
+        pc[out] = ranking.percentile(ranks, counts)
+        size[out] = counts
+        # Rows in no field were ranked together under -1, they are left unranked
+        unfielded = np.asarray(members)[:, None] * n_rows + np.arange(n_rows)
+        unfielded = unfielded.ravel()[stacked < 0]
+        rank[unfielded] = np.nan
+        pc[unfielded] = np.nan
+        size[unfielded] = np.nan
+
+    return pd.DataFrame({
+        'Scenario': pd.Categorical.from_codes(np.repeat(np.arange(len(scenarios)), n_rows), categories=names),
+        'Archer': np.tile(df_in.index.to_numpy(), len(scenarios)),
+        'Rank': rank,
+        'Percentile': pc,
+        'Field size': size,
+    })
+
+
+def scenario_table(results, value='Rank'):
+    """ function scenario_table
+    one column of the results of rank_scenarios for each scenario, one row for each archer
+
+    Parameters
+    ----------
+    results : pandas dataframe
+        output of rank_scenarios
+    value : str
+        column to tabulate, e.g. 'Rank' or 'Percentile'
+
+    Returns
+    -------
+    pandas dataframe
+        values indexed by archer with a column for each scenario
+
+    """
+    return results.pivot(index='Archer', columns='Scenario', values=value)
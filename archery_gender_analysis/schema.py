@@ -0,0 +1,132 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Compact column types for the combined dataset
+#
+
+import numpy as np
+import pandas as pd
+
+# Label columns, held as categoricals with lexically sorted categories so that sorting on
+# the codes gives the same order as sorting the strings
+LABEL_COLUMNS = ['Event', 'Division', 'Class']
+
+# Divisions and classes found at indoor events, others are added to the categories when read
+CATEGORIES = {'Division': ['B', 'C', 'L', 'R'], 'Class': ['M', 'W']}
+
+# Smallest types holding every value of the numeric columns. Scores are at most 600 and
+# 10s and 9s at most 60 for an indoor round, ranks are bounded by the size of an event.
+COMPACT_SCHEMA = {
+    'Score': np.int16,
+    '10': np.int8,
+    '9': np.int8,
+    'Category Rank': np.int32,
+    'Sep rank': np.int32,
+    'Mixed rank': np.int32,
+    'Delta rank': np.int32,
+    'Sep pc': np.float32,
+    'Mixed pc': np.float32,
+    'Delta pc': np.float32,
+}
+
+
+def is_compact(df_in):
+    # A dataframe is compact if its label columns are categorical
+    labels = [col for col in LABEL_COLUMNS if col in df_in.columns]
+    return bool(labels) and all(isinstance(df_in[col].dtype, pd.CategoricalDtype) for col in labels)
+
+
+def _compact_labels(column, categories=None):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        if categories is None and list(column.cat.categories) == sorted(column.cat.categories):
+            return column
+        values = column.astype(object)
+    else:
+        values = column
+    present = pd.unique(values.dropna())
+    if categories is None:
+        categories = sorted(present)
+    else:
+        # Keep every value, adding any not in the given categories
+        categories = sorted(set(categories).union(present))
+    return pd.Series(pd.Categorical(values, categories=categories), index=column.index, name=column.name)
+
+
+def compact_dtype(col, values):
+    """ function compact_dtype
+    compact type of a column of the schema for some values
+
+    Integer columns holding missing values, such as ranks of unranked rows, are float32.
+
+    Parameters
+    ----------
+    col : str
+        column name, a key of COMPACT_SCHEMA
+    values : array_like
+        values of the column
+
+    Returns
+    -------
+    numpy dtype
+        type to hold the values in
+
+    Raises
+    ------
+    ValueError
+        if the values do not fit in the compact type
+
+    """
+    dtype = np.dtype(COMPACT_SCHEMA[col])
+    values = np.asarray(values)
+    if dtype.kind != 'i':
+        return dtype
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        return np.dtype(np.float32)
+    if len(values):
+        info = np.iinfo(dtype)
+        if values.min() < info.min or values.max() > info.max:
+            raise ValueError(f"Values of column '{col}' do not fit the compact type {dtype}")
+    return dtype
+
+
+def compact_columns(columns):
+    # Cast a dict of numpy arrays, e.g. from ranking.rank_percentiles, to the compact types
+    return {col: values.astype(compact_dtype(col, values), copy=False) if col in COMPACT_SCHEMA else values
+            for col, values in columns.items()}
+
+
+def apply_compact_schema(df_in, categories=None):
+    """ function apply_compact_schema
+    cast the columns of a dataframe to the compact schema
+
+    Label columns become categoricals, scores, counts and ranks small integers and
+    percentiles float32. Columns not in the schema are left as they are.
+
+    Parameters
+    ----------
+    df_in : pandas dataframe
+        dataframe of scores, e.g. from read_from_files or after ranking
+    categories : dict
+        categories of label columns, e.g. every event to be read so that events read
+        separately can be combined without losing the categorical type
+
+    Returns
+    -------
+    pandas dataframe
+        the input with its columns cast, modified in place
+
+    """
+    if categories is None:
+        categories = {}
+    for col in LABEL_COLUMNS:
+        if col in df_in.columns:
+            df_in[col] = _compact_labels(df_in[col], categories.get(col))
+    for col in COMPACT_SCHEMA:
+        if col in df_in.columns:
+            values = df_in[col].to_numpy()
+            df_in[col] = values.astype(compact_dtype(col, values), copy=False)
+    return df_in
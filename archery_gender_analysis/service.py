@@ -0,0 +1,401 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Local HTTP service answering rank, percentile and mixed category what-if queries
+#
+# Usage         : archery-gender-service [Nimes22 ...] [--port 8765] [--cache-mb 256]
+#
+#                 GET /events
+#                 GET /archer?event=Nimes22&division=C&class=W&position=3
+#                 GET /score?event=Nimes22&division=C&score=585&tens=45[&class=W]
+#                 GET /cache
+#
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import ranking
+
+# Tie breaks are combined with the score into one sortable key, a count of 10s is well below this
+TIE_SCALE = 1000
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+class LRUCache:
+    """ class LRUCache
+    in-memory least recently used cache bounded by the total size of its values
+
+    Parameters
+    ----------
+    max_bytes : int
+        total size of the values above which the least recently used are evicted.
+        The most recent value is always kept, even if it is larger than this.
+    sizeof : callable
+        function returning the size in bytes of a value
+
+    """
+
+    def __init__(self, max_bytes, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self):
+        return list(self._entries)
+
+    def get(self, key):
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value):
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)[1]
+        size = self.sizeof(value)
+        self._entries[key] = (value, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, old_size) = self._entries.popitem(last=False)
+            self.total_bytes -= old_size
+            self.evictions += 1
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+def _json_value(value):
+    # numpy scalars as python numbers, with missing values (e.g. the percentile of a lone archer) as null
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+class EventRanking:
+    """ class EventRanking
+    ranked scores of one event with sorted score keys of every field for what-if lookups
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        scores of a single event with separate and mixed ranks, as from calc_delta_sep_mixed
+
+    """
+
+    COLUMNS = ['Score', '10', '9', 'Sep rank', 'Sep pc', 'Mixed rank', 'Mixed pc', 'Delta rank', 'Delta pc']
+
+    def __init__(self, data):
+        self.data = data
+        keys = -_score_key(data['Score'].to_numpy(), data[ranking.TIE_BREAKS[0]].to_numpy())
+        # Negated keys sorted ascending for each division (the mixed field) and division and class
+        self.fields = {}
+        for div, rows in data.groupby('Division', observed=True).indices.items():
+            self.fields[(div, None)] = np.sort(keys[rows])
+        for (div, cls), rows in data.groupby(['Division', 'Class'], observed=True).indices.items():
+            self.fields[(div, cls)] = np.sort(keys[rows])
+
+    @property
+    def nbytes(self):
+        return int(self.data.memory_usage(deep=True).sum()) + sum(keys.nbytes for keys in self.fields.values())
+
+    def _field(self, div, cls=None):
+        try:
+            return self.fields[(div, cls)]
+        except KeyError:
+            raise LookupError(f"No archers in division '{div}'" + (f" class '{cls}'" if cls else '')) from None
+
+    def archer(self, div, cls, position):
+        """ method archer
+        separate and mixed ranks and percentiles of the archer(s) at a position in their class
+
+        Parameters
+        ----------
+        div : str
+            division, e.g. 'C'
+        cls : str
+            class, e.g. 'W'
+        position : int
+            separate rank, archers tied at it are all returned
+
+        Returns
+        -------
+        list of dict
+            score, 10s, 9s, ranks, percentiles and their changes of each archer
+
+        """
+        self._field(div, cls)
+        data = self.data
+        rows = data[(data['Division'] == div) & (data['Class'] == cls) & (data['Sep rank'] == position)]
+        if rows.empty:
+            raise LookupError(f"No archer at position {position} of division '{div}' class '{cls}'")
+        return [{col: _json_value(value) for col, value in zip(self.COLUMNS, values)}
+                for values in rows[self.COLUMNS].itertuples(index=False)]
+
+    def hypothetical(self, div, score, tens, cls=None):
+        """ method hypothetical
+        rank and percentile a score would have in the mixed field of a division, and in a class
+
+        Ranks count the archers strictly better on score then 10s, and percentiles are of
+        the field with the hypothetical archer added, as for calc_mixed_rank_percentiles.
+
+        Parameters
+        ----------
+        div : str
+            division, e.g. 'C'
+        score : int
+            score of the hypothetical archer
+        tens : int
+            10s of the hypothetical archer
+        cls : str
+            class to also give the separate rank and percentile in, if any
+
+        Returns
+        -------
+        dict
+            Mixed rank, Mixed pc and field size, and the Sep and Delta values if cls is given
+
+        """
+        key = -_score_key(score, tens)
+        result = {'Score': score, '10': tens}
+        for label, field in [('Sep', cls), ('Mixed', None)]:
+            if label == 'Sep' and cls is None:
+                continue
+            keys = self._field(div, field)
+            rank = int(np.searchsorted(keys, key, side='left')) + 1
+            result[f'{label} rank'] = rank
+            result[f'{label} pc'] = _json_value(ranking.percentile(rank, len(keys) + 1))
+            result[f'{label} size'] = len(keys) + 1
+        if cls is not None:
+            result['Delta rank'] = result['Sep rank'] - result['Mixed rank']
+            result['Delta pc'] = (None if None in (result['Sep pc'], result['Mixed pc'])
+                                  else result['Sep pc'] - result['Mixed pc'])
+        return result
+
+
+def _score_key(score, tens):
+    return np.asarray(score, dtype=np.float64) * TIE_SCALE + np.asarray(tens, dtype=np.float64)
+
+
+class QueryService:
+    """ class QueryService
+    rank, percentile and what-if queries on events read from the event store
+
+    Each event is read and ranked on its first query and held in a size-bounded LRU cache,
+    so later queries on it are answered without touching the data again.
+
+    Parameters
+    ----------
+    events : list of str
+        events that may be queried, found from the score files in datapath if None
+    datapath, fname_fmt, f_pref, f_suff
+        location and naming of the score files, as for read_from_files
+    max_bytes : int
+        memory for cached event rankings
+    compact : bool
+        hold rankings in the compact schema, fitting more events in the cache
+
+    """
+
+    def __init__(self, events=None, datapath='./data/', fname_fmt='.csv', f_pref='', f_suff='Scores',
+                 max_bytes=256 * 2**20, compact=True):
+        self.read_args = {'datapath': datapath, 'fname_fmt': fname_fmt, 'f_pref': f_pref, 'f_suff': f_suff,
+                          'compact': compact}
+        if events is None:
+            events = find_events(datapath, fname_fmt=fname_fmt, f_pref=f_pref, f_suff=f_suff)
+        self.events = list(events)
+        self.cache = LRUCache(max_bytes, sizeof=lambda event_ranking: event_ranking.nbytes)
+        self._loading = {}
+
+    def load(self, event):
+        data = gr.read_from_files([event], **self.read_args)
+        return EventRanking(gr.calc_delta_sep_mixed(gr.calc_mixed_rank_percentiles(data)))
+
+    async def ranking(self, event):
+        """ method ranking
+        ranking of an event, from the cache or read and ranked in a worker thread
+
+        """
+        if event not in self.events:
+            raise LookupError(f"Unknown event '{event}'")
+        cached = self.cache.get(event)
+        if cached is not None:
+            return cached
+        # Concurrent queries on an event being loaded wait for the same load
+        if event not in self._loading:
+            loop = asyncio.get_running_loop()
+            self._loading[event] = loop.run_in_executor(None, self.load, event)
+        try:
+            event_ranking = await asyncio.shield(self._loading[event])
+        finally:
+            self._loading.pop(event, None)
+        if event not in self.cache:
+            self.cache.put(event, event_ranking)
+        return event_ranking
+
+    async def query(self, path, params):
+        """ method query
+        answer a query
+
+        Parameters
+        ----------
+        path : str
+            route of the query, '/events', '/archer', '/score' or '/cache'
+        params : dict
+            query parameters
+
+        Returns
+        -------
+        dict or list
+            the answer, to be returned as json
+
+        Raises
+        ------
+        KeyError, ValueError
+            for missing or malformed parameters
+        LookupError
+            for unknown routes, events, divisions or positions
+
+        """
+        if path == '/events':
+            return {'events': self.events, 'cached': self.cache.keys()}
+        if path == '/cache':
+            return self.cache.stats()
+        if path == '/archer':
+            event_ranking = await self.ranking(params['event'])
+            return event_ranking.archer(params['division'], params['class'], int(params['position']))
+        if path == '/score':
+            event_ranking = await self.ranking(params['event'])
+            return event_ranking.hypothetical(params['division'], int(params['score']), int(params.get('tens', 0)),
+                                              cls=params.get('class'))
+        raise LookupError(f"Unknown query '{path}'")
+
+    async def handle(self, reader, writer):
+        # Requests of the form GET <path>?<query> HTTP/1.1 are answered with json until the client closes
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                status, body = await self._respond(request.decode('latin-1').split())
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                payload = json.dumps(body).encode()
+                writer.write(f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: application/json\r\n'
+                             f'Content-Length: {len(payload)}\r\n'
+                             f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request):
+        if len(request) < 2:
+            return 400, {'error': 'Malformed request'}
+        if request[0] != 'GET':
+            return 405, {'error': f'Method {request[0]} not allowed'}
+        url = urlsplit(request[1])
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            return 200, await self.query(url.path, params)
+        except KeyError as err:
+            return 400, {'error': f'Missing parameter {err}'}
+        except ValueError as err:
+            return 400, {'error': str(err)}
+        except LookupError as err:
+            return 404, {'error': str(err)}
+        except Exception as err:
+            return 500, {'error': f'{type(err).__name__}: {err}'}
+
+
+def find_events(datapath='./data/', fname_fmt='.csv', f_pref='', f_suff='Scores'):
+    # Identifiers of the events with score files in datapath
+    pattern = os.path.join(datapath, f'{glob.escape(f_pref)}*{glob.escape(f_suff)}{glob.escape(fname_fmt)}')
+    names = [os.path.basename(fname) for fname in glob.glob(pattern)]
+    return sorted(name[len(f_pref):len(name) - len(f_suff) - len(fname_fmt)] for name in names)
+
+
+async def serve(service, host='127.0.0.1', port=8765):
+    """ function serve
+    answer queries over HTTP until cancelled
+
+    Parameters
+    ----------
+    service : QueryService
+        service answering the queries
+    host : str
+        address to listen on
+    port : int
+        port to listen on, 0 for any free port
+
+    """
+    server = await asyncio.start_server(service.handle, host, port)
+    addresses = ', '.join(f'{sock.getsockname()[0]}:{sock.getsockname()[1]}' for sock in server.sockets)
+    print(f'Serving {len(service.events)} events on {addresses}', flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='archery-gender-service',
+        description='Answer rank, percentile and mixed category what-if queries on events over HTTP')
+    parser.add_argument('events', nargs='*', help='events that may be queried, all in datapath if none given')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+    parser.add_argument('--datapath', default='./data/', help='directory holding the event score files')
+    parser.add_argument('--f-pref', default='', help='prefix of the score file names')
+    parser.add_argument('--f-suff', default='Scores', help='suffix of the score file names')
+    parser.add_argument('--fname-fmt', default='.csv', help='extension of the score file names')
+    parser.add_argument('--cache-mb', type=float, default=256, help='memory for cached event rankings, in MB')
+    args = parser.parse_args(argv)
+
+    service = QueryService(args.events or None, datapath=args.datapath, fname_fmt=args.fname_fmt,
+                           f_pref=args.f_pref, f_suff=args.f_suff, max_bytes=int(args.cache_mb * 2**20))
+    try:
+        asyncio.run(serve(service, host=args.host, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Streaming analysis of one event at a time with bounded memory
+#
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import incremental, results_io
+
+
+def iter_events(flist, datapath='./data/', fname_fmt='.csv', f_pref='', f_suff='Scores', store_path=None):
+    """ function iter_events
+    read the events of a dataset one at a time
+
+    Parameters
+    ----------
+    flist : list of str
+        identifiers of the events in the dataset
+    datapath, fname_fmt, f_pref, f_suff, store_path
+        location and naming of the source files, as for read_from_files
+
+    Yields
+    ------
+    f_id : str
+        identifier of the event
+    data : pandas dataframe
+        scores for the event
+
+    """
+    for f_id in flist:
+        yield f_id, gr.read_from_files([f_id], datapath=datapath, fname_fmt=fname_fmt, f_pref=f_pref,
+                                       f_suff=f_suff, store_path=store_path)
+
+
+def iter_results(flist, band_edges=None, **read_args):
+    """ function iter_results
+    analyse the events of a dataset one at a time
+
+    Parameters
+    ----------
+    flist : list of str
+        identifiers of the events in the dataset
+    band_edges : list
+        rank band edges passed to set_rank_band
+    **read_args
+        location and naming of the source files, as for iter_events
+
+    Yields
+    ------
+    f_id : str
+        identifier of the event
+    results : dict
+        results of incremental.analyse_event for the event
+
+    """
+    for f_id, data in iter_events(flist, **read_args):
+        yield f_id, incremental.analyse_event(data, band_edges=band_edges)
+
+
+def run_streaming(flist, fpath='./results/', fpref='', band_edges=None, formats=('csv',), text=False,
+                  background=False, **read_args):
+    """ function run_streaming
+    analyse a dataset one event at a time, writing results out as it goes
+
+    Ranked data for each event is appended to <fpref>raw_data and then discarded, so peak
+    memory is bounded by the largest single event. Only the small per-group outputs (medal
+    position changes, statistics and tests) are kept and written at the end to the same files
+    as the full analysis. The text view needs whole tables, so unlike the other analyses
+    results are written as csv by default.
+
+    Parameters
+    ----------
+    flist : list of str
+        identifiers of the events in the dataset
+    fpath : str
+        directory to write results to
+    fpref : str
+        prefix for the result file names
+    band_edges : list
+        rank band edges passed to set_rank_band
+    formats : list of str
+        machine-readable results formats, as for results_io.ResultWriter
+    text : bool
+        also write the human-readable text view of each table, holding the ranked data in memory
+    background : bool
+        write results from a background thread while the next event is analysed
+    **read_args
+        location and naming of the source files, as for iter_events
+
+    Returns
+    -------
+    dict
+        combined per-group results, as incremental.merge_results without the ranked data
+
+    """
+    event_results = {}
+    # Process in the order the raw data is listed, by descending event
+    with results_io.ResultWriter(fpath=fpath, fpref=fpref, formats=formats, text=text,
+                                 background=background) as writer:
+        with writer.stream('raw_data', columns=gr.RAW_COLUMNS) as raw_data:
+            for f_id, results in iter_results(sorted(flist, reverse=True), band_edges=band_edges, **read_args):
+                df_out = results.pop('data').sort_values(by=['Division', 'Class', 'Score', '10'],
+                                                         ascending=[True, True, False, False], ignore_index=True)
+                raw_data.append(df_out)
+                event_results[f_id] = results
+
+        merged = incremental.merge_results(event_results)
+        gr.write_pos_changes(merged['delta_pos'], writer=writer)
+        gr.write_t_test_tables(merged, writer=writer)
+
+    return merged
@@ -0,0 +1,257 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Synthetic IANSEO-shaped tournaments for benchmarking at scale
+#
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Share of entries and the log-normal spread of each archer's group size (in ring widths) for
+# each division and gender. Fitted to the Nimes and AGB National Indoor data in data/, so that
+# the mean and standard deviation of scores and the mean 10s and 9s are close to the real ones.
+PROFILES = {
+    ('R', 'M'): (0.32, 0.25, 0.55),
+    ('R', 'W'): (0.17, 0.35, 0.60),
+    ('C', 'M'): (0.34, -0.75, 0.65),
+    ('C', 'W'): (0.14, -0.60, 0.75),
+    ('L', 'M'): (0.015, 1.45, 0.35),
+    ('L', 'W'): (0.009, 1.55, 0.35),
+    ('B', 'M'): (0.003, 0.85, 0.40),
+    ('B', 'W'): (0.0025, 1.05, 0.25),
+}
+
+# Compound archers shoot at the inner 10 ring of the indoor face
+INNER_TEN = ['C']
+
+# Smallest group size in each division, so the best scores stay near the real top scores
+# rather than the log-normal tail giving perfect rounds
+MIN_SPREAD = {'R': 0.45, 'C': 0.3, 'L': 0.8, 'B': 0.6}
+
+# 60 arrows at 18m, shot as two halves of 30
+ARROWS = 60
+
+# Archers simulated at once, bounding the arrow matrices to a few tens of MB
+CHUNK_ARCHERS = 50_000
+
+CSV_COLUMNS = ['Category Rank', 'Athlete', 'Country', '18m-1', '18m-2', 'Score', '10', '9', 'Event', 'Division',
+               'Class']
+
+
+def simulate_arrows(spread, inner_ten, rng):
+    """ function simulate_arrows
+    simulate the arrows of a round for archers of given group size
+
+    Each arrow lands at a radius drawn from a Rayleigh distribution with the archer's spread,
+    and scores the ring it falls in, with rings one unit wide.
+
+    Parameters
+    ----------
+    spread : numpy array
+        group size of each archer, in ring widths
+    inner_ten : bool
+        score only the inner half of the 10 ring as 10, as for compound
+    rng : numpy Generator
+        random number generator
+
+    Returns
+    -------
+    halves : numpy array of int64
+        score of each half of the round, shape (archers, 2)
+    tens : numpy array of int64
+        number of 10s shot by each archer
+    nines : numpy array of int64
+        number of 9s shot by each archer
+
+    """
+    radius = spread[:, None] * np.sqrt(-2 * np.log1p(-rng.random((len(spread), ARROWS))))
+    rings = np.clip(10 - np.floor(radius), 0, 10).astype(np.int8)
+    if inner_ten:
+        rings[(radius >= 0.5) & (radius < 1)] = 9
+    halves = rings.reshape(len(spread), 2, ARROWS // 2).sum(axis=2, dtype=np.int64)
+    return halves, (rings == 10).sum(axis=1), (rings == 9).sum(axis=1)
+
+
+def _split_counts(n_archers, rng, min_per_category):
+    shares = np.array([profile[0] for profile in PROFILES.values()])
+    counts = rng.multinomial(max(n_archers - min_per_category * len(PROFILES), 0), shares / shares.sum())
+    return counts + min_per_category
+
+
+def _positions(frame, columns):
+    # IANSEO position: archers equal on all columns share the best position
+    order = frame.sort_values(columns, ascending=False, kind='stable').index
+    keys = frame.loc[order, columns].to_numpy()
+    new = np.ones(len(keys), dtype=bool)
+    new[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    pos = np.arange(1, len(keys) + 1)
+    ranks = pd.Series(np.maximum.accumulate(np.where(new, pos, 0)), index=order)
+    return ranks.reindex(frame.index).to_numpy()
+
+
+def generate_event(n_archers, seed=None, min_per_category=2, dns_rate=0.01):
+    """ function generate_event
+    synthetic qualification results for one event, as scraped from IANSEO
+
+    Parameters
+    ----------
+    n_archers : int
+        approximate number of archers across all divisions and genders
+    seed : int
+        seed for the random number generator
+    min_per_category : int
+        archers in every division and gender, so that small bowstyles are always present
+    dns_rate : float
+        fraction of archers recorded with a zero score, as for non-starters
+
+    Returns
+    -------
+    pandas dataframe
+        results with the columns written by ianseo_scrape, ordered by category and position
+
+    """
+    rng = np.random.default_rng(seed)
+    counts = _split_counts(n_archers, rng, min_per_category)
+
+    categories = []
+    n_done = 0
+    for ((div, gen), (_, mu, sigma)), count in zip(PROFILES.items(), counts):
+        halves, tens, nines = [], [], []
+        for start in range(0, count, CHUNK_ARCHERS):
+            spread = np.maximum(np.exp(rng.normal(mu, sigma, min(CHUNK_ARCHERS, count - start))), MIN_SPREAD[div])
+            chunk = simulate_arrows(spread, div in INNER_TEN, rng)
+            halves.append(chunk[0])
+            tens.append(chunk[1])
+            nines.append(chunk[2])
+        halves = np.concatenate(halves) if halves else np.zeros((0, 2), dtype=np.int64)
+        cat = pd.DataFrame({'Score': halves.sum(axis=1), '10': np.concatenate(tens or [[]]).astype(np.int64),
+                            '9': np.concatenate(nines or [[]]).astype(np.int64)})
+
+        dns = rng.random(count) < dns_rate
+        halves[dns] = 0
+        cat.loc[dns, ['Score', '10', '9']] = 0
+
+        half_ranks = [_positions(pd.DataFrame({'half': halves[:, i]}), ['half']) for i in range(2)]
+        cat['Category Rank'] = _positions(cat, ['Score', '10', '9'])
+        cat['Athlete'] = [f'ARCHER {n_done + i}' for i in range(count)]
+        cat['Country'] = [f'C{i % 97:02d} - Club {i % 97}' for i in rng.integers(0, 97, count)]
+        cat['18m-1'] = [f'{h}/ {r}' for h, r in zip(halves[:, 0], half_ranks[0])]
+        cat['18m-2'] = [f'{h}/ {r}' for h, r in zip(halves[:, 1], half_ranks[1])]
+        cat['Event'] = f'{div}{gen}'
+        cat['Division'] = div
+        cat['Class'] = gen
+        categories.append(cat.sort_values('Category Rank', kind='stable'))
+        n_done += count
+
+    return pd.concat(categories, ignore_index=True)[CSV_COLUMNS]
+
+
+def generate_dataset(n_events, n_archers, datapath='./data/synthetic/', fname_fmt='.csv', f_pref='',
+                     f_suff='Scores', event_prefix='Synth', seed=0):
+    """ function generate_dataset
+    write synthetic events as score files readable by read_from_files
+
+    Parameters
+    ----------
+    n_events : int
+        number of events
+    n_archers : int
+        approximate number of archers in each event
+    datapath, fname_fmt, f_pref, f_suff
+        location and naming of the score files, as for read_from_files
+    event_prefix : str
+        prefix of the event identifiers, which are numbered from 0
+    seed : int
+        seed for the random number generator, each event gets an independent stream
+
+    Returns
+    -------
+    list of str
+        identifiers of the events written
+
+    """
+    os.makedirs(datapath, exist_ok=True)
+    width = len(str(max(n_events - 1, 0)))
+    events = [f'{event_prefix}{i:0{width}d}' for i in range(n_events)]
+    seeds = np.random.SeedSequence(seed).spawn(n_events)
+    for f_id, event_seed in zip(events, seeds):
+        event = generate_event(n_archers, seed=event_seed)
+        event.to_csv(f'{datapath}{f_pref}{f_id}{f_suff}{fname_fmt}')
+    return events
+
+
+def _half_cells(half):
+    score, rank = half.split('/')
+    return score.strip(), rank.strip()
+
+
+def render_page(cat, layout='old'):
+    """ function render_page
+    html of an IANSEO category page holding the qualification table of some results
+
+    Parameters
+    ----------
+    cat : pandas dataframe
+        results for one category, as from generate_event
+    layout : str
+        'old' for one row per athlete in a table of class Griglia with spanned header cells,
+        'new' for a title and header row then three rows per athlete with row and column spans
+
+    Returns
+    -------
+    str
+        html of the page
+
+    """
+    if layout == 'old':
+        rows = ['<tr><th>Pos.</th><th>Athlete</th><th colspan="2">Country Code</th><th>Country</th>'
+                '<th colspan="2">18m-1</th><th colspan="2">18m-2</th><th>Tot.</th><th>10</th><th>9</th></tr>']
+        for rec in cat.itertuples(index=False):
+            code, country = rec.Country.split(' - ', 1)
+            h1, r1 = _half_cells(rec[3])
+            h2, r2 = _half_cells(rec[4])
+            rows.append(f'<tr><td>{rec[0]}</td><td>{rec.Athlete}</td><td></td><td>{code}</td><td>{country}</td>'
+                        f'<td>{h1}</td><td>{r1}</td><td>{h2}</td><td>{r2}</td>'
+                        f'<td>{rec.Score}</td><td>{rec[6]}</td><td>{rec[7]}</td></tr>')
+        return f'<html><body><table class="Griglia">{"".join(rows)}</table></body></html>'
+
+    if layout == 'new':
+        rows = ['<tr><th colspan="8">Qualification Round</th></tr>',
+                '<tr><th>Pos.</th><th>Athlete</th><th>Country</th><th>18m-1</th><th>18m-2</th>'
+                '<th>Tot.</th><th>10</th><th>9</th></tr>']
+        for rec in cat.itertuples(index=False):
+            rows.append(f'<tr><td rowspan="3">{rec[0]}</td><td>{rec.Athlete}</td><td>{rec.Country}</td>'
+                        f'<td>{rec[3]}</td><td>{rec[4]}</td>'
+                        f'<td rowspan="2">{rec.Score}</td><td>{rec[6]}</td><td>{rec[7]}</td></tr>')
+            rows.append('<tr><td colspan="4">10 10 9 9 10 10</td><td>-</td><td>-</td></tr>')
+            rows.append('<tr><td colspan="7"></td></tr>')
+        return f'<html><body><table>{"".join(rows)}</table></body></html>'
+
+    raise ValueError(f"Unknown page layout '{layout}', expected 'old' or 'new'")
+
+
+def render_pages(event, layout='old'):
+    """ function render_pages
+    IANSEO category pages for every division and gender of an event
+
+    Parameters
+    ----------
+    event : pandas dataframe
+        results for one event, as from generate_event
+    layout : str
+        table layout, as for render_page
+
+    Returns
+    -------
+    dict
+        html of each category page keyed by (division, gender)
+
+    """
+    return {(div, gen): render_page(cat, layout=layout)
+            for (div, gen), cat in event.groupby(['Division', 'Class'], sort=False)}
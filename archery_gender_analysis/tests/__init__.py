@@ -0,0 +1 @@
+"""Tests of the archery_gender_analysis package."""
@@ -0,0 +1,130 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Shared fixtures for the tests, including a local stub of the IANSEO server
+#
+
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import synthetic
+
+
+class StubServer:
+    """ class StubServer
+    local http server serving IANSEO category pages, recording every request
+
+    Pages are served from a dict of path -> html, any other path is a 404. Responses can be
+    delayed to observe the concurrency of clients, and paths given a status to return instead.
+    With validators set, pages carry an ETag and Last-Modified date and conditional requests
+    for unchanged pages get a 304.
+
+    """
+
+    def __init__(self, pages=None, delay=0.0):
+        self.pages = {} if pages is None else dict(pages)
+        self.delay = delay
+        self.statuses = {}
+        self.validators = False
+        self.hits = {}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def add_tournament(self, path, event, layout='old', divisions=None):
+        # Category pages of a synthetic event under /<path>/IQ<div><gen>.php
+        for (div, gen), page in synthetic.render_pages(event, layout=layout).items():
+            if divisions is None or div in divisions:
+                self.pages[f'/{path}/IQ{div}{gen}.php'] = page
+
+    def _handle(self, request):
+        with self._lock:
+            self.hits[request.path] = self.hits.get(request.path, 0) + 1
+            self.requests.append((request.path, dict(request.headers)))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            status = self.statuses.get(request.path)
+            if status is None:
+                page = self.pages.get(request.path)
+                status = 200 if page is not None else 404
+            else:
+                page = None
+            if page is None:
+                page = '<html><body>No results</body></html>'
+            body = page.encode()
+            headers = {'Content-Type': 'text/html; charset=utf-8'}
+            if self.validators and status == 200:
+                headers['ETag'] = f'"{hashlib.sha1(body).hexdigest()}"'
+                headers['Last-Modified'] = 'Sat, 17 Oct 2026 09:00:00 GMT'
+                # As in HTTP, the ETag takes precedence over the date
+                if request.headers.get('If-None-Match') is not None:
+                    unchanged = request.headers['If-None-Match'] == headers['ETag']
+                else:
+                    unchanged = request.headers.get('If-Modified-Since') == headers['Last-Modified']
+                if unchanged:
+                    status, body = 304, b''
+            request.send_response(status)
+            for name, value in headers.items():
+                request.send_header(name, value)
+            request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture(scope='session')
+def synthetic_data(tmp_path_factory):
+    # Small synthetic events written as score files, shared by the analysis tests
+    datapath = str(tmp_path_factory.mktemp('data')) + '/'
+    events = synthetic.generate_dataset(3, 3000, datapath=datapath, seed=7)
+    return datapath, events
+
+
+@pytest.fixture
+def ranked(synthetic_data):
+    # The synthetic events ranked and split into the default rank bands
+    datapath, events = synthetic_data
+    return gr.set_rank_band(gr.calc_delta_sep_mixed(gr.read_from_files(events, datapath=datapath, use_store=False)))
@@ -0,0 +1,110 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the resumable backfill against a local stub server
+#
+
+import pytest
+
+from archery_gender_analysis import backfill, ianseo_scrape, synthetic
+from archery_gender_analysis.http_cache import ResponseCache
+
+
+@pytest.fixture
+def tournaments(stub_server):
+    # Two tournaments, the second without longbow or barebow archers
+    stub_server.add_tournament('TourData/2015/1', synthetic.generate_event(300, seed=3))
+    stub_server.add_tournament('TourData/2016/2', synthetic.generate_event(300, seed=4), divisions=['R', 'C'])
+    return {'One15': f'{stub_server.url}/TourData/2015/1', 'Two16': f'{stub_server.url}/TourData/2016/2'}
+
+
+def make_backfill(tournaments, tmp_path, **kwargs):
+    kwargs.setdefault('cache', None)
+    return backfill.Backfill(tournaments, datapath=f'{tmp_path}/', state_file=str(tmp_path / 'state.json'),
+                             rate=None, max_workers=2, **kwargs)
+
+
+def test_backfill_writes_the_scraped_tournaments(stub_server, tournaments, tmp_path):
+    result = make_backfill(tournaments, tmp_path).run()
+
+    assert result == {'One15': 'written', 'Two16': 'written'}
+    for t_id, url in tournaments.items():
+        with open(tmp_path / f'{t_id}Scores.csv') as f:
+            assert f.read() == ianseo_scrape.get_tournament(url, cache=None).to_csv()
+
+
+def test_rerun_fetches_nothing(stub_server, tournaments, tmp_path):
+    make_backfill(tournaments, tmp_path).run()
+    hits = dict(stub_server.hits)
+
+    # Absent divisions are not fetched again either
+    result = make_backfill(tournaments, tmp_path).run()
+
+    assert result == {'One15': 'complete', 'Two16': 'complete'}
+    assert stub_server.hits == hits
+    # The second page of an absent division is not fetched at all
+    assert '/TourData/2016/2/IQLW.php' not in hits
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_server_error_fails_the_job(stub_server, tournaments, tmp_path, cached):
+    cache = ResponseCache(str(tmp_path / 'http_cache')) if cached else None
+    # A server error on an optional division must not be taken as the division being absent
+    stub_server.statuses['/TourData/2015/1/IQLM.php'] = 503
+    stub_server.statuses['/TourData/2016/2/IQLM.php'] = 429
+
+    result = make_backfill(tournaments, tmp_path, cache=cache).run()
+
+    assert result == {'One15': 'incomplete', 'Two16': 'incomplete'}
+    state = backfill.BackfillState(str(tmp_path / 'state.json'))
+    assert state.status('One15', 'L') == backfill.FAILED
+    assert state.status('Two16', 'L') == backfill.FAILED
+    assert state.status('Two16', 'B') == backfill.ABSENT
+
+    stub_server.statuses.clear()
+    hits = dict(stub_server.hits)
+    result = make_backfill(tournaments, tmp_path, cache=cache).run()
+
+    assert result == {'One15': 'written', 'Two16': 'written'}
+    # Only the failed divisions are fetched again
+    fetched = {path for path, count in stub_server.hits.items() if count > hits.get(path, 0)}
+    assert fetched == {'/TourData/2015/1/IQLM.php', '/TourData/2015/1/IQLW.php', '/TourData/2016/2/IQLM.php'}
+    with open(tmp_path / 'One15Scores.csv') as f:
+        assert f.read() == ianseo_scrape.get_tournament(tournaments['One15'], cache=None).to_csv()
+
+
+def test_resume_after_interrupt(stub_server, tournaments, tmp_path):
+    interrupted = make_backfill(tournaments, tmp_path)
+    interrupted.max_workers = 1
+    run_job = interrupted._run_job
+    calls = []
+
+    def interrupt_fifth_job(t_id, div):
+        calls.append((t_id, div))
+        if len(calls) == 5:
+            raise KeyboardInterrupt
+        return run_job(t_id, div)
+
+    interrupted._run_job = interrupt_fifth_job
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.run()
+    done = [job for job in calls[:4] if interrupted.state.status(*job) == backfill.DONE]
+    assert len(done) == 4
+    hits = dict(stub_server.hits)
+
+    result = make_backfill(tournaments, tmp_path).run()
+
+    # The four divisions of the first tournament were done, and it written, before the interrupt
+    assert result == {'One15': 'complete', 'Two16': 'written'}
+    # Jobs completed before the interrupt are not fetched again
+    for t_id, div in done:
+        for gen in ianseo_scrape.GENDERS:
+            path = ianseo_scrape.cat_url(tournaments[t_id], div, gen)[len(stub_server.url):]
+            assert stub_server.hits[path] == hits[path] == 1
+    for t_id, url in tournaments.items():
+        with open(tmp_path / f'{t_id}Scores.csv') as f:
+            assert f.read() == ianseo_scrape.get_tournament(url, cache=None).to_csv()
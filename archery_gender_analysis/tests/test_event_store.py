@@ -0,0 +1,93 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the columnar event store against reading the score files directly
+#
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import event_store
+from archery_gender_analysis import general_routines as gr
+
+
+@pytest.fixture
+def datapath(tmp_path):
+    # A score file with a zero score, a long division label and missing counts and ranks
+    scores = pd.DataFrame({
+        'Category Rank': [1, 2, np.nan, 1, 2, 3],
+        'Athlete': ['A', 'B', 'C', 'D', 'E', 'F'],
+        'Score': [590, 580, 0, 560, 550, 540],
+        '10': [50, 45, 0, np.nan, 30, 29],
+        '9': [40, 38, 0, 30, np.nan, 20],
+        'Division': ['R', 'R', 'R', 'Traditional Longbow', 'Traditional Longbow', np.nan],
+        'Class': ['M', 'W', 'W', 'M', 'W', 'M'],
+    })
+    scores.to_csv(tmp_path / 'TestScores.csv')
+    return f'{tmp_path}/'
+
+
+def test_store_matches_csv(datapath):
+    expected = gr.read_from_files(['Test'], datapath=datapath, use_store=False)
+
+    # Read once to ingest the events and once from the store
+    for _ in range(2):
+        stored = gr.read_from_files(['Test'], datapath=datapath)
+        pd.testing.assert_frame_equal(stored, expected, check_like=True)
+
+
+def test_ingest(datapath):
+    event_dir = os.path.join(datapath, '.store', 'Test')
+
+    meta = event_store.ingest_event(f'{datapath}TestScores.csv', event_dir)
+
+    # Zero scores are dropped on ingest, and labels keep their full length
+    assert meta['n_rows'] == 5
+    assert meta['schema']['Score'] == '<i8' and meta['schema']['10'] == '<f8'
+    assert 'Traditional Longbow' in event_store.load_event(event_dir)['Division'].tolist()
+
+
+def test_frame_from_store_is_writable(datapath):
+    gr.read_from_files(['Test'], datapath=datapath)
+    data = gr.read_from_files(['Test'], datapath=datapath)
+
+    data.loc[data.index[0], 'Score'] = 1
+
+    assert data.loc[data.index[0], 'Score'] == 1
+    # The edit is not written back to the store
+    assert gr.read_from_files(['Test'], datapath=datapath).loc[0, 'Score'] == 590
+
+
+def test_store_refreshed_only_when_source_changes(datapath, monkeypatch):
+    fname = f'{datapath}TestScores.csv'
+    ingests = []
+    ingest_event = event_store.ingest_event
+
+    def record(*args, **kwargs):
+        ingests.append(args[0])
+        return ingest_event(*args, **kwargs)
+
+    monkeypatch.setattr(event_store, 'ingest_event', record)
+    gr.read_from_files(['Test'], datapath=datapath)
+    gr.read_from_files(['Test'], datapath=datapath)
+    assert len(ingests) == 1
+
+    # Touching the file without changing it, e.g. by a checkout, does not re-ingest
+    stat = os.stat(fname)
+    os.utime(fname, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    gr.read_from_files(['Test'], datapath=datapath)
+    assert len(ingests) == 1
+
+    scores = pd.read_csv(fname, index_col=0)
+    scores.loc[0, 'Score'] = 595
+    scores.to_csv(fname)
+    data = gr.read_from_files(['Test'], datapath=datapath)
+    assert len(ingests) == 2
+    assert data.loc[0, 'Score'] == 595
@@ -0,0 +1,71 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the Welch t-tests and rank band sweep against scipy and grouped statistics
+#
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import group_stats
+
+STATS = ['mean', 'std', 'max', 'min', 'count']
+
+
+def _flat(df):
+    # Band labels as plain strings, so that categorical and object indexes compare equal
+    df = df.copy()
+    df.index = pd.MultiIndex.from_tuples([tuple(map(str, key)) for key in df.index], names=df.index.names)
+    return df.sort_index()
+
+
+@pytest.mark.parametrize('band_edges', [
+    group_stats.DEFAULT_BAND_EDGES,
+    [-np.inf, 5, np.inf],
+    [-np.inf, 2, 10, 40],
+    [-5, 3, 20, 100],
+    [0, 1, 4, 9, 16, np.inf],
+    [30, 60, np.inf],
+])
+def test_sweep_matches_band_tables(ranked, band_edges):
+    swept = group_stats.BandSweep(ranked).stats(band_edges)
+    tables = gr.calc_t_test_tables(gr.set_rank_band(ranked.copy(), band_edges))
+
+    for c in ['M', 'W']:
+        stats = swept[[f'{c} {stat}' for stat in STATS]].rename(columns=lambda name: name.split(' ')[1])
+        expected = tables['score_band_stats'].xs(c, level='Class')
+        pd.testing.assert_frame_equal(_flat(stats[stats['count'] > 0]), _flat(expected), check_dtype=False)
+    pd.testing.assert_series_equal(_flat(swept['p'].to_frame()).dropna()['p'],
+                                   _flat(tables['t_test_results_bands'].to_frame()).dropna()['p'], check_dtype=False)
+
+
+@pytest.mark.parametrize('keys', [['Event', 'Division'], ['Event', 'Division', 'Rank band']])
+def test_welch_matches_scipy(ranked, keys):
+    sums = group_stats.sufficient_stats(ranked, keys)
+
+    tests = group_stats.welch_by_group(sums)
+    described = group_stats.describe(sums)
+
+    expected = ranked.groupby(keys + ['Class'], observed=True)['Score'].agg(STATS)
+    pd.testing.assert_frame_equal(described, expected, check_dtype=False)
+    for key, group in ranked.groupby(keys, observed=True):
+        men = group.loc[group['Class'] == 'M', 'Score']
+        women = group.loc[group['Class'] == 'W', 'Score']
+        if len(men) < 2 or len(women) < 2:
+            continue
+        with warnings.catch_warnings():
+            # Bands of tied scores have no variance, which scipy warns of
+            warnings.simplefilter('ignore', RuntimeWarning)
+            result = stats.ttest_ind(men, women, equal_var=False)
+        assert tests.loc[key, 't'] == pytest.approx(result.statistic, rel=1e-9, nan_ok=True)
+        assert tests.loc[key, 'p'] == pytest.approx(result.pvalue, rel=1e-9, abs=1e-300, nan_ok=True)
+        assert tests.loc[key, 'dof'] == pytest.approx(result.df, rel=1e-9)
@@ -0,0 +1,121 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the response cache against a local stub server
+#
+
+import os
+
+import pytest
+
+from archery_gender_analysis import ianseo_scrape, synthetic
+from archery_gender_analysis.http_cache import ResponseCache
+
+# Pages of a closed tournament, served from the cache without a request, and of a live one
+CLOSED = '/TourData/2015/1/IQRM.php'
+LIVE = '/TourData/2999/1/IQRM.php'
+
+
+@pytest.fixture
+def server(stub_server):
+    stub_server.validators = True
+    for i in range(3):
+        stub_server.pages[f'/TourData/2015/{i}/IQRM.php'] = f'<html><body>closed {i}</body></html>'
+    stub_server.pages[LIVE] = '<html><body>live</body></html>'
+    return stub_server
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / 'http_cache'))
+
+
+def test_live_pages_revalidated(server, cache):
+    url = server.url + LIVE
+
+    assert cache.get(url) == server.pages[LIVE]
+    assert cache.get(url) == server.pages[LIVE]
+
+    (_, first), (_, second) = server.requests
+    assert 'If-None-Match' not in first
+    assert second['If-None-Match'] == cache._index[url]['etag']
+    assert second['If-Modified-Since'] == cache._index[url]['last_modified']
+
+    # A changed page is downloaded again
+    server.pages[LIVE] = '<html><body>changed</body></html>'
+    assert cache.get(url) == server.pages[LIVE]
+
+
+def test_missing_body_fetched_again(server, cache):
+    url = server.url + LIVE
+    cache.get(url)
+    os.remove(cache._body_file(url))
+
+    # The server answers the revalidation with a 304, but the cached body is gone
+    assert cache.get(url) == server.pages[LIVE]
+
+    assert [headers.get('If-None-Match') is None for _, headers in server.requests] == [True, False, True]
+    assert os.path.exists(cache._body_file(url))
+
+
+def test_closed_tournaments_served_without_request(server, cache):
+    url = server.url + CLOSED
+
+    assert cache.get(url) == server.pages[CLOSED]
+    assert cache.get(url) == server.pages[CLOSED]
+
+    assert server.hits == {CLOSED: 1}
+
+
+def test_offline(server, cache, tmp_path):
+    cache.get(server.url + LIVE)
+    offline = ResponseCache(str(tmp_path / 'http_cache'), offline=True)
+
+    assert offline.get(server.url + LIVE) == server.pages[LIVE]
+    with pytest.raises(KeyError):
+        offline.get(server.url + CLOSED)
+    assert server.hits == {LIVE: 1}
+
+
+def test_eviction_by_entries(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'http_cache'), max_entries=2)
+    urls = [f'{server.url}/TourData/2015/{i}/IQRM.php' for i in range(3)]
+
+    cache.get(urls[0])
+    cache.get(urls[1])
+    cache.get(urls[0])
+    cache.get(urls[2])
+
+    # The least recently used page is evicted
+    assert urls[0] in cache and urls[1] not in cache and urls[2] in cache
+    assert not os.path.exists(cache._body_file(urls[1]))
+
+
+def test_eviction_by_size(server, tmp_path):
+    size = len(server.pages[CLOSED])
+    cache = ResponseCache(str(tmp_path / 'http_cache'), max_bytes=2 * size)
+    urls = [f'{server.url}/TourData/2015/{i}/IQRM.php' for i in range(3)]
+
+    for url in urls:
+        cache.get(url)
+
+    assert len(cache) == 2 and cache.total_bytes <= 2 * size
+    assert urls[0] not in cache
+
+
+def test_tournaments_fetched_through_cache_directory(stub_server, tmp_path):
+    stub_server.add_tournament('TourData/2015/1', synthetic.generate_event(200, seed=3))
+    url = f'{stub_server.url}/TourData/2015/1'
+    cache_dir = str(tmp_path / 'http_cache')
+
+    first = ianseo_scrape.get_tournament(url, cache=cache_dir)
+    hits = dict(stub_server.hits)
+    second = ianseo_scrape.get_tournament(url, cache=cache_dir)
+
+    # A rerun downloads nothing from a closed tournament
+    assert stub_server.hits == hits
+    assert first.equals(second)
@@ -0,0 +1,70 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the single pass parser against the BeautifulSoup parser
+#
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import ianseo_parse, ianseo_scrape, synthetic
+
+ANALYSED = ['Category Rank', 'Athlete', 'Score', '10', '9', 'Event', 'Division', 'Class']
+
+
+@pytest.fixture
+def cat():
+    event = synthetic.generate_event(300, seed=5)
+    cat = event[(event['Division'] == 'R') & (event['Class'] == 'W')].reset_index(drop=True)
+    return cat.astype({'Score': object})
+
+
+@pytest.mark.parametrize('layout', ['old', 'new'])
+def test_fast_parser_matches_full_parser(cat, layout):
+    page = synthetic.render_page(cat, layout=layout)
+
+    fast = ianseo_scrape.parse_cat(page, 'R', 'W', fast=True)
+    full = ianseo_scrape.parse_cat(page, 'R', 'W')
+
+    # Only the analysed columns are extracted, the new layout is read as text by the full parser
+    assert list(fast.columns) == ANALYSED
+    full = full[ANALYSED].astype({col: np.int64 for col in ianseo_parse.INT_COLUMNS})
+    pd.testing.assert_frame_equal(fast, full)
+
+
+@pytest.mark.parametrize('layout', ['old', 'new'])
+def test_unscored_athletes(cat, layout):
+    cat.loc[0, 'Score'] = 'DSQ'
+    cat.loc[1, 'Score'] = 'DNS'
+    cat.loc[2, 'Score'] = ''
+
+    results = ianseo_parse.parse_qual_table(synthetic.render_page(cat, layout=layout))
+
+    assert results['Unscored'].tolist() == [True] * 3 + [False] * (len(cat) - 3)
+    for col in ianseo_parse.INT_COLUMNS:
+        assert (results[col][:3] == 0).all()
+    assert results['Score'][3:].tolist() == cat['Score'][3:].tolist()
+
+
+def test_non_numeric_counts_are_missing(cat):
+    cat = cat.astype({'10': object})
+    cat.loc[4, '10'] = '-'
+
+    table = ianseo_parse.parse_cat(synthetic.render_page(cat), 'R', 'W')
+
+    # Rather than being read as zero
+    assert np.isnan(table.loc[4, '10'])
+    assert table['10'].drop(index=4).tolist() == cat['10'].drop(index=4).tolist()
+    assert table['Score'].dtype == np.int64
+
+
+def test_pages_without_results():
+    with pytest.raises(ValueError):
+        ianseo_parse.parse_qual_table('<html><body>No results</body></html>')
+    with pytest.raises(ValueError):
+        ianseo_parse.parse_qual_table('<html><body><table class="Griglia"><tr><th>Pos.</th></tr></table></body></html>')
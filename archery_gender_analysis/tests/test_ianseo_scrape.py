@@ -0,0 +1,88 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of concurrent fetching of IANSEO pages against a local stub server
+#
+
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import ianseo_scrape, synthetic
+
+
+@pytest.fixture
+def event():
+    return synthetic.generate_event(400, seed=3)
+
+
+def test_fetch_pages_fetches_each_url_once(stub_server, event):
+    stub_server.add_tournament('2015/1', event)
+    urls = [ianseo_scrape.cat_url(f'{stub_server.url}/2015/1', div, gen)
+            for div in ianseo_scrape.DIVISIONS for gen in ianseo_scrape.GENDERS]
+
+    # Repeated urls are only requested once
+    pages = ianseo_scrape.fetch_pages(urls + urls[::-1], max_workers=4)
+
+    assert list(pages) == urls
+    assert all(count == 1 for count in stub_server.hits.values())
+    assert len(stub_server.hits) == len(urls)
+    for url in urls:
+        path = url[len(stub_server.url):]
+        assert pages[url] == stub_server.pages[path]
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_fetch_pages_concurrency_limit(stub_server, event, max_workers):
+    stub_server.add_tournament('2015/1', event)
+    stub_server.delay = 0.05
+    urls = [f'{stub_server.url}{path}' for path in stub_server.pages]
+
+    ianseo_scrape.fetch_pages(urls, max_workers=max_workers)
+
+    assert stub_server.max_in_flight <= max_workers
+    if max_workers > 1:
+        # With every response delayed the pool is filled
+        assert stub_server.max_in_flight > 1
+
+
+def test_get_tournaments_combines_all_categories(stub_server, event):
+    stub_server.add_tournament('2015/1', event)
+    stub_server.add_tournament('2016/2', event, layout='new')
+    urls = {'old': f'{stub_server.url}/2015/1', 'new': f'{stub_server.url}/2016/2'}
+
+    tournaments = ianseo_scrape.get_tournaments(urls, max_workers=4, cache=None, fast=True)
+
+    assert all(count == 1 for count in stub_server.hits.values())
+    expected = event[event['Score'] > 0].groupby(['Division', 'Class']).size()
+    for table in tournaments.values():
+        table = table[table['Score'] > 0]
+        pd.testing.assert_series_equal(table.groupby(['Division', 'Class']).size(), expected)
+
+
+def test_get_cat_new_layout_parsed_from_one_download(stub_server, event):
+    # The new layout is parsed by the fallback path, from the same download as the old
+    stub_server.add_tournament('2016/2', event, layout='new')
+    cat = event[(event['Division'] == 'R') & (event['Class'] == 'W')]
+
+    table = ianseo_scrape.get_cat(f'{stub_server.url}/2016/2', 'IQRW.php', 'R', 'W', cache=None)
+
+    assert stub_server.hits == {'/2016/2/IQRW.php': 1}
+    assert table['Score'].astype(int).tolist() == cat['Score'].tolist()
+    assert (table['Division'] == 'R').all() and (table['Class'] == 'W').all()
+
+
+def test_combine_cats_drops_absent_optional_divisions(stub_server, event):
+    stub_server.add_tournament('2015/1', event, divisions=['R', 'C'])
+    url_main = f'{stub_server.url}/2015/1'
+
+    table = ianseo_scrape.get_tournament(url_main, max_workers=4, cache=None, fast=True)
+
+    assert sorted(table['Division'].unique()) == ['C', 'R']
+    # Recurve and compound must be present
+    stub_server.pages = {path: page for path, page in stub_server.pages.items() if 'IQC' not in path}
+    with pytest.raises(ValueError):
+        ianseo_scrape.get_tournament(url_main, max_workers=4, cache=None, fast=True)
@@ -0,0 +1,84 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the incremental and streaming analyses against the full analysis
+#
+
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import incremental, pipeline, streaming, synthetic
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    datapath = f'{tmp_path}/data/'
+    events = synthetic.generate_dataset(3, 600, datapath=datapath, seed=11)
+    return datapath, events
+
+
+def full_analysis(datapath, events):
+    data = gr.read_from_files(events, datapath=datapath)
+    data = gr.set_rank_band(gr.calc_delta_sep_mixed(gr.calc_mixed_rank_percentiles(data)))
+    results = {'data': data, 'delta_pos': gr.calc_pos_changes(data)}
+    results.update(gr.calc_t_test_tables(data))
+    return results
+
+
+def assert_results_equal(results, expected, names):
+    for name in names:
+        if isinstance(expected[name], pd.Series):
+            pd.testing.assert_series_equal(results[name], expected[name], check_dtype=False)
+        else:
+            pd.testing.assert_frame_equal(results[name], expected[name], check_dtype=False,
+                                          check_categorical=False)
+
+
+def test_incremental_matches_full_run(dataset):
+    datapath, events = dataset
+
+    merged, recomputed = incremental.run_incremental(events, datapath=datapath)
+
+    assert recomputed == events
+    assert_results_equal(merged, full_analysis(datapath, events), ['data', 'delta_pos'] + list(gr.T_TEST_TABLES))
+
+
+def test_streaming_matches_full_run(dataset, tmp_path):
+    datapath, events = dataset
+
+    (tmp_path / 'results').mkdir()
+    (tmp_path / 'full').mkdir()
+    merged = streaming.run_streaming(events, fpath=f'{tmp_path}/results/', datapath=datapath)
+    expected = full_analysis(datapath, events)
+    gr.write_raw_data(expected['data'], fpath=f'{tmp_path}/full/', formats=['csv'], text=False)
+
+    assert_results_equal(merged, expected, ['delta_pos'] + list(gr.T_TEST_TABLES))
+    # Ranked data is written one event at a time, to the same file as the full analysis
+    assert (tmp_path / 'results' / 'raw_data.csv').read_text() == (tmp_path / 'full' / 'raw_data.csv').read_text()
+
+
+def test_cache_invalidated_by_source_and_code(dataset, monkeypatch):
+    datapath, events = dataset
+    incremental.run_incremental(events, datapath=datapath)
+
+    assert incremental.run_incremental(events, datapath=datapath)[1] == []
+
+    # Changing one score file recomputes only that event
+    fname = f'{datapath}{events[1]}Scores.csv'
+    scores = pd.read_csv(fname, index_col=0)
+    scores.loc[scores.index[0], 'Score'] -= 1
+    scores.to_csv(fname)
+    merged, recomputed = incremental.run_incremental(events, datapath=datapath)
+    assert recomputed == [events[1]]
+    assert_results_equal(merged, full_analysis(datapath, events), ['data', 'delta_pos'])
+
+    # Editing the library code the analysis runs recomputes every event
+    module_hash = pipeline.module_hash
+    monkeypatch.setattr(pipeline, 'module_hash',
+                        lambda name: 'edited' if name.endswith('.ranking') else module_hash(name))
+    assert incremental.run_incremental(events, datapath=datapath)[1] == events
@@ -0,0 +1,73 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the memory peaks recorded for serial and concurrent stages
+#
+
+import threading
+
+import numpy as np
+import pytest
+
+from archery_gender_analysis import instrument
+
+SIZE = 8 * 2**20
+
+
+def allocate():
+    block = np.ones(SIZE // 8)
+    del block
+
+
+@pytest.fixture
+def recorder():
+    recorder = instrument.enable(trace_memory=True)
+    if not recorder.trace_memory:
+        instrument.disable()
+        pytest.skip('memory peaks need tracemalloc.reset_peak')
+    yield recorder
+    instrument.disable()
+
+
+def peaks(recorder):
+    return {record['name']: record['peak_bytes'] for record in recorder.records}
+
+
+def test_serial_peaks(recorder):
+    with instrument.stage('outer'):
+        with instrument.stage('inner'):
+            allocate()
+        with instrument.stage('small'):
+            pass
+    result = peaks(recorder)
+
+    assert result['inner'] >= SIZE
+    assert result['small'] < SIZE
+    # The peak of a stage includes those of the stages within it
+    assert result['outer'] >= SIZE
+
+
+def test_concurrent_peaks_not_recorded(recorder):
+    both_open = threading.Barrier(2)
+
+    def run(name):
+        with instrument.stage(name):
+            both_open.wait()
+            allocate()
+            both_open.wait()
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ['a', 'b']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with instrument.stage('after'):
+        allocate()
+    result = peaks(recorder)
+
+    assert result['a'] is None and result['b'] is None
+    assert result['after'] >= SIZE
@@ -0,0 +1,46 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the analysis on a process pool against the serial analysis
+#
+
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import parallel
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('partition', ['event', 'division'])
+def test_parallel_matches_serial(synthetic_data, tmp_path, partition, compact):
+    datapath, events = synthetic_data
+    data = gr.read_from_files(events, datapath=datapath, use_store=False, compact=compact)
+
+    results = parallel.run_parallel(data.copy(), max_workers=2, partition=partition, tmp_dir=str(tmp_path))
+
+    ranked = gr.calc_delta_sep_mixed(data.copy())
+    pd.testing.assert_frame_equal(results['data'], ranked)
+    pd.testing.assert_frame_equal(results['delta_pos'], gr.calc_pos_changes(ranked.copy()))
+    tables = gr.calc_t_test_tables(ranked.copy())
+    for name in gr.T_TEST_TABLES:
+        if isinstance(tables[name], pd.Series):
+            pd.testing.assert_series_equal(results[name], tables[name])
+        else:
+            pd.testing.assert_frame_equal(results[name], tables[name])
+    # The shared column files are removed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_missing_keys_left_unranked(synthetic_data, tmp_path):
+    datapath, events = synthetic_data
+    data = gr.read_from_files(events, datapath=datapath, use_store=False)
+    data.loc[::40, 'Division'] = None
+
+    results = parallel.run_parallel(data.copy(), max_workers=2, tmp_dir=str(tmp_path))
+
+    pd.testing.assert_frame_equal(results['data'], gr.calc_delta_sep_mixed(data.copy()))
@@ -0,0 +1,98 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the invalidation of cached pipeline stages and of their results files
+#
+
+import importlib.util
+import sys
+
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import pipeline
+
+TARGETS = ['rank', 't_test', 'plot_index']
+
+
+@pytest.fixture
+def analysis(synthetic_data, tmp_path):
+    datapath, events = synthetic_data
+    return pipeline.build_analysis(events, datapath=datapath, fpath=f'{tmp_path}/', formats=['csv'])
+
+
+def _edit(monkeypatch, edited):
+    # Stand in for editing the source of a module
+    module_hash = pipeline.module_hash
+    monkeypatch.setattr(pipeline, 'module_hash',
+                        lambda name: 'edited' if name == edited else module_hash(name))
+
+
+def test_unchanged_stages_are_skipped(analysis):
+    first = analysis.run(targets=TARGETS)
+    second = analysis.run(targets=TARGETS)
+
+    assert set(first.values()) == {'ran'}
+    assert set(second.values()) == {'skipped'}
+
+
+def test_editing_ranking_reruns_ranking(analysis, monkeypatch):
+    analysis.run(targets=TARGETS)
+    _edit(monkeypatch, 'archery_gender_analysis.ranking')
+
+    status = analysis.run(targets=TARGETS)
+
+    assert status['rank'] == 'ran'
+    # The ranked data is unchanged, so stages using it stay cached
+    assert status['read'] == 'skipped'
+    assert status['plot_index'] == 'skipped'
+
+
+def test_editing_group_stats_reruns_t_test(analysis, monkeypatch):
+    analysis.run(targets=TARGETS)
+    _edit(monkeypatch, 'archery_gender_analysis.group_stats')
+
+    status = analysis.run(targets=TARGETS)
+
+    assert status['t_test'] == 'ran'
+    assert status['rank'] == 'skipped'
+
+
+def test_module_hash_follows_source(tmp_path, monkeypatch):
+    source = tmp_path / 'agb_edited_module.py'
+    source.write_text('VALUE = 1\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    before = pipeline.module_hash('agb_edited_module')
+
+    source.write_text('VALUE = 2\n')
+
+    assert pipeline.module_hash('agb_edited_module') != before
+    # Hashing does not import the module
+    assert 'agb_edited_module' not in sys.modules
+
+
+def test_every_stage_hashes_existing_modules(analysis):
+    for stage in analysis.stages.values():
+        assert stage.modules
+        for module in stage.modules:
+            assert importlib.util.find_spec(module) is not None
+
+
+def test_results_written_as_text_by_default(synthetic_data, tmp_path):
+    datapath, events = synthetic_data
+    (tmp_path / 'text').mkdir()
+    (tmp_path / 'both').mkdir()
+
+    pipeline.build_analysis(events, datapath=datapath, fpath=f'{tmp_path}/text/').run(targets=['t_test'])
+    pipeline.build_analysis(events, datapath=datapath, fpath=f'{tmp_path}/both/',
+                            formats=['csv']).run(targets=['t_test'])
+
+    # Machine-readable formats are only written when asked for
+    assert sorted(path.name for path in (tmp_path / 'text').iterdir() if path.is_file()) == \
+        sorted(f'{name}.txt' for name in gr.T_TEST_TABLES)
+    assert sorted(path.name for path in (tmp_path / 'both').iterdir() if path.is_file()) == \
+        sorted(f'{name}.{ext}' for name in gr.T_TEST_TABLES for ext in ['csv', 'txt'])
@@ -0,0 +1,62 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Smoke tests of the plotting routines and their shared plot index
+#
+
+import os
+
+import matplotlib
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+import numpy as np
+import pytest
+
+from archery_gender_analysis import plotting
+from archery_gender_analysis.plot_data import PlotIndex
+
+
+@pytest.fixture
+def index(ranked):
+    return PlotIndex(ranked)
+
+
+def test_render_plots_leaves_no_figures_open(index, tmp_path):
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    files = plotting.render_plots(index, fpath=f'{tmp_path}/', fmt='png')
+
+    assert len(files) == len(index.events) * len(plotting.PLOT_TYPES)
+    assert all(os.path.getsize(fname) > 0 for fname in files)
+    assert plt.get_fignums() == []
+
+
+@pytest.mark.parametrize('mode, hexbins', [('markers', 0), ('density', 2), ('auto', 0)])
+def test_density_mode(index, mode, hexbins):
+    event = index.events[0]
+    fig = Figure()
+
+    plotting._plot_scores(fig, index, event, mode=mode)
+
+    # One hexbin per gender in each division, replacing the markers, above the threshold in 'auto' mode
+    for ax in fig.axes:
+        assert sum(isinstance(c, PolyCollection) for c in ax.collections) == hexbins
+    with pytest.raises(ValueError):
+        plotting._plot_scores(Figure(), index, event, mode='hexagons')
+
+
+def test_subset_matches_index_of_event(ranked, index):
+    event = index.events[1]
+
+    sub = index.subset([event])
+    expected = PlotIndex(ranked[ranked['Event'] == event])
+
+    assert sub.events == [event] and sub.divisions == expected.divisions
+    assert sub.slices == expected.slices
+    for attr in ['score', 'sep_rank', 'mixed_rank', 'sep_pc', 'mixed_pc']:
+        np.testing.assert_array_equal(getattr(sub, attr), getattr(expected, attr))
@@ -0,0 +1,73 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the sorted pass rank tests against scipy
+#
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from archery_gender_analysis import rank_tests
+
+
+def _scipy_tests(data, keys):
+    # Each group tested separately by scipy
+    rows = {}
+    for key, group in data.groupby(keys, observed=True):
+        men = group.loc[group['Class'] == 'M', 'Score'].dropna().to_numpy(dtype=np.float64)
+        women = group.loc[group['Class'] == 'W', 'Score'].dropna().to_numpy(dtype=np.float64)
+        if len(men) and len(women):
+            u = stats.mannwhitneyu(men, women, method='asymptotic')
+            d = stats.ks_2samp(men, women, method='asymp')
+            rows[key] = [len(men), len(women), u.statistic, u.pvalue, d.statistic, d.pvalue]
+        else:
+            rows[key] = [len(men), len(women)] + [np.nan] * 4
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['n_M', 'n_W', 'U', 'U p', 'D', 'D p'])
+
+
+@pytest.mark.parametrize('keys', [['Event', 'Division'], ['Event', 'Division', 'Rank band']])
+def test_rank_tests_match_scipy(ranked, keys):
+    expected = _scipy_tests(ranked, keys)
+
+    result = rank_tests.rank_tests(ranked, keys)
+    result = result[(result['n_M'] > 0) | (result['n_W'] > 0)]
+
+    assert len(result) == len(expected)
+    result = result.loc[expected.index]
+    np.testing.assert_array_equal(result[['n_M', 'n_W']].to_numpy(), expected[['n_M', 'n_W']].to_numpy())
+    np.testing.assert_allclose(result[['U', 'U p', 'D', 'D p']].to_numpy(),
+                               expected[['U', 'U p', 'D', 'D p']].to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+def test_order_without_mixed_ranks(ranked):
+    # Without mixed ranks the rows are sorted on score within each group instead
+    expected = rank_tests.rank_tests(ranked, ['Event', 'Division', 'Rank band'])
+
+    result = rank_tests.rank_tests(ranked.drop(columns='Mixed rank'), ['Event', 'Division', 'Rank band'])
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_missing_class_and_scores():
+    data = pd.DataFrame({
+        'Event': ['A'] * 9,
+        'Division': ['R'] * 5 + ['C'] * 4,
+        'Class': ['M', 'W', 'M', 'W', 'W', 'M', 'M', 'M', 'W'],
+        'Score': [500, 500, 490, np.nan, 480, 400, 390, 380, np.nan],
+    })
+
+    result = rank_tests.rank_tests(data, ['Event', 'Division'])
+
+    # Compound has no scored women, so no test
+    assert result.loc[('A', 'C'), ['n_M', 'n_W']].tolist() == [3, 0]
+    assert result.loc[('A', 'C'), ['U', 'U p', 'D', 'D p']].isna().all()
+    men, women = np.array([500.0, 490]), np.array([500.0, 480])
+    assert result.loc[('A', 'R'), 'U'] == pytest.approx(stats.mannwhitneyu(men, women, method='asymptotic').statistic)
+    assert result.loc[('A', 'R'), 'D p'] == pytest.approx(stats.ks_2samp(men, women, method='asymp').pvalue,
+                                                          rel=1e-9)
@@ -0,0 +1,141 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the vectorised ranking against the pandas groupby formulation
+#
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import ranking
+
+
+def _reference_ranks(df_in, keys, tie_breaks=('10',)):
+    # Rank on score then tie breaks as one composite key, ties sharing the lowest rank
+    composite = df_in['Score'].astype(np.float64)
+    for col in tie_breaks:
+        composite = composite * 1000 + df_in[col]
+    rank = composite.groupby([df_in[key] for key in keys]).rank(ascending=False, method='min')
+    count = df_in.groupby(keys)['Score'].transform('count')
+    return rank, 100 * ((rank - 1) / (count - 1))
+
+
+def _groupby_ranks(df_in):
+    # The original groupby implementation of the separate and mixed ranks
+    df_out = df_in.copy()
+    for label, keys in [('Sep', ['Event', 'Division', 'Class']), ('Mixed', ['Event', 'Division'])]:
+        df_out[f'{label} rank'] = (df_in.groupby(keys)['Score'].rank(ascending=False, method='min')
+                                   + df_in.groupby(keys + ['Score'])['10'].rank(ascending=False, method='min')
+                                   - 1)
+        df_out[f'{label} pc'] = 100 * ((df_out[f'{label} rank'] - 1)
+                                       / (df_in.groupby(keys)['Score'].transform('count') - 1))
+    df_out['Delta rank'] = df_out['Sep rank'] - df_out['Mixed rank']
+    df_out['Delta pc'] = df_out['Sep pc'] - df_out['Mixed pc']
+    return df_out
+
+
+@pytest.fixture
+def scores(synthetic_data):
+    datapath, events = synthetic_data
+    return gr.read_from_files(events, datapath=datapath, use_store=False)
+
+
+def test_ranks_match_groupby(scores):
+    expected = _groupby_ranks(scores)
+
+    ranked = gr.calc_delta_sep_mixed(scores.copy())
+
+    pd.testing.assert_frame_equal(ranked, expected, check_dtype=False)
+
+
+def test_ranks_with_ties_and_small_groups():
+    df_in = pd.DataFrame({
+        'Event': ['A'] * 7 + ['B'],
+        'Division': ['R', 'R', 'R', 'R', 'R', 'C', 'C', 'R'],
+        'Class': ['M', 'W', 'M', 'W', 'M', 'W', 'W', 'M'],
+        'Score': [580, 580, 580, 570, 590, 500, 500, 400],
+        '10': [30, 30, 28, 20, 40, 10, 10, 5],
+        '9': [20, 21, 20, 20, 20, 10, 10, 5],
+    })
+    expected = _groupby_ranks(df_in)
+
+    ranked = gr.calc_delta_sep_mixed(df_in.copy())
+
+    pd.testing.assert_frame_equal(ranked, expected, check_dtype=False)
+
+
+def test_extra_tie_breaks(scores):
+    results = ranking.rank_percentiles(scores, tie_breaks=['10', '9'])
+
+    for label, keys in [('Sep', ranking.SEP_KEYS), ('Mixed', ranking.MIXED_KEYS)]:
+        rank, pc = _reference_ranks(scores, keys, tie_breaks=['10', '9'])
+        np.testing.assert_array_equal(results[f'{label} rank'], rank.to_numpy())
+        np.testing.assert_allclose(results[f'{label} pc'], pc.to_numpy())
+
+
+def test_missing_scores_are_unranked(scores):
+    df_in = scores.copy()
+    df_in['Score'] = df_in['Score'].astype(np.float64)
+    df_in.loc[::50, 'Score'] = np.nan
+    expected = _groupby_ranks(df_in)
+
+    ranked = gr.calc_delta_sep_mixed(df_in.copy())
+
+    pd.testing.assert_frame_equal(ranked, expected, check_dtype=False)
+
+
+def test_compact_ranks_match(synthetic_data, scores):
+    datapath, events = synthetic_data
+    compact = gr.read_from_files(events, datapath=datapath, use_store=False, compact=True)
+
+    ranked = gr.calc_delta_sep_mixed(compact)
+    expected = gr.calc_delta_sep_mixed(scores.copy())
+
+    for col in ['Sep rank', 'Mixed rank', 'Delta rank']:
+        np.testing.assert_array_equal(ranked[col].to_numpy(), expected[col].to_numpy())
+    for col in ['Sep pc', 'Mixed pc', 'Delta pc']:
+        np.testing.assert_allclose(ranked[col].to_numpy(), expected[col].to_numpy(), atol=1e-4)
+
+
+def _sorted_head(df_in, k):
+    # The original sort then head formulation of the top k of each category
+    df_in = df_in.sort_values(by=['Event', 'Division', 'Class', 'Score', '10'],
+                              ascending=[False, True, True, False, False], ignore_index=True)
+    return (df_in.groupby(['Event', 'Division', 'Class'], observed=True)
+            [['Event', 'Division', 'Class', 'Sep rank', 'Mixed rank', 'Delta rank']].head(k)
+            .reset_index(drop=True))
+
+
+@pytest.mark.parametrize('k', [1, 3, 16, 10_000])
+def test_top_k_matches_sort_head(scores, k):
+    ranked = gr.calc_delta_sep_mixed(scores.copy())
+
+    pd.testing.assert_frame_equal(gr.calc_pos_changes(ranked, k=k), _sorted_head(ranked, k))
+
+
+def test_top_k_with_missing_values(scores):
+    df_in = scores.copy()
+    df_in['Score'] = df_in['Score'].astype(np.float64)
+    df_in.loc[::7, 'Score'] = np.nan
+    df_in.loc[::50, 'Division'] = None
+    ranked = gr.calc_delta_sep_mixed(df_in)
+
+    for k in [1, 3, 16]:
+        pd.testing.assert_frame_equal(gr.calc_pos_changes(ranked, k=k), _sorted_head(ranked, k))
+
+
+def test_top_k_with_ties(scores):
+    # Coarse scores and counts tie many rows with the k-th best, leaving full ties in their original order
+    df_in = scores.copy()
+    df_in['Score'] = df_in['Score'] // 20 * 20
+    df_in['10'] = df_in['10'] // 10 * 10
+    ranked = gr.calc_delta_sep_mixed(df_in)
+
+    for k in [1, 3, 16]:
+        pd.testing.assert_frame_equal(gr.calc_pos_changes(ranked, k=k), _sorted_head(ranked, k))
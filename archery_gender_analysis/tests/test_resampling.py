@@ -0,0 +1,80 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the memory budget and tables of the batched resampling tests
+#
+
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import resampling
+
+
+@pytest.mark.parametrize('test', [resampling.permutation_test, resampling.bootstrap_test])
+def test_budget_shared_between_workers(ranked, monkeypatch, test):
+    budgets = []
+    chunk_sizes = resampling._chunk_sizes
+
+    def record(n_resamples, n_rows, memory_budget):
+        budgets.append(memory_budget)
+        return chunk_sizes(n_resamples, n_rows, memory_budget)
+
+    monkeypatch.setattr(resampling, '_chunk_sizes', record)
+    budget = 4 * 2**20
+    pooled = test(ranked, ['Event', 'Division'], n_resamples=199, seed=1, max_workers=2, memory_budget=budget)
+    serial = test(ranked, ['Event', 'Division'], n_resamples=199, seed=1, memory_budget=budget // 2)
+
+    assert budgets == [budget // 2, budget // 2]
+    # The same chunks give the same resamples, whether or not they are spread over a pool
+    pd.testing.assert_frame_equal(pooled, serial)
+
+
+def test_chunks_fit_budget():
+    n_rows = 10_000
+    budget = 2**20
+    sizes = resampling._chunk_sizes(999, n_rows, budget)
+
+    assert sum(sizes) == 999
+    assert max(sizes) * n_rows * 8 * resampling._MATRICES_PER_CHUNK <= budget
+
+
+@pytest.mark.parametrize('chunk_func', [resampling._permutation_chunk, resampling._bootstrap_chunk])
+def test_chunk_peak_within_budget(ranked, chunk_func):
+    samples = resampling.GroupedSamples(ranked, ['Event', 'Division'])
+    budget = 2**20
+    size = max(resampling._chunk_sizes(999, len(samples.values), budget))
+    # Allow for the per-group arrays, which do not scale with the number of resamples
+    overhead = 64 * len(samples.index) * 8
+
+    tracemalloc.start()
+    chunk_func(samples, size, 1)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert peak <= budget + overhead
+
+
+@pytest.mark.parametrize('method', ['welch', 'permutation', 'bootstrap'])
+def test_t_test_tables_shape(ranked, method):
+    resample_args = {} if method == 'welch' else {'n_resamples': 99, 'seed': 1}
+    tables = gr.calc_t_test_tables(ranked, method=method, **resample_args)
+    welch = gr.calc_t_test_tables(ranked)
+
+    # Every method gives p-values for the same groups, only the bootstrap adds confidence intervals
+    for name in ['t_test_results_all', 't_test_results_bands']:
+        assert isinstance(tables[name], pd.Series) and tables[name].name == 'p'
+        assert tables[name].index.equals(welch[name].index)
+    assert ('bootstrap_ci_all' in tables) == (method == 'bootstrap')
+    if method == 'bootstrap':
+        ci = tables['bootstrap_ci_bands']
+        assert list(ci.columns) == ['diff', 'ci_low', 'ci_high']
+        assert ci.index.equals(tables['t_test_results_bands'].index)
+        valid = ci.dropna()
+        assert ((valid['ci_low'] <= valid['diff']) & (valid['diff'] <= valid['ci_high'])).all()
@@ -0,0 +1,96 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the stacked scenario ranking against ranking each scenario on its own
+#
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import ranking, scenarios
+
+SCENARIOS = [
+    scenarios.Scenario('separate', keys=['Event', 'Division', 'Class']),
+    scenarios.Scenario('mixed'),
+    scenarios.Scenario('mixed 10s 9s', tie_breaks=['10', '9']),
+    scenarios.Scenario('score only', tie_breaks=[]),
+    scenarios.Scenario('barebow with recurve', merge={'Division': {'B': 'R'}}),
+    scenarios.Scenario('one field', merge={'Division': {'B': 'R', 'C': 'R', 'L': 'R'}}, tie_breaks=['10', '9']),
+    scenarios.Scenario('mixed quota 8', quota=8),
+    scenarios.Scenario('merged quota 20', merge={'Division': {'L': 'B'}}, quota=20),
+]
+
+
+@pytest.fixture
+def scores(synthetic_data):
+    datapath, events = synthetic_data
+    data = gr.read_from_files(events, datapath=datapath, use_store=False)
+    # Missing scores, counts and divisions are left unranked
+    data['9'] = data['9'].astype(np.float64)
+    data.loc[::97, '9'] = np.nan
+    data.loc[::101, 'Division'] = None
+    return data
+
+
+def _rank_scenario(df_in, scenario, score='Score'):
+    # Rank a single scenario on its merged key columns with sorted_ranks, as in calc_rank_percentiles
+    frame = df_in.copy()
+    for key, mapping in scenario.merge.items():
+        frame[key] = frame[key].map(lambda value: mapping.get(value, value))
+    sort_keys = [frame[col].to_numpy(dtype=np.float64) for col in [score] + list(scenario.tie_breaks)]
+    unranked = np.any([np.isnan(key) for key in sort_keys], axis=0)
+
+    def ranks_in(keys, exclude):
+        groups = ranking.group_codes(frame, keys)[0]
+        groups[exclude] = -1
+        order = ranking.sort_order(groups, sort_keys)
+        ranks, counts = ranking.sorted_ranks(groups[order], [key[order] for key in sort_keys])
+        rank, size = np.full(len(frame), np.nan), np.full(len(frame), np.nan)
+        rank[order], size[order] = ranks, counts
+        rank[groups < 0] = size[groups < 0] = np.nan
+        return rank, size
+
+    exclude = unranked
+    if scenario.quota is not None:
+        class_rank, _ = ranks_in(scenario.keys + [scenario.quota_key], unranked)
+        exclude = unranked | ~(class_rank <= scenario.quota)
+    rank, size = ranks_in(scenario.keys, exclude)
+    return pd.DataFrame({'Rank': rank, 'Percentile': ranking.percentile(rank, size), 'Field size': size},
+                        index=df_in.index)
+
+
+def test_scenarios_match_ranking_each(scores):
+    results = scenarios.rank_scenarios(scores, SCENARIOS)
+
+    for scenario in SCENARIOS:
+        result = results[results['Scenario'] == scenario.name].set_index('Archer')
+        expected = _rank_scenario(scores, scenario)
+        pd.testing.assert_frame_equal(result[['Rank', 'Percentile', 'Field size']], expected,
+                                      check_names=False)
+
+
+def test_field_codes_do_not_overflow():
+    # Five keys of 2**16 categories give more combinations than an int64 can hold, without
+    # compacting the codes the first key would be shifted out and rows 0 and 1 share a field
+    categories = np.arange(2**16)
+    keys = [f'k{i}' for i in range(5)]
+    data = pd.DataFrame({key: pd.Categorical([0, 1, 1, 1], categories=categories) if key == 'k0' else
+                         pd.Categorical([0, 0, 1, np.nan], categories=categories) for key in keys})
+
+    codes = scenarios.field_codes(data, scenarios.Scenario('many keys', keys=keys))
+
+    assert codes[3] == -1
+    assert len(set(codes[:3])) == 3 and (codes[:3] >= 0).all()
+    # The same rows share a field as for the groups of the ranking
+    np.testing.assert_array_equal(pd.factorize(codes)[0], pd.factorize(ranking.group_codes(data, keys)[0])[0])
+
+
+def test_duplicate_names(scores):
+    with pytest.raises(ValueError):
+        scenarios.rank_scenarios(scores, [scenarios.Scenario('mixed'), scenarios.Scenario('mixed', quota=3)])
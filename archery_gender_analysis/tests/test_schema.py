@@ -0,0 +1,64 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the compact schema against the analysis of uncompacted data
+#
+
+import numpy as np
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import schema
+
+
+@pytest.fixture
+def analyses(synthetic_data):
+    datapath, events = synthetic_data
+    results = {}
+    for compact in [False, True]:
+        data = gr.read_from_files(events, datapath=datapath, use_store=False, compact=compact)
+        results[compact] = gr.set_rank_band(gr.calc_delta_sep_mixed(data))
+    return results
+
+
+def test_compact_schema_applied(analyses):
+    compact = analyses[True]
+
+    assert schema.is_compact(compact) and not schema.is_compact(analyses[False])
+    for col in schema.LABEL_COLUMNS:
+        assert list(compact[col].cat.categories) == sorted(compact[col].cat.categories)
+    assert compact['Score'].dtype == np.int16 and compact['Sep pc'].dtype == np.float32
+
+
+def test_compact_ranks_match(analyses):
+    full, compact = analyses[False], analyses[True]
+
+    np.testing.assert_array_equal(compact['Score'], full['Score'])
+    for col in ['Sep rank', 'Mixed rank', 'Delta rank']:
+        np.testing.assert_array_equal(compact[col], full[col])
+    # Percentiles are held in single precision
+    for col in ['Sep pc', 'Mixed pc', 'Delta pc']:
+        np.testing.assert_allclose(compact[col], full[col], rtol=1e-6, atol=1e-4)
+    assert compact['Rank band'].astype(str).tolist() == full['Rank band'].astype(str).tolist()
+
+
+def test_compact_t_tests_match(analyses):
+    full = gr.calc_t_test_tables(analyses[False])
+    compact = gr.calc_t_test_tables(analyses[True])
+
+    for name in gr.T_TEST_TABLES:
+        # Categorical index levels hold the same labels in the same order
+        assert compact[name].index.equals(full[name].index)
+        np.testing.assert_allclose(compact[name].to_numpy(dtype=np.float64), full[name].to_numpy(dtype=np.float64),
+                                   rtol=1e-9)
+
+def test_compact_dtype_overflow():
+    assert schema.compact_dtype('Score', np.array([0, 600])) == np.int16
+    # Missing ranks are held as float
+    assert schema.compact_dtype('Sep rank', np.array([1.0, np.nan])) == np.float32
+    with pytest.raises(ValueError):
+        schema.compact_dtype('10', np.array([0, 200]))
@@ -0,0 +1,153 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Tests of the query service against re-ranking the event
+#
+
+import asyncio
+import json
+import socket
+
+import pandas as pd
+import pytest
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import service
+
+
+def _rank(data):
+    return gr.calc_delta_sep_mixed(gr.calc_mixed_rank_percentiles(data))
+
+
+@pytest.fixture
+def event_data(synthetic_data):
+    datapath, events = synthetic_data
+    return _rank(gr.read_from_files([events[0]], datapath=datapath, use_store=False))
+
+
+@pytest.fixture
+def query_service(synthetic_data):
+    datapath, events = synthetic_data
+    return service.QueryService(events, datapath=datapath)
+
+
+def test_lru_cache_eviction():
+    cache = service.LRUCache(10, sizeof=len)
+    cache.put('a', 'aaaa')
+    cache.put('b', 'bbbb')
+    assert cache.get('a') == 'aaaa'
+
+    # Going over the size evicts the least recently used
+    cache.put('c', 'cccc')
+    assert cache.keys() == ['a', 'c']
+    assert cache.get('b') is None
+    assert cache.stats() == {'entries': 2, 'bytes': 8, 'max_bytes': 10, 'hits': 1, 'misses': 1, 'evictions': 1}
+
+    # A value larger than the cache is still kept, on its own
+    cache.put('d', 'd' * 20)
+    assert cache.keys() == ['d'] and cache.total_bytes == 20
+
+
+def test_archer(event_data):
+    event_ranking = service.EventRanking(event_data)
+    women = event_data[(event_data['Division'] == 'R') & (event_data['Class'] == 'W')]
+
+    for position in women['Sep rank'].iloc[[0, 2, -1]]:
+        expected = women[women['Sep rank'] == position]
+        archers = event_ranking.archer('R', 'W', position)
+        assert [archer['Score'] for archer in archers] == expected['Score'].tolist()
+        assert [archer['Mixed rank'] for archer in archers] == expected['Mixed rank'].tolist()
+        assert [archer['Delta pc'] for archer in archers] == pytest.approx(expected['Delta pc'].tolist())
+    with pytest.raises(LookupError):
+        event_ranking.archer('R', 'W', len(women) + 1)
+    with pytest.raises(LookupError):
+        event_ranking.archer('X', 'W', 1)
+
+
+@pytest.mark.parametrize('div, cls', [('R', 'W'), ('C', 'M'), ('B', 'W')])
+def test_hypothetical_matches_reranking(event_data, div, cls):
+    event_ranking = service.EventRanking(event_data)
+    field = event_data[(event_data['Division'] == div) & (event_data['Class'] == cls)]
+
+    # A score tied with an existing archer, and ones above and below the field
+    for score, tens in [tuple(field[['Score', '10']].iloc[len(field) // 2]), (600, 60), (1, 0)]:
+        extra = event_data.iloc[:1].copy()
+        extra[['Division', 'Class', 'Score', '10']] = [div, cls, score, tens]
+        ranked = _rank(pd.concat([event_data, extra], ignore_index=True)[event_data.columns])
+        expected = ranked.iloc[-1]
+
+        result = event_ranking.hypothetical(div, int(score), int(tens), cls=cls)
+
+        for col in ['Sep rank', 'Mixed rank', 'Delta rank']:
+            assert result[col] == expected[col]
+        for col in ['Sep pc', 'Mixed pc', 'Delta pc']:
+            assert result[col] == pytest.approx(expected[col])
+
+
+def test_query_service(query_service, monkeypatch):
+    loads = []
+    load = query_service.load
+    monkeypatch.setattr(query_service, 'load', lambda event: loads.append(event) or load(event))
+    event = query_service.events[0]
+
+    async def respond(*requests):
+        return [await query_service._respond(request.split()) for request in requests]
+
+    responses = asyncio.run(respond(f'GET /archer?event={event}&division=C&class=W&position=1 HTTP/1.1',
+                                    f'GET /score?event={event}&division=C&score=580&tens=40 HTTP/1.1',
+                                    'GET /cache HTTP/1.1',
+                                    'GET /archer?event=Unknown&division=C&class=W&position=1 HTTP/1.1',
+                                    f'GET /archer?event={event}&division=C HTTP/1.1',
+                                    f'GET /score?event={event}&division=C&score=high HTTP/1.1',
+                                    'POST /events HTTP/1.1'))
+
+    assert [status for status, _ in responses] == [200, 200, 200, 404, 400, 400, 405]
+    assert responses[0][1][0]['Sep rank'] == 1
+    assert 'Sep rank' not in responses[1][1]
+    # The event is ranked once and answered from the cache after
+    assert loads == [event]
+    assert responses[2][1]['entries'] == 1 and responses[2][1]['hits'] >= 1
+
+
+def test_http_round_trip(query_service):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    event = query_service.events[1]
+
+    async def round_trip():
+        server = asyncio.ensure_future(service.serve(query_service, port=port))
+        for _ in range(100):
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                break
+            except ConnectionError:
+                await asyncio.sleep(0.05)
+        responses = []
+        # Two requests on one kept alive connection
+        for path, connection in [('/events', 'keep-alive'),
+                                 (f'/archer?event={event}&division=R&class=M&position=1', 'close')]:
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: {connection}\r\n\r\n'.encode())
+            status = (await reader.readline()).decode()
+            headers = {}
+            line = await reader.readline()
+            while line != b'\r\n':
+                name, _, value = line.decode().partition(':')
+                headers[name.strip().lower()] = value.strip()
+                line = await reader.readline()
+            body = await reader.readexactly(int(headers['content-length']))
+            responses.append((status.split()[1], headers['connection'], json.loads(body)))
+        assert await reader.read() == b''
+        writer.close()
+        server.cancel()
+        return responses
+
+    (status, connection, events), (status_archer, _, archers) = asyncio.run(round_trip())
+
+    assert (status, connection) == ('200', 'keep-alive')
+    assert events == {'events': query_service.events, 'cached': []}
+    assert status_archer == '200' and all(archer['Sep rank'] == 1 for archer in archers)
@@ -0,0 +1,84 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Benchmark of the single pass IANSEO parser against the BeautifulSoup/pandas path
+#
+# Usage         : python benchmarks/bench_parse.py [--pages DIR] [--athletes N] [--repeat R]
+#
+#                 DIR may hold saved category pages (*.html) or be a response cache directory
+#                 (*.body).  If no pages are given synthetic pages in both table layouts are
+#                 rendered with N athletes each.
+#
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+from archery_gender_analysis import ianseo_parse, ianseo_scrape, synthetic
+
+ANALYSIS_COLUMNS = ['Category Rank', 'Score', '10', '9']
+
+
+def fixture_category(n_athletes, seed=0):
+    # Recurve men are about a third of the entries of a synthetic event
+    event = synthetic.generate_event(3 * n_athletes, seed=seed)
+    return event[(event['Division'] == 'R') & (event['Class'] == 'M')].head(n_athletes)
+
+
+def load_pages(pages_dir):
+    pages = {}
+    for fname in sorted(glob.glob(os.path.join(pages_dir, '*.html')) + glob.glob(os.path.join(pages_dir, '*.body'))):
+        with open(fname, 'rb') as f:
+            pages[os.path.basename(fname)] = f.read().decode('utf-8', errors='replace')
+    return pages
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark IANSEO qualification table parsers')
+    parser.add_argument('--pages', default=None, help='directory of saved category pages')
+    parser.add_argument('--athletes', type=int, default=300, help='athletes per fixture page')
+    parser.add_argument('--repeat', type=int, default=5, help='repeats, the best time is reported')
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = load_pages(args.pages)
+    else:
+        cat = fixture_category(args.athletes)
+        pages = {'old_layout': synthetic.render_page(cat, 'old'), 'new_layout': synthetic.render_page(cat, 'new')}
+
+    print(f'{"page":<48}{"rows":>6}{"current (ms)":>14}{"fast (ms)":>12}{"speed-up":>10}')
+    for name, text in pages.items():
+        try:
+            current = ianseo_scrape.parse_cat(text, 'X', 'X')
+        except (ValueError, AttributeError):
+            # Not a category page with results
+            continue
+        fast = ianseo_parse.parse_cat(text, 'X', 'X')
+        same = np.array_equal(current[ANALYSIS_COLUMNS].to_numpy(dtype=np.int64),
+                              fast[ANALYSIS_COLUMNS].to_numpy(dtype=np.int64))
+        if not same:
+            print(f'{name}: parsers disagree')
+
+        t_current = best_time(lambda: ianseo_scrape.parse_cat(text, 'X', 'X'), args.repeat)
+        t_fast = best_time(lambda: ianseo_parse.parse_cat(text, 'X', 'X'), args.repeat)
+        print(f'{name:<48}{len(fast):>6}{1e3*t_current:>14.2f}{1e3*t_fast:>12.2f}{t_current/t_fast:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
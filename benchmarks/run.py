@@ -0,0 +1,115 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Runner for the benchmark suite, recording and comparing timings
+#
+# Usage         : python benchmarks/run.py [--filter REGEX] [--repeat R] [--quick]
+#                                          [--save FILE] [--compare FILE] [--threshold T]
+#
+#                 With --compare, benchmarks slower than the saved timings by more than the
+#                 threshold ratio are reported as regressions and the exit status is 1.
+#
+
+import argparse
+import inspect
+import itertools
+import json
+import re
+import time
+
+import suite
+
+
+def benchmark_classes():
+    return [cls for _, cls in inspect.getmembers(suite, inspect.isclass)
+            if cls.__module__ == suite.__name__ and any(name.startswith('time_') for name in dir(cls))]
+
+
+def param_sets(cls, quick):
+    params = getattr(cls, 'params', [])
+    if not params:
+        return [()]
+    # A single list of params is the values of a single parameter
+    if not isinstance(params[0], (list, tuple)):
+        params = [params]
+    if quick:
+        params = [values[:1] for values in params]
+    return list(itertools.product(*params))
+
+
+def time_call(func, args, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(pattern=None, repeat=3, quick=False):
+    results = {}
+    for cls in benchmark_classes():
+        methods = sorted(name for name in dir(cls) if name.startswith('time_'))
+        for args in param_sets(cls, quick):
+            for method in methods:
+                name = f'{cls.__name__}.{method}({", ".join(str(arg) for arg in args)})'
+                if pattern is not None and not re.search(pattern, name):
+                    continue
+                bench = cls()
+                if hasattr(bench, 'setup'):
+                    bench.setup(*args)
+                try:
+                    results[name] = time_call(getattr(bench, method), args, repeat)
+                finally:
+                    if hasattr(bench, 'teardown'):
+                        bench.teardown(*args)
+                print(f'{name:<72}{1e3*results[name]:>12.2f} ms', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f'\n{"benchmark":<72}{"baseline":>12}{"now":>12}{"ratio":>8}')
+    for name, now in results.items():
+        if name not in baseline:
+            continue
+        ratio = now / baseline[name]
+        flag = ' regression' if ratio > threshold else ''
+        print(f'{name:<72}{1e3*baseline[name]:>10.2f}ms{1e3*now:>10.2f}ms{ratio:>8.2f}{flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite on synthetic tournaments')
+    parser.add_argument('--filter', default=None, help='only run benchmarks whose name matches this regex')
+    parser.add_argument('--repeat', type=int, default=3, help='repeats, the best time is reported')
+    parser.add_argument('--quick', action='store_true', help='only the first value of each parameter')
+    parser.add_argument('--save', default=None, help='write timings to this json file')
+    parser.add_argument('--compare', default=None, help='compare against timings saved in this json file')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slow-down ratio reported as a regression')
+    args = parser.parse_args()
+
+    results = run(args.filter, repeat=args.repeat, quick=args.quick)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.threshold}x')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
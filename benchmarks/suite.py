@@ -0,0 +1,218 @@
+# Author        : Jack Atkinson
+#                 @jatkinson1000
+#
+# Date Created  : 2026-10-17
+# Last Modified : 2026-10-17
+#
+# Summary       : AGB Gender investigation for indoor competition.
+#                 Benchmarks of the analysis on synthetic tournaments
+#
+# Usage         : python benchmarks/run.py [--filter REGEX] [--save FILE] [--compare FILE]
+#
+#                 Classes follow the airspeed velocity (asv) conventions: setup is run
+#                 before timing each time_* method for every combination of params.
+#
+
+import atexit
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from bs4 import BeautifulSoup
+
+from archery_gender_analysis import general_routines as gr
+from archery_gender_analysis import group_stats, ianseo_parse, ianseo_scrape, parallel, plotting, scenarios, synthetic
+
+N_EVENTS = 4
+
+# Dependencies of plotting and scraping, which analysis-only imports must not load
+HEAVY_MODULES = ['matplotlib', 'mpl_toolkits.axes_grid1', 'scipy', 'requests', 'bs4', 'lxml']
+
+# Import workload -> (code run in a fresh interpreter, heavy modules it may load)
+IMPORTS = {
+    'package': ('import archery_gender_analysis', []),
+    'ranking': ('from archery_gender_analysis import general_routines, ranking, scenarios', []),
+    'service': ('from archery_gender_analysis import service', []),
+    'cli': ('from archery_gender_analysis import cli', []),
+    'plotting': ('from archery_gender_analysis import plotting', ['matplotlib']),
+    'scraping': ('from archery_gender_analysis import ianseo_scrape', ['requests', 'lxml']),
+}
+
+# Synthetic datasets are written once per process and shared by all benchmarks
+_DATASETS = {}
+
+
+def dataset(n_archers):
+    if n_archers not in _DATASETS:
+        datapath = tempfile.mkdtemp(prefix=f'agb_bench_{n_archers}_') + os.sep
+        events = synthetic.generate_dataset(N_EVENTS, n_archers, datapath=datapath, seed=n_archers)
+        _DATASETS[n_archers] = (datapath, events)
+        atexit.register(shutil.rmtree, datapath, ignore_errors=True)
+    return _DATASETS[n_archers]
+
+
+def ranked(n_archers):
+    datapath, events = dataset(n_archers)
+    data = gr.read_from_files(events, datapath=datapath)
+    data = gr.calc_mixed_rank_percentiles(data)
+    return gr.calc_delta_sep_mixed(data)
+
+
+class ReadFromFiles:
+    params = ([10_000, 100_000], ['csv', 'store'])
+    param_names = ['archers', 'source']
+
+    def setup(self, n_archers, source):
+        self.datapath, self.events = dataset(n_archers)
+        self.store_path = os.path.join(self.datapath, '.store')
+        if source == 'store':
+            # Timings are of reads from an up to date store
+            gr.read_from_files(self.events, datapath=self.datapath, store_path=self.store_path)
+
+    def time_read_from_files(self, n_archers, source):
+        gr.read_from_files(self.events, datapath=self.datapath, use_store=(source == 'store'),
+                           store_path=self.store_path)
+
+
+class Ranking:
+    params = ([10_000, 100_000], [False, True])
+    param_names = ['archers', 'compact']
+
+    def setup(self, n_archers, compact):
+        datapath, events = dataset(n_archers)
+        self.data = gr.read_from_files(events, datapath=datapath, compact=compact)
+
+    def time_calc_separate_rank_percentiles(self, n_archers, compact):
+        gr.calc_separate_rank_percentiles(self.data)
+
+    def time_calc_mixed_rank_percentiles(self, n_archers, compact):
+        gr.calc_mixed_rank_percentiles(self.data)
+
+    def time_calc_t_test_tables(self, n_archers, compact):
+        gr.calc_t_test_tables(gr.calc_delta_sep_mixed(self.data.copy()))
+
+
+class Parallel:
+    params = ([100_000], ['event', 'division'])
+    param_names = ['archers', 'partition']
+
+    def setup(self, n_archers, partition):
+        datapath, events = dataset(n_archers)
+        self.data = gr.read_from_files(events, datapath=datapath)
+
+    def time_run_parallel(self, n_archers, partition):
+        parallel.run_parallel(self.data, partition=partition)
+
+
+class Scenarios:
+    params = [10_000, 100_000]
+    param_names = ['archers']
+
+    def setup(self, n_archers):
+        datapath, events = dataset(n_archers)
+        self.data = gr.read_from_files(events, datapath=datapath, compact=True)
+        self.scenarios = [scenarios.Scenario('separate', keys=['Event', 'Division', 'Class']),
+                          scenarios.Scenario('mixed'),
+                          scenarios.Scenario('mixed 10s 9s', tie_breaks=['10', '9']),
+                          scenarios.Scenario('barebow with recurve', merge={'Division': {'B': 'R'}}),
+                          scenarios.Scenario('mixed quota 8', quota=8),
+                          scenarios.Scenario('open', keys=['Event'])]
+
+    def time_rank_scenarios(self, n_archers):
+        scenarios.rank_scenarios(self.data, self.scenarios)
+
+
+class Results:
+    params = [10_000, 100_000]
+    param_names = ['archers']
+
+    def setup(self, n_archers):
+        self.data = ranked(n_archers)
+        self.fpath = tempfile.mkdtemp(prefix='agb_bench_results_') + os.sep
+
+    def teardown(self, n_archers):
+        shutil.rmtree(self.fpath, ignore_errors=True)
+
+    def time_calc_pos_changes(self, n_archers):
+        gr.calc_pos_changes(self.data)
+
+    def time_calc_pos_changes_top32(self, n_archers):
+        gr.calc_pos_changes(self.data, k=32)
+
+    def time_get_pos_changes(self, n_archers):
+        gr.get_pos_changes(self.data, fpath=self.fpath)
+
+    def time_conduct_t_test(self, n_archers):
+        gr.conduct_t_test(self.data.copy(), fpath=self.fpath)
+
+    def time_calc_rank_test_tables(self, n_archers):
+        gr.calc_rank_test_tables(self.data.copy())
+
+    def time_band_sweep(self, n_archers):
+        # 100 configurations of five bands
+        group_stats.band_sweep(self.data, [[1, 2 + i % 10, 12 + i // 10, 40, 100, np.inf] for i in range(100)])
+
+    def time_write_raw_data(self, n_archers):
+        gr.write_raw_data(self.data, fpath=self.fpath)
+
+
+class Plotting:
+    params = ([2_000, 20_000], ['markers', 'density'])
+    param_names = ['archers', 'mode']
+
+    def setup(self, n_archers, mode):
+        data = ranked(n_archers)
+        # Plots of a single event
+        self.data = data[data['Event'] == data['Event'].iloc[0]]
+        self.delta_pos = gr.calc_pos_changes(data)
+        self.fpath = tempfile.mkdtemp(prefix='agb_bench_plots_') + os.sep
+
+    def teardown(self, n_archers, mode):
+        shutil.rmtree(self.fpath, ignore_errors=True)
+
+    def time_render_plots(self, n_archers, mode):
+        plotting.render_plots(self.data, fpath=self.fpath, mode=mode)
+
+    def time_plot_pos_changes(self, n_archers, mode):
+        plotting.plot_pos_changes(self.delta_pos, fpath=self.fpath)
+
+
+class ParsePages:
+    params = ([100, 1_000], ['old', 'new'])
+    param_names = ['athletes', 'layout']
+
+    def setup(self, n_athletes, layout):
+        event = synthetic.generate_event(3 * n_athletes, seed=n_athletes)
+        cat = event[(event['Division'] == 'R') & (event['Class'] == 'M')].head(n_athletes)
+        self.page = synthetic.render_page(cat, layout)
+        self.table = BeautifulSoup(self.page, 'lxml').find('table')
+
+    def time_table_to_2d(self, n_athletes, layout):
+        ianseo_scrape.table_to_2d(self.table)
+
+    def time_parse_cat(self, n_athletes, layout):
+        ianseo_scrape.parse_cat(self.page, 'R', 'M')
+
+    def time_parse_cat_fast(self, n_athletes, layout):
+        ianseo_parse.parse_cat(self.page, 'R', 'M')
+
+
+class ImportTime:
+    params = list(IMPORTS)
+    param_names = ['workload']
+
+    def setup(self, workload):
+        code, allowed = IMPORTS[workload]
+        check = f'{code}\nimport sys\nprint(" ".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+        loaded = subprocess.run([sys.executable, '-c', check], check=True, capture_output=True,
+                                text=True).stdout.split()
+        unexpected = sorted(set(loaded) - set(allowed))
+        if unexpected:
+            raise RuntimeError(f"Importing for '{workload}' loads {', '.join(unexpected)}")
+
+    def time_import(self, workload):
+        # Includes interpreter start up, which is the same for every workload
+        subprocess.run([sys.executable, '-c', IMPORTS[workload][0]], check=True)